@@ -0,0 +1,58 @@
+"""
+bench
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Benchmarks
+
+Each module is runnable on its own, i.e. `python -m bench.identity`.
+They run against a throwaway test database, never `db.sqlite3`.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configure Django the same way `manage.py` does."""
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity: int = 0):
+    """Create the test database for the duration of the block."""
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def timed(fn, repeat: int) -> float:
+    """Call `fn` `repeat` times and return the mean seconds per call."""
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(title: str, rows: list[tuple[str, ...]], header: tuple[str, ...]):
+    """Print a small aligned table."""
+
+    widths = [max(len(str(c)) for c in col) for col in zip(header, *rows)]
+    print(f"\n{title}")
+    for row in (header, *rows):
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
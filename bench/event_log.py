@@ -0,0 +1,70 @@
+"""
+event_log.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Benchmark of appending to the event log against the in-place updates
+a game action does. The log is written on top of the updates, so the
+last row is what it adds to a click.
+
+    python -m bench.event_log [--actions N]
+"""
+
+import argparse
+
+from bench import report, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--actions", type=int, default=5_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import transaction
+
+    from game.events import log
+    from game.models import Game, GameEvent, User, UserGame
+
+    with test_database():
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        bob = User.objects.create(email="bob@example.com", display_name="Bob")
+        game = Game.objects.create_with_player(alice)
+        game.join(bob.email)
+        players = list(UserGame.objects.for_game(game))
+
+        def click_update():
+            with transaction.atomic():
+                game.until_next_pop -= 1
+                game.save()
+
+        def end_turn_update():
+            with transaction.atomic():
+                for player in players:
+                    player.is_active = not player.is_active
+                    player.save(update_fields=["is_active"])
+                game.save()
+
+        def append():
+            log.append(game.pk, GameEvent.Kind.CLICK, {"pops_left": 1, "until_next_pop": 5})
+
+        def click_update_and_append():
+            click_update()
+            append()
+
+        rows = []
+        for name, fn in [
+            ("click: UPDATE game", click_update),
+            ("end_turn: UPDATE 2 players + game", end_turn_update),
+            ("event log append (batched)", append),
+            ("click: UPDATE game + append", click_update_and_append),
+        ]:
+            rows.append((name, f"{timed(fn, args.actions) * 1e6:.1f}"))
+        log.flush()
+
+        report(f"{args.actions} actions", rows, ("write", "us/action"))
+
+
+if __name__ == "__main__":
+    main()
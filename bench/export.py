@@ -0,0 +1,82 @@
+"""
+export.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Benchmark of the NDJSON export: the memory it holds as the tables grow,
+against loading the rows into a list first the way `dumpdata` does.
+
+    python -m bench.export [--games N] [--deck-size D]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from bench import report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--deck-size", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from game import export
+    from game.models import Card, Deck, Game, User
+
+    def measure(fn) -> tuple[str, str, str]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        written = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return f"{elapsed:.2f}", f"{written / 2**20:.1f}", f"{peak / 2**20:.1f}"
+
+    def streamed(gzip: bool):
+        def fn():
+            chunks = export.ndjson(export.records())
+            if gzip:
+                chunks = export.gzipped(chunks)
+            return sum(len(chunk) for chunk in chunks)
+
+        return fn
+
+    def listed():
+        records = list(export.records())
+        return sum(len(chunk) for chunk in export.ndjson(records))
+
+    with test_database():
+        card = Card.objects.create(name="Skip", description="", rarity=1, effect="skip", image="")
+        users = User.objects.bulk_create(
+            [User(email=f"player{i}@example.com", display_name="Player") for i in range(4)]
+        )
+
+        rows = []
+        for step in range(1, 4):
+            games = Game.objects.create_with_players([users] * args.games)
+            Deck.objects.bulk_create(
+                Deck(game=game, card=card, placement=i)
+                for game in games
+                for i in range(1, args.deck_size + 1)
+            )
+            count = step * args.games
+            for how, fn in [
+                ("stream", streamed(False)),
+                ("stream, gzip", streamed(True)),
+                ("list first", listed),
+            ]:
+                rows.append((str(count), how, *measure(fn)))
+
+        report(
+            f"Exporting games with {args.deck_size} deck cards each",
+            rows,
+            ("games", "how", "s", "MiB out", "peak MiB"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+hand_render.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Benchmark of rendering a player's hand: rendering `card.html` for every
+card held against concatenating the cached card fragments, for hands of
+growing size.
+
+    python -m bench.hand_render [--cards N] [--repeat R]
+"""
+
+import argparse
+import random
+
+from bench import report, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=12, help="Cards in the catalog.")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.template.loader import render_to_string
+
+    import game.cards as cards_module
+    from game.cards import FragmentCache, hand_html
+    from game.consumers import render_hand
+    from game.models import Card, Game, Hand, User
+
+    with test_database():
+        catalog = Card.objects.bulk_create(
+            [
+                Card(
+                    name=f"Card {i}",
+                    description="Does something.",
+                    rarity=1,
+                    effect="skip",
+                    image="skip.jpg",
+                )
+                for i in range(args.cards)
+            ]
+        )
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+
+        rows = []
+        for size in (10, 100, 1_000, 5_000):
+            game = Game.objects.create_with_player(alice)
+            for card in random.choices(catalog, k=size):
+                Hand.objects.add_drawn_card(card, alice, game)
+            hand = list(
+                Hand.objects.for_game(game).held().values_list("card_id", "quantity")
+            )
+            cards = Card.objects.in_bulk()
+
+            # Bound now, each size times its own hand.
+            def per_card(cards=cards, hand=hand):
+                "".join(
+                    render_to_string("card.html", {"card": cards[card]})
+                    for card, quantity in hand
+                    for _ in range(quantity)
+                )
+
+            def cold(hand=hand):
+                cards_module.fragments = FragmentCache()
+                hand_html(hand)
+
+            def warm(hand=hand):
+                hand_html(hand)
+
+            def from_db(game=game):
+                render_hand(game, alice.pk)
+
+            rows.append(
+                (
+                    str(size),
+                    *(
+                        f"{timed(fn, args.repeat) * 1e3:.3f}"
+                        for fn in (per_card, cold, warm, from_db)
+                    ),
+                )
+            )
+
+        report(
+            f"Rendering a hand ({args.cards} cards in the catalog), ms",
+            rows,
+            ("cards held", "render each", "fragments cold", "fragments warm", "warm + query"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+identity.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Request-level benchmark of the `authed` decorator.
+
+Compares the old email cookie, which looked the user up on every request,
+against the signed identity cookie.
+
+    python -m bench.identity [--requests N]
+"""
+
+import argparse
+
+from bench import report, setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core import signing
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.shortcuts import redirect
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    from game.identity import IDENTITY_COOKIE, IDENTITY_SALT
+    from game.models import User
+    from game.views import authed
+
+    def email_authed(view):
+        """The decorator as it was before the identity cookie."""
+
+        def inner(request, *args, **kwargs):
+            if not request.COOKIES.get("email"):
+                return redirect("home")
+
+            request.game_user = User.objects.get_by_email(request.COOKIES["email"])
+            return view(request, *args, **kwargs)
+
+        return inner
+
+    def view(request):
+        return HttpResponse(request.game_user.display_name)
+
+    with test_database():
+        user = User.objects.create(email="bench@example.com", display_name="Bench")
+        factory = RequestFactory()
+
+        before = factory.get("/games/")
+        before.COOKIES["email"] = user.email
+
+        after = factory.get("/games/")
+        after.COOKIES[IDENTITY_COOKIE] = signing.get_cookie_signer(
+            salt=IDENTITY_COOKIE + IDENTITY_SALT
+        ).sign(f"{user.pk}:{user.display_name}")
+
+        rows = []
+        for name, decorated, request in [
+            ("email cookie (before)", email_authed(view), before),
+            ("identity cookie (after)", authed(view), after),
+        ]:
+            with CaptureQueriesContext(connection) as queries:
+                decorated(request)
+            per_request = timed(
+                lambda decorated=decorated, request=request: decorated(request), args.requests
+            )
+            rows.append(
+                (name, str(len(queries)), f"{per_request * 1e6:.1f}")
+            )
+
+        report(
+            f"authed decorator, {args.requests} requests",
+            rows,
+            ("cookie", "queries/request", "us/request"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+page_weight.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Page weight of the lobby and game pages, as served in development (files
+under their own names, uncompressed) and by the production static profile
+(hashed names, Brotli siblings, immutable caching). It collects the static
+files into a temporary STATIC_ROOT, renders each page and adds up the bytes
+of the HTML and the static files a browser supporting AVIF and Brotli
+fetches for it, and how many of those it asks about again on its next
+visit. Third party scripts, i.e. the Tailwind CDN, aren't counted, nor is
+the script DEBUG adds for django-browser-reload.
+
+Run `npm run build` (or at least have `static/dist/app.js`) and
+`manage.py optimize_images` first, so the pages link what they will in
+production.
+
+    python -m bench.page_weight
+"""
+
+import re
+import tempfile
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+
+from bench import report, setup_django, test_database
+
+
+class Assets(HTMLParser):
+    """The static URLs a page makes the browser fetch, picking one candidate of each srcset."""
+
+    def __init__(self, static_url: str):
+        super().__init__()
+        self.static_url = static_url
+        self.urls: list[str] = []
+        self._picture: str | None = None
+        self._in_picture = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "picture":
+            self._in_picture, self._picture = True, None
+        elif tag == "source" and self._in_picture and self._picture is None:
+            self._picture = self.candidate(attrs["srcset"], attrs.get("sizes"))
+        elif tag == "img":
+            url = self._picture if self._in_picture and self._picture else attrs.get("src")
+            self.add(url)
+        elif tag == "script":
+            self.add(attrs.get("src"))
+        elif tag == "link" and attrs.get("rel") == "stylesheet":
+            self.add(attrs.get("href"))
+
+    def handle_endtag(self, tag):
+        if tag == "picture":
+            self._in_picture = False
+
+    @staticmethod
+    def candidate(srcset: str, sizes: str | None) -> str:
+        """The narrowest candidate at least as wide as `sizes`, at 1x."""
+
+        candidates = sorted(
+            (int(width.removesuffix("w")), url)
+            for url, width in (entry.split() for entry in srcset.split(","))
+        )
+        shown = int(re.match(r"\d+", sizes or "").group()) if sizes else candidates[-1][0]
+        return next((url for width, url in candidates if width >= shown), candidates[-1][1])
+
+    def add(self, url: str | None):
+        # django-browser-reload's script is only there while developing.
+        if url and url.startswith(self.static_url) and "browser-reload" not in url:
+            self.urls.append(url)
+
+
+def main():
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.staticfiles import finders
+    from django.core import signing
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from game.assets import StaticFiles
+    from game.identity import IDENTITY_COOKIE, IDENTITY_SALT
+    from game.models import Game, User
+
+    static_url = "/" + settings.STATIC_URL.strip("/") + "/"
+    production = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "game.assets.CompressedManifestStaticFilesStorage"},
+    }
+
+    def development_size(url: str) -> tuple[int, bool]:
+        # Served as is, revalidated by Last-Modified on the next visit.
+        path = finders.find(unquote(url.removeprefix(static_url)))
+        return (Path(path).stat().st_size if path else 0), True
+
+    with tempfile.TemporaryDirectory() as root, test_database():
+        root = Path(root)
+        with override_settings(STATIC_ROOT=root, STORAGES=production):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        immutable = StaticFiles.fingerprinted(root)
+
+        def production_size(url: str) -> tuple[int, bool]:
+            name = unquote(url.removeprefix(static_url))
+            path = root / name
+            if (br := path.with_name(path.name + ".br")).exists():
+                path = br
+            return path.stat().st_size, name not in immutable
+
+        user = User.objects.create(email="bench@example.com", display_name="Bench")
+        game = Game.objects.create_with_player(user)
+        client = Client()
+        client.cookies[IDENTITY_COOKIE] = signing.get_cookie_signer(
+            salt=IDENTITY_COOKIE + IDENTITY_SALT
+        ).sign(f"{user.pk}:{user.display_name}")
+
+        rows = []
+        for page, url in [("lobby", reverse("lobby")), ("game", reverse("detail", args=[game.pk]))]:
+            for profile, debug, storages, size in [
+                ("development", True, settings.STORAGES, development_size),
+                ("production", False, production, production_size),
+            ]:
+                # Outside DEBUG, as in production, or the manifest isn't used.
+                with override_settings(DEBUG=debug, STATIC_ROOT=root, STORAGES=storages):
+                    html = client.get(url).content
+                assets = Assets(static_url)
+                assets.feed(html.decode())
+                sizes = [size(asset) for asset in assets.urls]
+                rows.append(
+                    (
+                        page,
+                        profile,
+                        len(html),
+                        len(sizes),
+                        f"{sum(s for s, _ in sizes):,}",
+                        f"{len(html) + sum(s for s, _ in sizes):,}",
+                        sum(again for _, again in sizes),
+                    )
+                )
+
+    report(
+        "Page weight, first visit, and static requests made again on the next",
+        rows,
+        ("page", "profile", "html", "assets", "asset bytes", "total bytes", "revalidated"),
+    )
+
+
+if __name__ == "__main__":
+    main()
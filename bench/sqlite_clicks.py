@@ -0,0 +1,133 @@
+"""
+sqlite_clicks.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Write-heavy benchmark of the SQLite database profiles.
+
+Many threads click concurrently across many games, each click being the
+same load + `Game.click()` transaction the consumer runs, followed by the
+connection cleanup Django does at the end of every request. Each profile
+runs in its own process against a fresh database file.
+
+    python -m bench.sqlite_clicks [--threads N] [--games N] [--clicks N]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bench import report, setup_django
+
+PROFILES = ["development", "production"]
+
+
+def run_profile(args) -> dict:
+    """Run the benchmark in this process, for the configured profile."""
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connections
+
+    from game.models import Game
+
+    call_command("migrate", verbosity=0)
+    Game.objects.bulk_create(Game(until_next_pop=10**9) for _ in range(args.games))
+    game_pks = list(Game.objects.values_list("pk", flat=True))
+    connections.close_all()
+
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        mine, failed = [], 0
+        for _ in range(args.clicks):
+            start = time.perf_counter()
+            try:
+                Game.objects.get(pk=random.choice(game_pks)).click()
+            except OperationalError:
+                failed += 1
+            else:
+                mine.append(time.perf_counter() - start)
+            finally:
+                close_old_connections()
+        connections.close_all()
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "clicks_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3 if latencies else 0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--clicks", type=int, default=250, help="per thread")
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args)))
+        return
+
+    rows = []
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = os.environ | {
+                "POPCORN_DATABASE_PROFILE": profile,
+                "POPCORN_DATABASE_NAME": str(Path(tmp) / "bench.sqlite3"),
+            }
+            out = subprocess.run(
+                [sys.executable, "-m", "bench.sqlite_clicks", *sys.argv[1:]]
+                + ["--profile", profile],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        rows.append(
+            (
+                profile,
+                f"{result['clicks_per_second']:.0f}",
+                f"{result['p50_ms']:.2f}",
+                f"{result['p99_ms']:.2f}",
+                str(result["errors"]),
+            )
+        )
+
+    report(
+        f"{args.threads} threads x {args.clicks} clicks over {args.games} games",
+        rows,
+        ("profile", "clicks/s", "p50 ms", "p99 ms", "locked errors"),
+    )
+
+
+if __name__ == "__main__":
+    main()
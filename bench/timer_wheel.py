@@ -0,0 +1,107 @@
+"""
+timer_wheel.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Benchmark of turn timer overhead: one timer wheel against an
+`asyncio.sleep` task per game.
+
+For N active games it measures scheduling every game's turn, rescheduling
+them all (every player ending their turn), the memory held, and the CPU
+spent by the event loop idling over N pending turns for a few seconds.
+
+    python -m bench.timer_wheel [--games N] [--seconds S]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from bench import report
+from game.timers import TimerWheel
+
+TURN = 30.0
+
+
+def timed(fn, games: int) -> float:
+    """Microseconds per game."""
+
+    start = time.perf_counter()
+    fn(games)
+    return (time.perf_counter() - start) / games * 1e6
+
+
+async def measure(games: int, seconds: float, schedule, cancel) -> tuple[str, ...]:
+    tracemalloc.start()
+    schedule(games)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rescheduled = timed(schedule, games)
+    cancelled = timed(cancel, games)
+    scheduled = timed(schedule, games)
+
+    cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    idle = (time.process_time() - cpu) / seconds
+
+    cancel(games)
+    return (
+        f"{scheduled:.2f}",
+        f"{rescheduled:.2f}",
+        f"{cancelled:.2f}",
+        f"{memory / 1024:.0f}",
+        f"{idle * 100:.2f}",
+    )
+
+
+async def main(games: int, seconds: float):
+    wheel = TimerWheel()
+    runner = asyncio.create_task(wheel.run())
+
+    def wheel_schedule(n):
+        for pk in range(n):
+            wheel.schedule(pk, TURN, lambda: None)
+
+    def wheel_cancel(n):
+        for pk in range(n):
+            wheel.cancel(pk)
+
+    tasks: dict[int, asyncio.Task] = {}
+
+    async def turn():
+        await asyncio.sleep(TURN)
+
+    def task_schedule(n):
+        for pk in range(n):
+            task_cancel_one(pk)
+            tasks[pk] = asyncio.create_task(turn())
+
+    def task_cancel_one(pk):
+        if (task := tasks.pop(pk, None)) is not None:
+            task.cancel()
+
+    def task_cancel(n):
+        for pk in range(n):
+            task_cancel_one(pk)
+
+    rows = [
+        ("timer wheel", *await measure(games, seconds, wheel_schedule, wheel_cancel)),
+        ("task per game", *await measure(games, seconds, task_schedule, task_cancel)),
+    ]
+    runner.cancel()
+
+    report(
+        f"{games} games with a pending {TURN:.0f}s turn",
+        rows,
+        ("timers", "us/schedule", "us/reschedule", "us/cancel", "KiB held", "idle CPU %"),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.seconds))
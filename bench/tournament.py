@@ -0,0 +1,151 @@
+"""
+tournament.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Load test of tournaments on one worker.
+
+First it starts a round of N games both ways: one game at a time like the
+lobby does (create, join each player, deal the deck, start) and in bulk with
+`tournaments.start`, counting the time and queries. Then it plays a whole
+tournament of bots out on the timer wheel, the way a worker would, and
+reports the throughput, the CPU spent and how many games ran at once.
+
+    python -m bench.tournament [--games N] [--game-size S] [--click-delay D]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bench import report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=250)
+    parser.add_argument("--game-size", type=int, default=4)
+    parser.add_argument("--deck-size", type=int, default=100)
+    parser.add_argument("--click-delay", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from game import events, tournaments
+    from game.bots import BOT_DOMAIN, bots
+    from game.models import Card, Deck, Game, Tournament, User
+
+    def users(prefix: str, count: int) -> list[User]:
+        return User.objects.bulk_create(
+            [
+                User(email=f"{prefix}{i}@{BOT_DOMAIN}", display_name=f"Bot {i}")
+                for i in range(count)
+            ]
+        )
+
+    def one_at_a_time(players: list[User]):
+        for group in tournaments.groups(players, args.game_size):
+            game = Game.objects.create_with_player(group[0])
+            for user in group[1:]:
+                game.join(user.email)
+            Deck.objects.create_for_game(game, args.deck_size)
+            game.start()
+        events.log.flush()
+
+    def in_bulk(players: list[User]):
+        tournaments.start("bench", players, args.game_size, args.deck_size)
+        events.log.flush()
+
+    with test_database():
+        Card.objects.bulk_create(
+            [
+                Card(name=effect, description="", rarity=1, effect=effect, image="")
+                for effect in ("skip", "lucky_turn", "shuffle", "delay_the_burnt")
+            ]
+        )
+        count = args.games * args.game_size
+
+        rows = []
+        for name, fn, prefix in [
+            ("one game at a time", one_at_a_time, "single"),
+            ("tournament round", in_bulk, "bulk"),
+        ]:
+            players = users(prefix, count)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                fn(players)
+                elapsed = time.perf_counter() - start
+            rows.append((name, f"{elapsed * 1e3:.0f}", str(len(queries))))
+
+        report(
+            f"Starting {args.games} games of {args.game_size} (deck of {args.deck_size})",
+            rows,
+            ("how", "ms", "queries"),
+        )
+
+        bots.click_delay = args.click_delay
+        tournament = Tournament.objects.get(name="bench")
+        stats = asyncio.run(drive(tournament.pk, args.duration))
+        events.log.flush()
+        tournament.refresh_from_db()
+
+        clicks = bots.stats["clicks"]
+        report(
+            f"A tournament of {count} bots, {args.click_delay}s between clicks",
+            [
+                (
+                    "won" if tournament.finished_at else "unfinished",
+                    str(tournament.round - 1 if tournament.finished_at else tournament.round),
+                    str(bots.stats["games"]),
+                    str(stats["peak"]),
+                    f"{stats['wall']:.1f}",
+                    f"{clicks / stats['wall']:.0f}",
+                    f"{stats['cpu'] / stats['wall']:.0%}",
+                    f"{stats['cpu'] / max(clicks, 1) * 1e3:.2f}",
+                )
+            ],
+            ("result", "rounds", "games", "peak games", "s", "clicks/s", "CPU", "ms CPU/click"),
+        )
+
+
+async def drive(tournament_pk: int, duration: float) -> dict:
+    """Run the wheel until the tournament is won, sampling the games in play."""
+
+    from channels.db import database_sync_to_async
+
+    from game import timers
+    from game.models import Game, Tournament
+
+    @database_sync_to_async
+    def status():
+        playing = Game.objects.filter(
+            tournament_entry__tournament=tournament_pk, finished_at__isnull=True
+        ).count()
+        won = Tournament.objects.filter(pk=tournament_pk, finished_at__isnull=False).exists()
+        return playing, won
+
+    wheel = asyncio.create_task(timers.wheel.run())
+    cpu, wall = time.process_time(), time.perf_counter()
+    deadline = time.monotonic() + duration
+    peak = 0
+    while time.monotonic() < deadline:
+        playing, won = await status()
+        peak = max(peak, playing)
+        if won:
+            break
+        await asyncio.sleep(0.5)
+    wheel.cancel()
+
+    return {
+        "peak": peak,
+        "cpu": time.process_time() - cpu,
+        "wall": time.perf_counter() - wall,
+    }
+
+
+if __name__ == "__main__":
+    main()
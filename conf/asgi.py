@@ -12,19 +12,30 @@ import os
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
 
-from game.routing import websocket_patterns
-
 django_application = get_asgi_application()
 
-application = ProtocolTypeRouter(
-    {
-        "http": django_application,
-        "websocket": AllowedHostsOriginValidator(
-            AuthMiddlewareStack(URLRouter(websocket_patterns))
-        ),
-    }
+from game.assets import StaticFiles
+from game.housekeeping import HousekeepingMiddleware
+from game.routing import websocket_patterns
+
+http_application = django_application
+if settings.STATIC_PROFILE == "production":
+    http_application = StaticFiles(
+        django_application, settings.STATIC_ROOT, settings.STATIC_URL
+    )
+
+application = HousekeepingMiddleware(
+    ProtocolTypeRouter(
+        {
+            "http": http_application,
+            "websocket": AllowedHostsOriginValidator(
+                AuthMiddlewareStack(URLRouter(websocket_patterns))
+            ),
+        }
+    )
 )
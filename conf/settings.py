@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -60,8 +61,18 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Templates are parsed once per process. The fragments rendered
+            # on every websocket event (alive.html, card.html) rely on this.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -81,7 +92,49 @@ WSGI_APPLICATION = "conf.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("POPCORN_DATABASE_NAME", BASE_DIR / "db.sqlite3"),
+    }
+}
+
+# The production profile (POPCORN_DATABASE_PROFILE=production) tunes SQLite
+# for many small concurrent writes, i.e. clicks. The pragmas run on every new
+# connection. WAL lets readers carry on while a click commits, IMMEDIATE
+# transactions take the write lock up front (so writers queue on the busy
+# timeout instead of failing to upgrade a read lock), and connections are
+# kept between requests and consumer calls.
+# See bench/sqlite_clicks.py for the numbers.
+DATABASE_PROFILE = os.environ.get("POPCORN_DATABASE_PROFILE", "development")
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"] |= {
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA mmap_size=134217728;"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 5,
+        },
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The lobby pages and state versions live here, see game/versions.py. They
+# must be shared by every process, the ASGI workers and management commands
+# alike, or a version bumped in one is never seen by the others and their
+# pages and ETags go stale. Files are shared by the processes of one host.
+# A version the cache culls is minted again, which only costs a miss.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("POPCORN_CACHE_DIR", BASE_DIR / ".cache"),
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
     }
 }
 
@@ -124,6 +177,18 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static" / "dist", BASE_DIR / "static" / "public"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# The production profile (POPCORN_STATIC_PROFILE=production) names collected
+# files by their content, with .gz and .br siblings of the text ones, and
+# serves them from STATIC_ROOT in the ASGI app with year long cache headers.
+# Run `npm run build` and `manage.py collectstatic` first, see game/assets.py.
+STATIC_PROFILE = os.environ.get("POPCORN_STATIC_PROFILE", "development")
+
+if STATIC_PROFILE == "production":
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "game.assets.CompressedManifestStaticFilesStorage"},
+    }
+
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "media/"
 
@@ -136,4 +201,67 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 ASGI_APPLICATION = "conf.asgi.application"
 
-CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+# Each socket's queue holds at most `capacity` messages, a slow reader
+# past that misses messages and catches up by resuming, see game/resume.py.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {"capacity": 100},
+    }
+}
+
+# Game
+
+# Events are written in batches of BATCH_SIZE, and a snapshot of a game is
+# stored every SNAPSHOT_EVERY of its events, see game/events.py.
+GAME_EVENT_LOG = {"BATCH_SIZE": 64, "SNAPSHOT_EVERY": 200}
+
+# Background tasks in the ASGI worker, see game/housekeeping.py. Intervals
+# are in seconds. A game nobody has sent a heartbeat to for IDLE_TIMEOUT is
+# abandoned: it is closed and its deck and hand rows are deleted.
+# Set ARCHIVE_INTERVAL to archive finished games from the worker instead of
+# running `manage.py archive_games`.
+GAME_HOUSEKEEPING = {
+    "HEARTBEAT_INTERVAL": 15,
+    "IDLE_TIMEOUT": 120,
+    "REAP_INTERVAL": 60,
+    "ARCHIVE_INTERVAL": None,
+}
+
+# Snapshots sent to each game's spectators per second, see game/spectators.py.
+GAME_SPECTATOR_TICK_RATE = 5
+
+# Broadcasts kept per game for reconnecting players to catch up on, see
+# game/resume.py. A player further behind gets the game's current state instead.
+GAME_RESUME_BUFFER = 256
+
+# Token bucket limits of the game sockets as (tokens per second, burst) per
+# message type, see game/throttle.py. SOCKET and GAME limit what clients
+# send, OUTBOUND the click animations each socket is sent, at least the GAME
+# click limit so no click a game accepts is dropped on the way out.
+GAME_RATE_LIMITS = {
+    "SOCKET": {"click": (20, 40), "sync": (2, 5), "default": (10, 20)},
+    "GAME": {"click": (30, 60), "sync": (10, 20), "default": (30, 60)},
+    "OUTBOUND": {"click": (30, 60)},
+}
+
+# Matchmaking seats waiting players GAME_SIZE at a time, every TICK seconds,
+# in new games with decks of DECK_SIZE cards, see game/matchmaking.py.
+GAME_MATCHMAKING = {"GAME_SIZE": 4, "TICK": 1, "DECK_SIZE": 500}
+
+# Bot players click a random 1..MAX_CLICKS times a turn, about CLICK_DELAY
+# seconds apart. Every ADOPT_INTERVAL seconds the worker takes over the bots
+# of games started elsewhere, i.e. by a management command, see game/bots.py.
+GAME_BOTS = {"CLICK_DELAY": 0.5, "MAX_CLICKS": 5, "ADOPT_INTERVAL": 5}
+
+# `manage.py optimize_images` writes AVIF and WebP variants of the images in
+# SOURCE, at each of WIDTHS below their own width, to OUTPUT with a manifest
+# the `picture` template tag reads, see game/images.py. FORMATS are the
+# encoder qualities. Each of SPRITES is packed into one atlas image.
+GAME_IMAGES = {
+    "SOURCE": BASE_DIR / "static" / "public",
+    "OUTPUT": BASE_DIR / "static" / "dist",
+    "WIDTHS": [160, 320, 640],
+    "FORMATS": {"avif": 50, "webp": 80},
+    "SPRITES": {"popcorn": [f"popcorn_kernel_{i}.png" for i in range(10)]},
+}
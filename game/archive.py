@@ -0,0 +1,176 @@
+"""
+archive.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Archive
+
+Finished games are moved out of the hot tables into one compressed
+`ArchivedGame` row each. A game is up to 1,000 `Deck` rows, which would
+otherwise sit in every index the live games use.
+"""
+
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.dateparse import parse_datetime
+
+from game.models import ArchivedGame, Deck, Game, GameEvent, Hand, UserGame
+
+GAME_FIELDS = [
+    "started_at",
+    "finished_at",
+    "pops_left",
+    "until_next_pop",
+    "last_card_played",
+    "chance_to_draw",
+]
+DATETIME_FIELDS = {"started_at", "finished_at"}
+
+# Each related row is stored as a plain list, in this column order.
+PLAYER_COLUMNS = ["id", "user_id", "killed_at", "is_active", "next_player_id"]
+DECK_COLUMNS = ["id", "card_id", "is_played", "placement"]
+# Games archived before hands had quantities have no quantity, i.e. 1.
+HAND_COLUMNS = ["id", "user_id", "card_id", "quantity"]
+EVENT_COLUMNS = ["seq", "kind", "data", "created_at"]
+
+
+def _grouped(queryset: QuerySet, columns: list[str]) -> dict[int, list[list]]:
+    groups = defaultdict(list)
+    for game_id, *row in queryset.values_list("game_id", *columns):
+        groups[game_id].append(row)
+    return groups
+
+
+def pack(document: dict) -> bytes:
+    # Datetimes are the only non-JSON values, kept to the microsecond.
+    data = json.dumps(document, separators=(",", ":"), default=datetime.isoformat)
+    return zlib.compress(data.encode(), 9)
+
+
+def unpack(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+@transaction.atomic
+def archive_finished(batch_size: int = 100, finished_before=None) -> int:
+    """Archive up to `batch_size` finished games, returning how many were archived.
+
+    Every table is read once for the whole batch, and the hot rows are
+    deleted in bulk once the archive rows are written.
+    """
+
+    # A tournament's games stay until it is over, its bracket is built from them.
+    games = (
+        Game.objects.finished()
+        .exclude(
+            tournament_entry__isnull=False,
+            tournament_entry__tournament__finished_at__isnull=True,
+        )
+        .order_by("pk")
+    )
+    if finished_before is not None:
+        games = games.filter(finished_at__lt=finished_before)
+    games = list(games[:batch_size])
+    if not games:
+        return 0
+
+    ids = [game.pk for game in games]
+    players = _grouped(
+        UserGame.objects.filter(game_id__in=ids).order_by("pk"), PLAYER_COLUMNS
+    )
+    deck = _grouped(
+        Deck.objects.filter(game_id__in=ids).order_by("placement"), DECK_COLUMNS
+    )
+    hands = _grouped(Hand.objects.filter(game_id__in=ids).order_by("pk"), HAND_COLUMNS)
+    events = _grouped(
+        GameEvent.objects.filter(game_id__in=ids).order_by("seq"), EVENT_COLUMNS
+    )
+
+    ArchivedGame.objects.bulk_create(
+        ArchivedGame(
+            id=game.pk,
+            started_at=game.started_at,
+            finished_at=game.finished_at,
+            data=pack(
+                {
+                    "game": {field: getattr(game, field) for field in GAME_FIELDS},
+                    "players": players[game.pk],
+                    "deck": deck[game.pk],
+                    "hands": hands[game.pk],
+                    "events": events[game.pk],
+                }
+            ),
+        )
+        for game in games
+    )
+    # Every related table cascades with a single DELETE ... WHERE game_id IN.
+    Game.objects.filter(pk__in=ids).delete()
+
+    return len(ids)
+
+
+def _prefetched(model, rows: list) -> QuerySet:
+    queryset = model.objects.all()
+    queryset._result_cache = rows
+    queryset._prefetch_done = True
+    return queryset
+
+
+def _instances(model, game: Game, columns: list[str], rows: list[list], dates=()):
+    instances = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        for field in dates:
+            values[field] = values[field] and parse_datetime(values[field])
+        instances.append(model(game=game, **values))
+    return instances
+
+
+def restore(archived: ArchivedGame) -> Game:
+    """Rebuild an archived game, unsaved, with its related rows prefetched.
+
+    `game.players.all()`, `game.deck_cards.all()`, `game.hand_set.all()`
+    and `game.events.all()` read from the archive. Filtering them would go
+    to the (empty) hot tables.
+    """
+
+    document = unpack(archived.data)
+    game = Game(
+        pk=archived.pk,
+        **{
+            field: parse_datetime(value) if field in DATETIME_FIELDS and value else value
+            for field, value in document["game"].items()
+        },
+    )
+    game._state.adding = False
+
+    players = _instances(
+        UserGame, game, PLAYER_COLUMNS, document["players"], dates=["killed_at"]
+    )
+    by_id = {player.pk: player for player in players}
+    for player in players:
+        if player.next_player_id in by_id:
+            player.next_player = by_id[player.next_player_id]
+
+    game._prefetched_objects_cache = {
+        "players": _prefetched(UserGame, players),
+        "deck_cards": _prefetched(
+            Deck, _instances(Deck, game, DECK_COLUMNS, document["deck"])
+        ),
+        "hand_set": _prefetched(
+            Hand, _instances(Hand, game, HAND_COLUMNS, document["hands"])
+        ),
+        "events": _prefetched(
+            GameEvent,
+            _instances(
+                GameEvent, game, EVENT_COLUMNS, document["events"], dates=["created_at"]
+            ),
+        ),
+    }
+
+    return game
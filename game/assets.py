@@ -0,0 +1,193 @@
+"""
+assets.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Static Assets
+
+In production (`POPCORN_STATIC_PROFILE=production`) `collectstatic` names
+every file by a hash of its content, through Django's manifest storage, and
+writes a gzipped and, with `brotli` installed (`pip install '.[static]'`),
+a Brotli compressed sibling of each text file, compressed once at build
+time rather than on every request. With `rjsmin`, from the same extra, the
+scripts are minified first, so the hash and the siblings are of the
+minified script.
+
+`StaticFiles` serves `STATIC_ROOT` in front of the Django ASGI app. It
+sends the smallest variant the client accepts, and since a hashed name's
+content never changes, tells browsers to cache those for a year without
+asking again. Files under their own name, e.g. linked from outside the
+templates, are revalidated by ETag instead.
+"""
+
+import asyncio
+import gzip
+import json
+import mimetypes
+import re
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# The files worth compressing, images and fonts are compressed already.
+COMPRESSIBLE = {".css", ".html", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".xml"}
+# Names fingerprinted before collectstatic, like the image variants of game/images.py.
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+
+IMMUTABLE = b"public, max-age=31536000, immutable"
+REVALIDATE = b"no-cache"
+CHUNK_SIZE = 64 * 1024
+
+
+def compressed(data: bytes) -> dict[str, bytes]:
+    """The data's precompressed variants by file suffix, those smaller than the data."""
+
+    # mtime=0 so the same file always compresses to the same bytes.
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: variant for suffix, variant in variants.items() if len(variant) < len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    # CompressedManifestStaticFilesStorage.
+
+    Minified scripts under hashed names, plus .gz and .br siblings of the text files.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        if FINGERPRINTED.search(name):
+            return name
+        return super().hashed_name(name, content, filename)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run and rjsmin is not None:
+            paths = dict(paths)
+            for name in paths:
+                if name.endswith(".js") and not name.endswith(".min.js"):
+                    path = Path(self.path(name))
+                    script = path.read_text(encoding="utf-8")
+                    path.write_text(rjsmin.jsmin(script), encoding="utf-8")
+                    # Hashed from the minified copy, rather than the source.
+                    paths[name] = (self, name)
+
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in set(self.hashed_files.values()):
+            if Path(name).suffix not in COMPRESSIBLE:
+                continue
+            path = Path(self.path(name))
+            for suffix, data in compressed(path.read_bytes()).items():
+                path.with_name(path.name + suffix).write_bytes(data)
+
+
+def accepted(header: str) -> set[str]:
+    """The codings of an Accept-Encoding header, less those refused with q=0."""
+
+    codings = set()
+    for part in header.split(","):
+        coding, *params = [param.strip() for param in part.split(";")]
+        try:
+            q = next((float(p[2:]) for p in params if p.startswith("q=")), 1.0)
+        except ValueError:
+            continue
+        if coding and q > 0:
+            codings.add(coding.lower())
+    return codings
+
+
+class StaticFiles:
+    """
+    # StaticFiles.
+
+    ASGI middleware serving the collected static files.
+    Everything else, and files it doesn't have, go to the wrapped app.
+    """
+
+    # Preferred first.
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, application, root: Path, url: str):
+        self.application = application
+        self.root = Path(root).resolve()
+        self.prefix = "/" + url.strip("/") + "/"
+        self.immutable = self.fingerprinted(self.root)
+
+    @staticmethod
+    def fingerprinted(root: Path) -> frozenset[str]:
+        """The hashed names in the root's manifest."""
+
+        try:
+            manifest = json.loads((root / ManifestStaticFilesStorage.manifest_name).read_text())
+        except FileNotFoundError:
+            return frozenset()
+        return frozenset(manifest["paths"].values())
+
+    def find(self, path: str) -> Path | None:
+        if not path.startswith(self.prefix):
+            return None
+        file = (self.root / path.removeprefix(self.prefix)).resolve()
+        if not file.is_relative_to(self.root) or not file.is_file():
+            return None
+        return file
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.application(scope, receive, send)
+        if (file := self.find(scope["path"])) is None:
+            return await self.application(scope, receive, send)
+
+        request = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        name = file.relative_to(self.root).as_posix()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        headers = [(b"content-type", content_type.encode())]
+
+        siblings = [
+            (coding, sibling)
+            for coding, suffix in self.ENCODINGS
+            if (sibling := file.with_name(file.name + suffix)).is_file()
+        ]
+        if siblings:
+            headers.append((b"vary", b"Accept-Encoding"))
+            codings = accepted(request.get("accept-encoding", ""))
+            for coding, sibling in siblings:
+                if coding in codings:
+                    headers.append((b"content-encoding", coding.encode()))
+                    file = sibling
+                    break
+
+        stat = file.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        headers += [
+            (b"cache-control", IMMUTABLE if name in self.immutable else REVALIDATE),
+            (b"etag", etag.encode()),
+        ]
+        if etag in request.get("if-none-match", ""):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            return await send({"type": "http.response.body", "body": b""})
+
+        headers.append((b"content-length", str(stat.st_size).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            return await send({"type": "http.response.body", "body": b""})
+
+        with file.open("rb") as f:
+            while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
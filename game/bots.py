@@ -0,0 +1,196 @@
+"""
+bots.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Bots
+
+Bot players fill the seats of games that are short of people. A bot is an
+ordinary user who joins through `Game.join`, but it has no websocket: when
+its turn starts, `schedule_turn` puts its next click on the worker's timer
+wheel, the same loop that drives the turn timers. Each click runs the shared
+game actions in `game/consumers.py` and schedules the next, so an idle bot
+costs nothing and a thousand bots are a thousand wheel entries.
+
+The policy is simple, click a random 1..MAX_CLICKS times a turn with about
+CLICK_DELAY seconds between clicks, and pass the turn when out.
+
+Games started outside the worker, e.g. by `manage.py start_tournament`,
+seat their bots on a wheel that goes away with the command. The worker
+adopts the bots of games in progress it doesn't know every ADOPT_INTERVAL
+seconds, see `Bots.adopt`.
+"""
+
+import asyncio
+import random
+import threading
+import uuid
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from game import timers
+from game.models import Game, User, UserGame
+
+NAMES = ["Kernel", "Butter", "Salt", "Husk", "Orville", "Popper", "Skillet"]
+BOT_DOMAIN = "bots.invalid"
+
+
+def bot_key(game_pk: int):
+    """The timer wheel key of a game's bots, apart from its turn timer."""
+
+    return ("bot", game_pk)
+
+
+def is_bot(user: User) -> bool:
+    return user.email.endswith(f"@{BOT_DOMAIN}")
+
+
+def new_bot() -> User:
+    return User.objects.create(
+        email=f"{uuid.uuid4().hex}@{BOT_DOMAIN}",
+        display_name=f"{random.choice(NAMES)} Bot",
+    )
+
+
+class Bots:
+    """
+    # Bots.
+
+    The bots seated in this worker's games.
+    Thread safe, since bots act from worker threads
+    while the wheel schedules them on the event loop.
+    """
+
+    def __init__(self, click_delay: float, max_clicks: int):
+        self.click_delay = click_delay
+        self.max_clicks = max_clicks
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._games: dict[int, set[int]] = {}
+        # Clicks in flight, so their tasks aren't garbage collected.
+        self._acting: set[asyncio.Task] = set()
+
+    def players(self, game_pk: int) -> frozenset[int]:
+        """The user pks of the game's bots."""
+
+        with self._lock:
+            return frozenset(self._games.get(game_pk, ()))
+
+    def seat(self, game_pk: int, user: User):
+        """Have the bot play its turns of the game, once it has joined."""
+
+        with self._lock:
+            self._games.setdefault(game_pk, set()).add(user.pk)
+            self.stats["joined"] += 1
+
+    def add(self, game: Game) -> UserGame:
+        """Create a bot and have it join the game."""
+
+        user = new_bot()
+        player = game.join(user.email)
+        player.user = user
+        self.seat(game.pk, user)
+        return player
+
+    def start_game(self, players: int, **fields) -> Game:
+        """Create and start a game played only by bots."""
+
+        from game.consumers import active_user_pk, schedule_turn
+
+        user = new_bot()
+        game = Game.objects.create_with_player(user, **fields)
+        self.seat(game.pk, user)
+        for _ in range(players - 1):
+            self.add(game)
+        game.start()
+        schedule_turn(game, active_user_pk(game))
+        return game
+
+    def schedule(self, game_pk: int, user_pk: int, clicks_left: int | None = None):
+        """Have the bot click after a short, human-ish delay."""
+
+        def act():
+            task = asyncio.create_task(
+                database_sync_to_async(self.act)(game_pk, user_pk, clicks_left)
+            )
+            self._acting.add(task)
+            task.add_done_callback(self._acting.discard)
+
+        delay = self.click_delay * random.uniform(0.5, 1.5)
+        timers.wheel.schedule(bot_key(game_pk), delay, act)
+
+    def act(self, game_pk: int, user_pk: int, clicks_left: int | None):
+        """Make the bot's next move, if it is still the bot's turn."""
+
+        from game.consumers import click_kernel, pass_turn
+
+        game = Game.objects.filter(pk=game_pk).first()
+        if game is None or game.finished_at is not None:
+            return self.forget(game_pk)
+
+        player = UserGame.objects.is_active_for_game(game).select_related("user").first()
+        if player is None or player.user_id != user_pk:
+            return
+
+        if player.killed_at is not None:
+            # Out of the game, but still in the turn order.
+            return pass_turn(game, player.user.email)
+
+        if clicks_left is None:
+            clicks_left = random.randint(1, self.max_clicks)
+
+        self.count("clicks")
+        if not click_kernel(game):
+            if clicks_left > 1:
+                self.schedule(game_pk, user_pk, clicks_left - 1)
+            else:
+                self.count("turns")
+                pass_turn(game, player.user.email)
+
+        elif game.finished_at is not None:
+            self.count("games")
+            self.forget(game_pk)
+
+    def adopt(self) -> int:
+        """Seat the bots of the games in progress this worker isn't playing, returning how many.
+
+        The bots whose turn it is are scheduled to act.
+        """
+
+        with self._lock:
+            seated = list(self._games)
+        players = (
+            UserGame.objects.filter(
+                game__started_at__isnull=False,
+                game__finished_at__isnull=True,
+                user__email__endswith=f"@{BOT_DOMAIN}",
+            )
+            .exclude(game_id__in=seated)
+            .values_list("game_id", "user_id", "is_active")
+        )
+
+        adopted = 0
+        for game_pk, user_pk, is_active in players:
+            with self._lock:
+                self._games.setdefault(game_pk, set()).add(user_pk)
+            if is_active:
+                self.schedule(game_pk, user_pk)
+            adopted += 1
+        return adopted
+
+    def count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def forget(self, game_pk: int):
+        timers.wheel.cancel(bot_key(game_pk))
+        with self._lock:
+            self._games.pop(game_pk, None)
+
+
+bots = Bots(
+    click_delay=settings.GAME_BOTS["CLICK_DELAY"],
+    max_clicks=settings.GAME_BOTS["MAX_CLICKS"],
+)
@@ -0,0 +1,73 @@
+"""
+cards.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Card Fragments
+
+A card's HTML (`card.html`) only depends on its `Card` row, so each card is
+rendered once and kept in this process, and a hand is the concatenation of
+its cards' fragments. Fragments are kept for the current catalog version,
+which `Card.save` and `Card.delete` bump, so an edited card is rendered
+again on its next use and the old fragments are dropped.
+"""
+
+import threading
+from collections.abc import Iterable
+
+from django.template.loader import render_to_string
+
+from game import versions
+from game.models import Card
+
+CATALOG = "catalog"
+
+
+class FragmentCache:
+    """
+    # FragmentCache.
+
+    Card pk -> rendered `card.html`, for one catalog version.
+    Thread safe, since hands are rendered from worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._fragments: dict[int, str] = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._fragments)
+
+    def get_many(self, card_pks: Iterable[int]) -> dict[int, str]:
+        """The fragments of the given cards, rendering the missing ones from one query."""
+
+        card_pks = set(card_pks)
+        version = versions.current(CATALOG)
+        with self._lock:
+            if version != self._version:
+                self._version, self._fragments = version, {}
+            found = {pk: self._fragments[pk] for pk in card_pks if pk in self._fragments}
+
+        if missing := card_pks - found.keys():
+            rendered = {
+                card.pk: render_to_string("card.html", {"card": card})
+                for card in Card.objects.filter(pk__in=missing)
+            }
+            with self._lock:
+                if version == self._version:
+                    self._fragments.update(rendered)
+            found |= rendered
+
+        return found
+
+
+fragments = FragmentCache()
+
+
+def hand_html(hand: list[tuple[int, int]]) -> str:
+    """The HTML of a hand given as (card pk, quantity) pairs, a fragment per copy."""
+
+    html = fragments.get_many(card for card, _ in hand)
+    return "".join(html[card] * quantity for card, quantity in hand if card in html)
@@ -6,13 +6,24 @@ Ian Kollipara <ian.kollipara@cune.edu>
 WebSocketConsumer
 """
 
-import random
+import asyncio
 
 from asgiref.sync import async_to_sync
-from channels.generic.websocket import JsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer, JsonWebsocketConsumer
+from channels.layers import get_channel_layer
 from django.template.loader import render_to_string
-
-from game.models import Card, Deck, Game, Hand, UserGame
+from django.urls import reverse
+
+from game import effects, events, matchmaking, timers, tournaments
+from game.cards import hand_html
+from game.identity import get_identity_from_cookies
+from game.lobby import LOBBY_GROUP
+from game.models import Card, Deck, Game, Hand, User, UserGame
+from game.presence import presence
+from game.resume import recent
+from game.spectators import spectator_group, spectators
+from game.throttle import throttle
 
 # Possible Responses
 
@@ -58,17 +69,218 @@ def kill_payload(msg: str, game: Game, alive_html: str):
     }
 
 
-def play_card_payload(msg: str, game: Game, hand_html: str):
+def play_card_payload(msg: str, game: Game):
     return {
         "type": "play_card",
         "msg": msg,
         "game": game.to_json(),
-        "hand_html": hand_html,
     }
 
 
-def win_payload(msg: str):
-    return {"type": "win", "msg": msg}
+def hand_payload(hand_html: str):
+    return {"type": "hand", "hand_html": hand_html}
+
+
+def peek_payload(msg: str):
+    return {"type": "peek", "msg": msg}
+
+
+def win_payload(msg: str, next_url: str | None = None):
+    return {"type": "win", "msg": msg, "next": next_url}
+
+
+def resync_payload(seq: int, game: Game, alive_html: str):
+    return {
+        "type": "resync",
+        "seq": seq,
+        "game": game.to_json() if game.started_at else None,
+        "alive_html": alive_html,
+    }
+
+
+def player_group(game_pk: int | str, player_pk: int) -> str:
+    """The private group of one player (UserGame) of a game."""
+
+    return f"{game_pk}.player.{player_pk}"
+
+
+def render_hand(game: Game | int, user_pk: int) -> str:
+    """The player's hand, a card per copy held, from one query and the card fragments."""
+
+    return hand_html(
+        list(
+            Hand.objects.for_game(game)
+            .for_user(user_pk)
+            .held()
+            .order_by("pk")
+            .values_list("card_id", "quantity")
+        )
+    )
+
+
+def broadcast(game_pk: int | str, payload: dict):
+    """Send a payload to everyone playing the game, and fold it into the spectators' buffer.
+
+    The payload is numbered, so players who reconnect can resume from it.
+    """
+
+    payload = payload | {"seq": recent.append(int(game_pk), payload)}
+    async_to_sync(get_channel_layer().group_send)(str(game_pk), payload)
+    spectators.record(int(game_pk), payload)
+
+
+# Turn Timers
+
+# Expiries in flight, so their tasks aren't garbage collected mid-turn.
+_expiring: set[asyncio.Task] = set()
+
+
+def active_user_pk(game: Game) -> int | None:
+    return (
+        UserGame.objects.is_active_for_game(game)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+
+
+def schedule_turn(game: Game, user_pk: int | None):
+    """Start the turn timer of the given (active) user, if the game has a time limit.
+
+    A bot's turn is scheduled for it to play instead.
+    """
+
+    from game.bots import bots
+
+    if user_pk is not None and user_pk in bots.players(game.pk):
+        bots.schedule(game.pk, user_pk)
+
+    if not game.turn_time_limit or user_pk is None:
+        return
+
+    def expire():
+        task = asyncio.create_task(
+            database_sync_to_async(expire_turn)(game.pk, user_pk)
+        )
+        _expiring.add(task)
+        task.add_done_callback(_expiring.discard)
+
+    timers.wheel.schedule(game.pk, game.turn_time_limit, expire)
+
+
+def expire_turn(game_pk: int, user_pk: int):
+    """End the turn of a player who ran out of time, like `end_turn` would.
+
+    Does nothing if the turn already moved on.
+    """
+
+    game = Game.objects.get(pk=game_pk)
+    active = (
+        UserGame.objects.is_active_for_game(game).select_related("user").first()
+    )
+    if game.finished_at or active is None or active.user_id != user_pk:
+        return
+
+    game.advance_turn(active.user.email)
+    broadcast(
+        game_pk,
+        end_turn_payload(f"{active.user.display_name} ran out of time!", game),
+    )
+    schedule_turn(game, active_user_pk(game))
+
+
+# Game Actions, shared by the consumer and the bots.
+
+
+def click_kernel(game: Game) -> bool:
+    """Click the game's kernel and tell everyone what happened. True if it popped.
+
+    The active player is out when it pops, and the turn passes to the next
+    player still in. When the game is over, a tournament game sends its
+    players on to the bracket.
+    """
+
+    has_popped = game.click()
+    if not has_popped:
+        broadcast(game.pk, click_payload())
+        return False
+
+    loser = UserGame.objects.is_active_for_game(game).select_related("user").get()
+    loser.kill()
+    alive_html = render_to_string("alive.html", {"alive_users": game.players.all()})
+    broadcast(
+        game.pk,
+        kill_payload(f"{loser.user.email} has lost!", game, alive_html),
+    )
+    if game.pops_left > 0:
+        pass_turn(game, loser.user.email)
+    else:
+        game.finish()
+        timers.wheel.cancel(game.pk)
+        tournament = tournaments.finished(game)
+        broadcast(
+            game.pk,
+            win_payload(
+                "You have won!",
+                reverse("tournament", args=[tournament.pk]) if tournament else None,
+            ),
+        )
+        events.log.flush()
+        events.log.forget(game.pk)
+    return True
+
+
+def play_from_hand(game: Game, user: User | int, card_pk: int) -> bool:
+    """Play a card the user holds and tell everyone its effect. False if they don't hold it.
+
+    An effect that passes the turn, like skip, starts the next player's turn.
+    A secret effect, like a crystal ball's cards, goes to the player's sockets
+    only, everyone else gets its public message.
+    """
+
+    card = Hand.objects.remove_played_card(card_pk, user, game)
+    if card is None:
+        return False
+
+    active = active_user_pk(game)
+    msg = card.do_effect(game)
+    game.save()
+    if isinstance(msg, effects.Secret):
+        player = UserGame.objects.for_game(game).for_user(user).only("pk").get()
+        async_to_sync(get_channel_layer().group_send)(
+            player_group(game.pk, player.pk), peek_payload(str(msg))
+        )
+        msg = msg.public
+    broadcast(game.pk, play_card_payload(msg, game))
+    if (next_active := active_user_pk(game)) != active:
+        schedule_turn(game, next_active)
+    return True
+
+
+def pass_turn(game: Game, email: str):
+    """End the turn of the player with the given email and start the next one."""
+
+    game.advance_turn(email)
+    game.save()
+    schedule_turn(game, active_user_pk(game))
+    # Turns are a natural batch boundary for the event log.
+    events.log.flush()
+    broadcast(
+        game.pk,
+        end_turn_payload(f"{game.to_json()['active_player']}'s turn!", game),
+    )
+
+
+def add_bot(game: Game) -> UserGame:
+    """Seat a bot in the game, see `game/bots.py`."""
+
+    from game.bots import bots
+
+    player = bots.add(game)
+    alive_html = render_to_string(
+        "alive.html", {"alive_users": game.players.select_related("user")}
+    )
+    broadcast(game.pk, join_payload(f"{player.user.display_name} joined!", alive_html))
+    return player
 
 
 class GameWebsocketConsumer(JsonWebsocketConsumer):
@@ -82,17 +294,84 @@ class GameWebsocketConsumer(JsonWebsocketConsumer):
 
     def connect(self):
         self.game_pk: int = self.scope["url_route"]["kwargs"]["pk"]
+        self.user = get_identity_from_cookies(self.scope.get("cookies", {}))
+        self.player_group: str | None = None
 
         async_to_sync(self.channel_layer.group_add)(self.game_pk, self.channel_name)
+        if self.user is not None:
+            player = (
+                UserGame.objects.filter(game_id=self.game_pk, user=self.user)
+                .only("pk")
+                .first()
+            )
+            if player is not None:
+                self.join_player_group(player)
+        presence.touch(int(self.game_pk), self.channel_name)
         self.accept()
 
     def disconnect(self, code):
         # Leave room group
         async_to_sync(self.channel_layer.group_discard)(self.game_pk, self.channel_name)
+        if self.player_group is not None:
+            async_to_sync(self.channel_layer.group_discard)(
+                self.player_group, self.channel_name
+            )
+        presence.leave(int(self.game_pk), self.channel_name)
+        throttle.leave(self.channel_name)
+
+    def join_player_group(self, player: UserGame):
+        """Receive the private events (hand, draws) of the player on this socket."""
+
+        self.player_group = player_group(self.game_pk, player.pk)
+        async_to_sync(self.channel_layer.group_add)(self.player_group, self.channel_name)
+
+    def send_hand(self, game: Game):
+        """Send the player's hand to their sockets only."""
+
+        async_to_sync(self.channel_layer.group_send)(
+            self.player_group, hand_payload(render_hand(game, self.user.pk))
+        )
+
+    def resume(self, seq: int):
+        """Catch a reconnected socket up from the last broadcast it saw.
+
+        Replaying from the ring costs no queries. A socket too far behind
+        gets the current state instead, and a player their hand either way,
+        since hand updates aren't broadcast.
+        """
+
+        missed = recent.since(int(self.game_pk), seq)
+        if missed is None:
+            game = Game.objects.get(pk=self.game_pk)
+            seq = recent.last(game.pk)
+            alive_html = render_to_string(
+                "alive.html", {"alive_users": game.players.select_related("user")}
+            )
+            self.send_json(resync_payload(seq, game, alive_html))
+        else:
+            for payload in missed:
+                self.send_json(payload)
+
+        if self.player_group is not None:
+            self.send_json(
+                hand_payload(render_hand(self.game_pk, self.user.pk))
+            )
 
     def receive_json(self, content: dict, **kwargs):
-        print(content)
         type_ = content["type"]
+        presence.touch(int(self.game_pk), self.channel_name)
+        if type_ == "heartbeat":
+            return
+
+        # Before anything that costs a query.
+        if not throttle.allow(int(self.game_pk), self.channel_name, type_):
+            return
+
+        if type_ == "resume":
+            # content = seq
+            self.resume(content["seq"])
+            return
+
         game = Game.objects.get(pk=self.game_pk)
 
         match type_:
@@ -103,9 +382,11 @@ class GameWebsocketConsumer(JsonWebsocketConsumer):
                 )
 
                 if not game.players.filter(user__email=content["email"]).exists():
-                    game.join(content["email"])
+                    player = game.join(content["email"])
+                    if self.user is not None and player.user_id == self.user.pk:
+                        self.join_player_group(player)
 
-                    async_to_sync(self.channel_layer.group_send)(
+                    broadcast(
                         self.game_pk,
                         join_payload(
                             f"{content['email']} Successfully joined!", alive_html
@@ -115,47 +396,40 @@ class GameWebsocketConsumer(JsonWebsocketConsumer):
             case "start":
                 # content = []
                 game.start()
+                schedule_turn(game, active_user_pk(game))
 
-                async_to_sync(self.channel_layer.group_send)(
+                broadcast(
                     self.game_pk, start_payload("Game Started!", game)
                 )
 
             case "click":
                 # content = []
-                has_popped = game.click()
-                if not has_popped:
-                    async_to_sync(self.channel_layer.group_send)(
-                        self.game_pk, click_payload()
-                    )
-                else:
-                    game.until_next_pop = random.randint(1, 100)
-                    game.save()
-                    alive_html = render_to_string(
-                        "alive.html", {"alive_users": game.players.all()}
-                    )
-                    async_to_sync(self.channel_layer.group_send)(
-                        self.game_pk,
-                        kill_payload(
-                            f"{game.to_json()['active_player']} has lost!",
-                            game,
-                            alive_html,
-                        ),
-                    )
-                    if game.pops_left == 0:
-                        async_to_sync(self.channel_layer.group_send)(
-                            self.game_pk, win_payload("You have won!")
-                        )
+                has_popped = click_kernel(game)
+                if (
+                    not has_popped
+                    and self.player_group is not None
+                    and (card := Deck.objects.get_drawn_card_for_game(game))
+                ):
+                    Hand.objects.add_drawn_card(card, self.user, game)
+                    self.send_hand(game)
+
+            case "play_card":
+                # content = card
+                if self.player_group is None:
+                    return
+
+                # Everyone sees the effect, only the player sees their hand.
+                if play_from_hand(game, self.user, content["card"]):
+                    self.send_hand(game)
+
+            case "add_bot":
+                # content = []
+                if self.player_group is not None and game.started_at is None:
+                    add_bot(game)
 
             case "end_turn":
                 # content = game, currentPlayer
-                game.advance_turn(content["currentPlayer"])
-                game.save()
-                async_to_sync(self.channel_layer.group_send)(
-                    self.game_pk,
-                    end_turn_payload(
-                        f"{game.to_json()['active_player']}'s turn!", game
-                    ),
-                )
+                pass_turn(game, content["currentPlayer"])
 
     def join(self, msg):
         self.send_json(msg)
@@ -164,7 +438,9 @@ class GameWebsocketConsumer(JsonWebsocketConsumer):
         self.send_json(msg)
 
     def click(self, msg):
-        self.send_json(msg)
+        # Only an animation, past what the game accepts from players some are skipped.
+        if throttle.deliver(self.channel_name, "click"):
+            self.send_json(msg)
 
     def kill(self, msg):
         self.send_json(msg)
@@ -175,6 +451,109 @@ class GameWebsocketConsumer(JsonWebsocketConsumer):
     def end_turn(self, msg):
         self.send_json(msg)
 
+    def play_card(self, msg):
+        self.send_json(msg)
+
+    def hand(self, msg):
+        self.send_json(msg)
+
+    def peek(self, msg):
+        self.send_json(msg)
+
+
+def seed_spectators(game_pk: int):
+    """Fill a newly watched game's spectator buffer from the database."""
+
+    game = Game.objects.with_players().filter(pk=game_pk).first()
+    if game is None:
+        return spectators.seed(game_pk, None, "")
+
+    spectators.seed(
+        game_pk,
+        game.to_json() if game.started_at else None,
+        render_to_string(
+            "alive.html",
+            {"alive_users": [p for p in game.players.all() if p.killed_at is None]},
+        ),
+    )
+
+
+class SpectatorWebsocketConsumer(AsyncJsonWebsocketConsumer):
+    """
+    # SpectatorWebsocketConsumer.
+
+    A read-only view of a game. Spectators only get the coalesced
+    snapshots sent at the spectator tick rate, see `game/spectators.py`.
+    """
+
+    async def connect(self):
+        self.game_pk = int(self.scope["url_route"]["kwargs"]["pk"])
+
+        await self.channel_layer.group_add(
+            spectator_group(self.game_pk), self.channel_name
+        )
+        await self.accept()
+
+        if spectators.watch(self.game_pk):
+            await database_sync_to_async(seed_spectators)(self.game_pk)
+        await self.send_json(spectators.current(self.game_pk))
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(
+            spectator_group(self.game_pk), self.channel_name
+        )
+        spectators.unwatch(self.game_pk)
+
+    async def receive_json(self, content, **kwargs):
+        # Spectators can't do anything.
+        pass
+
+    async def snapshot(self, msg):
+        await self.send_json(msg)
+
+
+class MatchmakingWebsocketConsumer(AsyncJsonWebsocketConsumer):
+    """
+    # MatchmakingWebsocketConsumer.
+
+    Holds a player's place in the matchmaking queue until they are
+    seated in a game, see `game/matchmaking.py`.
+    """
+
+    async def connect(self):
+        user = get_identity_from_cookies(self.scope.get("cookies", {}))
+        if user is None:
+            return await self.close()
+
+        await self.accept()
+        matchmaking.queue.join(self.channel_name, user.pk)
+
+    async def disconnect(self, code):
+        matchmaking.queue.leave(self.channel_name)
+
+    async def matched(self, msg):
+        await self.send_json(msg)
+        await self.close()
+
+
+class LobbyWebsocketConsumer(JsonWebsocketConsumer):
+    """
+    # LobbyWebsocketConsumer.
+
+    Pushes row-level lobby changes to everyone looking at the lobby,
+    so they don't have to reload it.
+    """
+
+    def connect(self):
+        async_to_sync(self.channel_layer.group_add)(LOBBY_GROUP, self.channel_name)
+        self.accept()
+
+    def disconnect(self, code):
+        async_to_sync(self.channel_layer.group_discard)(LOBBY_GROUP, self.channel_name)
+
+    def lobby_update(self, msg):
+        self.send_json(msg)
+
 
 # class GameWebsocketConsumer(JsonWebsocketConsumer):
 #     def connect(self):
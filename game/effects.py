@@ -8,25 +8,35 @@ Effects
 
 from __future__ import annotations
 
+from typing import Self
+
 from game.models import Deck, Game, UserGame
 import random
 
 
+class Secret(str):
+    """
+    # Secret.
+
+    An effect's message for the player who played the card alone.
+    Everyone else is told `public` instead.
+    """
+
+    public: str
+
+    def __new__(cls, msg: str, public: str) -> Self:
+        secret = super().__new__(cls, msg)
+        secret.public = public
+        return secret
 
 
 def skip(game: Game) -> str:
     # ~40 rarity, medium rarity
     # Pass the kernel
 
-    player = game.players.filter(is_active=True, killed_at__isnull=True).get()
-    player.is_active = False
-    next_player = (
-        game.players.filter(is_active=True, killed_at__isnull=True).get().next_player
-    )
-    next_player.is_active = True
-
-    player.save()
-    next_player.save()
+    # Like ending the turn, past the players already out.
+    player = UserGame.objects.is_active_for_game(game).select_related("user").get()
+    game.advance_turn(player.user.email)
 
     return "You passed the Kernel!"
 
@@ -151,32 +161,45 @@ def extended_delay_the_burnt(game: Game) -> str:
 
 
 
-"""
+def _crystal_ball(game: Game, k: int) -> str:
+    # One query for the cards and their names.
+    names = [deck_card.card.name for deck_card in Deck.objects.peek(game, k)]
+    if not names:
+        return "The crystal ball is cloudy, the deck is empty!"
 
-def time_travel(game: Game) -> str:
-    # ~5-10 very high rarity
-    
-    # Essentially a defuse, could call pop_evansion
-
-    return "You have avoided a Pop!"
-
-    
-targeted unlucky turn
+    # Only the player sees the cards.
+    return Secret(
+        f"The next {len(names)} cards are: {', '.join(names)}",
+        f"You gazed into the crystal ball at the next {len(names)} cards!",
+    )
 
 
 def crystal_ball(game: Game) -> str:
     # ~50 medium rarity
-    
+
     # See the next 5 cards
 
-    return "Here are the next 5 clicks!"
+    return _crystal_ball(game, 5)
 
 
 def super_crystal_ball(game: Game) -> str:
     # ~20 high rarity
-    
+
     # See the next 20 cards
 
-    return "Here are the next 20 clicks!"
+    return _crystal_ball(game, 20)
+
+
+"""
+
+def time_travel(game: Game) -> str:
+    # ~5-10 very high rarity
+    
+    # Essentially a defuse, could call pop_evansion
+
+    return "You have avoided a Pop!"
+
+    
+targeted unlucky turn
 
 """
\ No newline at end of file
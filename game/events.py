@@ -0,0 +1,233 @@
+"""
+events.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Game Event Log
+
+Every game action is appended to the game's event log, numbered per game.
+Events are buffered in the process and written in batches with one
+`bulk_create`, and every `SNAPSHOT_EVERY` events a snapshot of the replayed
+state is stored, so a game can be rebuilt from its latest snapshot plus the
+tail of the log.
+
+Events are keyed by user pk rather than email, so they stay small and can
+be recorded without loading the user.
+
+Sequence numbers are handed out in the process, from the game's last
+written event, and the unique (game, seq) constraint has the final say:
+if another process wrote events of the same game first, say a management
+command, the batch's events of that game are renumbered after them and the
+batch is written again.
+
+The log is purely additive: live play still reads and writes the game,
+player and hand rows in place, and every event is written on top of those
+UPDATEs. An append costs about 80us a click once batched, a click's UPDATE
+alone takes 300-370us and both together about 435us, see bench/event_log.py.
+"""
+
+import atexit
+import copy
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from game.models import GameEvent, GameSnapshot
+
+
+def initial_state() -> dict:
+    """The replayed state of a game before its first event."""
+
+    return {
+        "players": [],
+        "killed": [],
+        "active": None,
+        "started": False,
+        "clicks": 0,
+        "pops_left": 0,
+        "until_next_pop": 0,
+        "hands": {},
+    }
+
+
+def apply(state: dict, kind: str, data: dict) -> dict:
+    """Apply a single event to the replayed state, in place."""
+
+    match kind:
+        case GameEvent.Kind.JOIN:
+            state["players"].append(data["user"])
+            if state["active"] is None:
+                state["active"] = data["user"]
+
+        case GameEvent.Kind.START:
+            state["started"] = True
+            state["pops_left"] = data["pops_left"]
+            state["until_next_pop"] = data["until_next_pop"]
+
+        case GameEvent.Kind.CLICK:
+            state["clicks"] += 1
+            state["pops_left"] = data["pops_left"]
+            state["until_next_pop"] = data["until_next_pop"]
+
+        case GameEvent.Kind.DRAW:
+            state["hands"].setdefault(str(data["user"]), []).append(data["card"])
+
+        case GameEvent.Kind.PLAY:
+            hand = state["hands"].get(str(data["user"]), [])
+            if data["card"] in hand:
+                hand.remove(data["card"])
+
+        case GameEvent.Kind.KILL:
+            state["killed"].append(data["user"])
+
+        case GameEvent.Kind.END_TURN:
+            state["active"] = data["next"]
+
+    return state
+
+
+def rebuild(game_pk: int) -> tuple[int, dict]:
+    """Rebuild a game's state from its latest snapshot and the events after it.
+
+    Only events already written are seen, flush the log first
+    if the buffered ones matter.
+    """
+
+    seq, state = 0, initial_state()
+    snapshot = GameSnapshot.objects.filter(game_id=game_pk).order_by("-seq").first()
+    if snapshot is not None:
+        seq, state = snapshot.seq, copy.deepcopy(snapshot.state)
+
+    for event in GameEvent.objects.for_game(game_pk).after(seq).iterator():
+        seq = event.seq
+        apply(state, event.kind, event.data)
+
+    return seq, state
+
+
+def replay(game_pk: int):
+    """Replay a game from its first event, yielding each event with the state after it."""
+
+    state = initial_state()
+    for event in GameEvent.objects.for_game(game_pk).order_by("seq").iterator():
+        yield event, apply(state, event.kind, event.data)
+
+
+class EventLog:
+    """
+    # EventLog.
+
+    The process-wide buffer of events waiting to be written.
+    Sequence numbers are handed out here, and renumbered
+    if the database already has them.
+    """
+
+    # Tries at writing a batch, each after renumbering the games another process wrote to.
+    ATTEMPTS = 3
+
+    def __init__(self, batch_size: int, snapshot_every: int):
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._pending: list[GameEvent] = []
+        self._seqs: dict[int, int] = {}
+
+    def record(self, game_pk: int, kind: str, **data):
+        """Queue an event once the surrounding transaction commits."""
+
+        transaction.on_commit(lambda: self.append(game_pk, kind, data))
+
+    def created(self, game_pks: list[int]):
+        """Number the events of new games from 1 without looking their last one up."""
+
+        def start():
+            with self._lock:
+                for game_pk in game_pks:
+                    self._seqs.setdefault(game_pk, 0)
+
+        transaction.on_commit(start)
+
+    def append(self, game_pk: int, kind: str, data: dict) -> int:
+        """Queue an event right away, returning its sequence number."""
+
+        with self._lock:
+            if game_pk not in self._seqs:
+                self._seqs[game_pk] = (
+                    GameEvent.objects.for_game(game_pk).aggregate(seq=Max("seq"))["seq"]
+                    or 0
+                )
+            self._seqs[game_pk] += 1
+            seq = self._seqs[game_pk]
+
+            self._pending.append(
+                GameEvent(game_id=game_pk, seq=seq, kind=kind, data=data)
+            )
+            full = len(self._pending) >= self.batch_size
+
+        if full:
+            self.flush()
+
+        return seq
+
+    def flush(self):
+        """Write every buffered event, then snapshot the games that are due."""
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        if not pending:
+            return
+
+        for attempt in range(self.ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    GameEvent.objects.bulk_create(pending)
+                break
+            except IntegrityError:
+                if attempt == self.ATTEMPTS - 1:
+                    raise
+                self.renumber(pending)
+
+        for game_pk in {e.game_id for e in pending if e.seq % self.snapshot_every == 0}:
+            self.snapshot(game_pk)
+
+    def renumber(self, batch: list[GameEvent]):
+        """Number the batch's events, and those queued since, after each game's last written one."""
+
+        with self._lock:
+            by_game: dict[int, list[GameEvent]] = {}
+            for event in [*batch, *self._pending]:
+                by_game.setdefault(event.game_id, []).append(event)
+
+            for game_pk, game_events in by_game.items():
+                seq = (
+                    GameEvent.objects.for_game(game_pk).aggregate(seq=Max("seq"))["seq"]
+                    or 0
+                )
+                for event in sorted(game_events, key=lambda e: e.seq):
+                    seq += 1
+                    event.seq = seq
+                self._seqs[game_pk] = seq
+
+    def snapshot(self, game_pk: int):
+        """Store a snapshot of the game as of its last written event."""
+
+        seq, state = rebuild(game_pk)
+        GameSnapshot.objects.get_or_create(
+            game_id=game_pk, seq=seq, defaults={"state": state}
+        )
+
+    def forget(self, game_pk: int):
+        """Drop the in-memory sequence counter for a game that is over."""
+
+        with self._lock:
+            self._seqs.pop(game_pk, None)
+
+
+log = EventLog(
+    batch_size=settings.GAME_EVENT_LOG["BATCH_SIZE"],
+    snapshot_every=settings.GAME_EVENT_LOG["SNAPSHOT_EVERY"],
+)
+atexit.register(log.flush)
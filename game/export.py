@@ -0,0 +1,105 @@
+"""
+export.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Export
+
+Game history as NDJSON, one JSON object a line, for offline analysis.
+Every line has a "type" (game, player, hand or deck) and the row's columns,
+related rows carry their "game_id". The live tables are read one after
+another in pk order, `chunk_size` rows at a time, then each archived game is
+unpacked on its own, so memory stays flat however big the tables get.
+Everything is a generator, encoded (and optionally gzipped) as it is read.
+"""
+
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable, Iterator
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+
+from game import archive
+from game.models import ArchivedGame, Deck, Game, Hand, UserGame
+
+# (type, model, columns), the archive's columns plus the keys they're stored under.
+TABLES = [
+    ("game", Game, ["id", *archive.GAME_FIELDS]),
+    ("player", UserGame, ["game_id", *archive.PLAYER_COLUMNS]),
+    ("hand", Hand, ["game_id", *archive.HAND_COLUMNS]),
+    ("deck", Deck, ["game_id", *archive.DECK_COLUMNS]),
+]
+
+# An archived game is a whole game in one row, so fewer are read at a time.
+ARCHIVE_CHUNK_SIZE = 100
+
+
+def _live(chunk_size: int, finished_only: bool) -> Iterator[dict]:
+    for type_, model, columns in TABLES:
+        rows = model.objects.order_by("pk")
+        if finished_only:
+            finished = "finished_at" if model is Game else "game__finished_at"
+            rows = rows.filter(**{f"{finished}__isnull": False})
+        for row in rows.values_list(*columns).iterator(chunk_size=chunk_size):
+            yield {"type": type_, **dict(zip(columns, row))}
+
+
+def _archived() -> Iterator[dict]:
+    archived = ArchivedGame.objects.order_by("pk").only("data")
+    for game in archived.iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+        document = archive.unpack(game.data)
+        yield {"type": "game", "id": game.pk, **document["game"]}
+        for type_, key, columns in [
+            ("player", "players", archive.PLAYER_COLUMNS),
+            ("hand", "hands", archive.HAND_COLUMNS),
+            ("deck", "deck", archive.DECK_COLUMNS),
+        ]:
+            for row in document[key]:
+                yield {"type": type_, "game_id": game.pk, **dict(zip(columns, row))}
+
+
+def records(chunk_size: int = 2000, finished_only: bool = False) -> Iterator[dict]:
+    """Every game, live then archived, with its players, hands and deck, a dict a row."""
+
+    yield from _live(chunk_size, finished_only)
+    # Archived games are all finished.
+    yield from _archived()
+
+
+def ndjson(records: Iterable[dict], buffer_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode the records a line each, in chunks of about `buffer_size` bytes."""
+
+    buffer, size = [], 0
+    for record in records:
+        line = json.dumps(record, separators=(",", ":"), default=datetime.isoformat)
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= buffer_size:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+
+def gzipped(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip the chunks as they come."""
+
+    # 16 + MAX_WBITS writes a gzip header and trailer, not a bare zlib stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+async def streamed(chunks: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """Read the chunks from the thread the database connection lives in, one at a time.
+
+    Under ASGI Django would read a sync iterator into a list before sending any of it.
+    """
+
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
@@ -60,9 +60,22 @@ class GameForm(forms.ModelForm):
         ),
     )
 
+    turn_time_limit = forms.IntegerField(
+        label="Turn Time Limit (seconds)",
+        min_value=5,
+        max_value=32_767,
+        required=False,
+        widget=forms.NumberInput(
+            {
+                "class": "border border-gray-800 w-full rounded px-2 py-1 bg-gray-700 text-gray-100 focus:outline-none focus:ring-2 focus:ring-red-500",
+                "placeholder": "No limit",
+            }
+        ),
+    )
+
     class Meta:
         model = Game
-        fields = []
+        fields = ("turn_time_limit",)
 
     def __init__(self, request, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -70,7 +83,9 @@ class GameForm(forms.ModelForm):
 
     def save(self, *args, **kwargs):
         '''Create a game with the current user and a deck of the given size'''
-        game = Game.objects.create_with_player(self.request.game_user)
+        game = Game.objects.create_with_player(
+            self.request.game_user, turn_time_limit=self.cleaned_data["turn_time_limit"]
+        )
         Deck.objects.create_for_game(game, self.cleaned_data["deck_size"])
 
         return game
@@ -0,0 +1,148 @@
+"""
+housekeeping.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Housekeeping
+
+Background asyncio tasks that run inside the ASGI worker, started the
+first time the worker handles a connection (Daphne does not send lifespan
+events). The schedule is configured by `GAME_HOUSEKEEPING` in settings.
+"""
+
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from game import archive, events, lobby, matchmaking, timers, tournaments, versions
+from game.bots import bots
+from game.models import Deck, Game, Hand
+from game.presence import presence
+from game.resume import recent
+from game.spectators import spectators, tick
+from game.throttle import throttle
+
+logger = logging.getLogger(__name__)
+
+# Called with a game pk once the game is over, to drop whatever
+# the worker keeps in memory for it.
+forgetters = [
+    presence.forget,
+    events.log.forget,
+    timers.wheel.cancel,
+    spectators.forget,
+    recent.forget,
+    throttle.forget,
+    bots.forget,
+]
+
+
+def forget(game_pk: int):
+    """Free everything this worker keeps in memory for the game."""
+
+    for forgetter in forgetters:
+        forgetter(game_pk)
+
+
+@transaction.atomic
+def reap(game_pks: list[int]) -> int:
+    """Expire abandoned games and delete their deck and hand rows in bulk.
+
+    Games that already finished only have their memory freed,
+    their rows are left for the archive. An abandoned tournament game is
+    decided by forfeit, so its round isn't held up.
+    """
+
+    events.log.flush()
+    abandoned = list(
+        Game.objects.filter(pk__in=game_pks, finished_at__isnull=True).values_list(
+            "pk", flat=True
+        )
+    )
+    if abandoned:
+        Game.objects.filter(pk__in=abandoned).update(finished_at=timezone.now())
+        Deck.objects.filter(game_id__in=abandoned).delete()
+        Hand.objects.filter(game_id__in=abandoned).delete()
+        for game_pk in abandoned:
+            versions.bump_on_commit(versions.game_key(game_pk))
+            lobby.closed(game_pk)
+        for game in Game.objects.filter(pk__in=abandoned, tournament_entry__isnull=False):
+            tournaments.finished(game)
+
+    for game_pk in game_pks:
+        transaction.on_commit(lambda game_pk=game_pk: forget(game_pk))
+
+    return len(abandoned)
+
+
+async def reap_abandoned():
+    game_pks = presence.idle_games(settings.GAME_HOUSEKEEPING["IDLE_TIMEOUT"])
+    if game_pks:
+        reaped = await database_sync_to_async(reap)(game_pks)
+        logger.info("Reaped %d abandoned games, freed %d", reaped, len(game_pks))
+
+
+async def adopt_bots():
+    adopted = await database_sync_to_async(bots.adopt)()
+    if adopted:
+        logger.info("Adopted %d bots", adopted)
+
+
+async def archive_finished():
+    while await database_sync_to_async(archive.archive_finished)():
+        pass
+
+
+async def every(interval: float, job):
+    """Run the job every `interval` seconds, for as long as the worker lives."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception:
+            logger.exception("Housekeeping job %s failed", job.__name__)
+
+
+def jobs() -> list[tuple[float, object]]:
+    """The configured (interval, job) pairs."""
+
+    config = settings.GAME_HOUSEKEEPING
+    scheduled = [
+        (config["REAP_INTERVAL"], reap_abandoned),
+        (1 / settings.GAME_SPECTATOR_TICK_RATE, tick),
+        (settings.GAME_MATCHMAKING["TICK"], matchmaking.tick),
+        (settings.GAME_BOTS["ADOPT_INTERVAL"], adopt_bots),
+    ]
+    if config["ARCHIVE_INTERVAL"] is not None:
+        scheduled.append((config["ARCHIVE_INTERVAL"], archive_finished))
+    return scheduled
+
+
+_tasks: list[asyncio.Task] = []
+
+
+def start():
+    """Start the housekeeping tasks on the running loop, once."""
+
+    if not _tasks:
+        loop = asyncio.get_running_loop()
+        _tasks.extend(
+            loop.create_task(every(interval, job)) for interval, job in jobs()
+        )
+        _tasks.append(loop.create_task(timers.wheel.run()))
+
+
+class HousekeepingMiddleware:
+    """ASGI middleware starting the housekeeping tasks with the first connection."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        start()
+        return await self.app(scope, receive, send)
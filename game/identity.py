@@ -0,0 +1,76 @@
+"""
+identity.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Signed Identity Cookie
+"""
+
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+
+from game.models import User
+
+IDENTITY_COOKIE = "identity"
+IDENTITY_SALT = "game.identity"
+
+# One year. The cookie only identifies the player, it grants nothing
+# a guest couldn't get by logging in again with the same email.
+IDENTITY_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def set_identity(response, user: User):
+    """Attach the signed identity cookie for the given user to the response."""
+
+    response.set_signed_cookie(
+        IDENTITY_COOKIE,
+        f"{user.pk}:{user.display_name}",
+        salt=IDENTITY_SALT,
+        max_age=IDENTITY_MAX_AGE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+
+def load_identity(value: str | None) -> User | None:
+    """Build a user from an already unsigned identity value.
+
+    The user is built without touching the database. Only the primary key
+    and display name are loaded, every other field is deferred, so the
+    first access to something like `user.email` runs the one query the
+    view actually needs.
+    """
+
+    if not value:
+        return None
+
+    pk, sep, display_name = value.partition(":")
+    if not sep or not pk.isdigit():
+        return None
+
+    return User.from_db(DEFAULT_DB_ALIAS, ["id", "display_name"], [int(pk), display_name])
+
+
+def get_identity(request) -> User | None:
+    """Read the signed identity cookie from the request. None if missing or tampered."""
+
+    return load_identity(
+        request.get_signed_cookie(IDENTITY_COOKIE, default=None, salt=IDENTITY_SALT)
+    )
+
+
+def get_identity_from_cookies(cookies: dict[str, str]) -> User | None:
+    """Read the signed identity cookie from parsed cookies, i.e. a websocket's scope."""
+
+    if IDENTITY_COOKIE not in cookies:
+        return None
+
+    try:
+        value = signing.get_cookie_signer(salt=IDENTITY_COOKIE + IDENTITY_SALT).unsign(
+            cookies[IDENTITY_COOKIE]
+        )
+    except signing.BadSignature:
+        return None
+
+    return load_identity(value)
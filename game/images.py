@@ -0,0 +1,218 @@
+"""
+images.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Images
+
+The PNGs and JPEGs in `static/public` are the originals, some of them
+hundreds of kilobytes for an image shown a couple hundred pixels wide.
+`optimize` writes an AVIF and a WebP of each at every configured width below
+its own, named by a hash of their content so they can be cached forever, and
+a manifest of them, `images.json`. The `picture` template tag reads the
+manifest and offers the browser the variants in a `srcset`, keeping the
+original as the fallback, so pages work the same before the variants exist.
+
+Images shown many at a time, like the ten popcorn kernels of a click, are
+also packed side by side into a sprite atlas, one image for all of them.
+The `sprite_styles` tag writes the CSS picking a frame out of the atlas,
+or out of the separate images if the atlas hasn't been written.
+"""
+
+import functools
+import hashlib
+import io
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.templatetags.static import static
+from PIL import Image
+
+EXTENSIONS = {".png", ".jpg", ".jpeg"}
+MANIFEST = "images.json"
+# Variants live in their own directory of the output, which `optimize` owns.
+VARIANTS = "img"
+# The size of a sprite's cells, twice the 64px a popcorn kernel is shown at.
+SPRITE_CELL = 128
+
+
+def sources(source: Path) -> list[str]:
+    """The names of the images to optimize, relative to `source`."""
+
+    return sorted(
+        path.relative_to(source).as_posix()
+        for path in source.rglob("*")
+        if path.suffix.lower() in EXTENSIONS
+    )
+
+
+def widths_for(width: int, widths: list[int]) -> list[int]:
+    """The widths to write an image of `width` at, never scaling it up."""
+
+    return [w for w in widths if w < width] + ([width] if width <= max(widths) else [])
+
+
+def variant_name(name: str, width: int, data: bytes, format_: str) -> str:
+    """`burnt popcorn.jpg` at 320 as AVIF is `img/burnt-popcorn-320.<hash>.avif`."""
+
+    stem = re.sub(r"[^\w.-]+", "-", Path(name).with_suffix("").as_posix().replace("/", "-"))
+    digest = hashlib.md5(data, usedforsecurity=False).hexdigest()[:12]
+    return f"{VARIANTS}/{stem}-{width}.{digest}.{format_}"
+
+
+def encode(image: Image.Image, width: int, format_: str, quality: int) -> bytes:
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    if width != image.width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format_.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def atlas(source: Path, names: list[str], cell: int = SPRITE_CELL) -> Image.Image:
+    """The images side by side, each scaled down to fit and centered in a `cell` square."""
+
+    sheet = Image.new("RGBA", (cell * len(names), cell))
+    for i, name in enumerate(names):
+        with Image.open(source / name) as frame:
+            frame = frame.convert("RGBA")
+        frame.thumbnail((cell, cell), Image.Resampling.LANCZOS)
+        sheet.paste(frame, (i * cell + (cell - frame.width) // 2, (cell - frame.height) // 2))
+    return sheet
+
+
+def write(output: Path, name: str, data: bytes):
+    (output / name).parent.mkdir(parents=True, exist_ok=True)
+    (output / name).write_bytes(data)
+
+
+def optimize(
+    source: Path,
+    output: Path,
+    widths: list[int],
+    formats: dict[str, int],
+    sprites: dict[str, list[str]],
+) -> dict[str, dict]:
+    """Write the variants of every image in `source`, the sprites and their manifest to `output`.
+
+    The manifest's "images" map each image's name to its size in pixels and
+    bytes and, per format, its variants as (width, name, bytes), smallest
+    first. Its "sprites" map each sprite's name to its frames, the bytes of
+    their images and the (name, bytes) of its atlas per format, PNG first.
+    A sprite missing any of its images is skipped. Variants left over from
+    earlier runs are removed.
+    """
+
+    manifest = {"images": {}, "sprites": {}}
+    for name in sources(source):
+        path = source / name
+        with Image.open(path) as image:
+            image.load()
+        entry = {
+            "width": image.width,
+            "height": image.height,
+            "bytes": path.stat().st_size,
+            "variants": {},
+        }
+        for format_, quality in formats.items():
+            variants = entry["variants"][format_] = []
+            for width in widths_for(image.width, widths):
+                data = encode(image, width, format_, quality)
+                variant = variant_name(name, width, data, format_)
+                write(output, variant, data)
+                variants.append((width, variant, len(data)))
+        manifest["images"][name] = entry
+
+    for sprite, names in sprites.items():
+        if not all((source / name).is_file() for name in names):
+            continue
+        sheet = atlas(source, names)
+        entry = {
+            "frames": len(names),
+            "bytes": sum((source / name).stat().st_size for name in names),
+            "atlas": {},
+        }
+        # The fallback PNG in 256 colours, a fifth of the size in full colour.
+        png = io.BytesIO()
+        sheet.quantize(256, method=Image.Quantize.FASTOCTREE).save(png, "PNG", optimize=True)
+        encoded = {"png": png.getvalue()} | {
+            format_: encode(sheet, sheet.width, format_, quality)
+            for format_, quality in formats.items()
+        }
+        for format_, data in encoded.items():
+            name = variant_name(f"{sprite}-sprite", sheet.width, data, format_)
+            write(output, name, data)
+            entry["atlas"][format_] = (name, len(data))
+        manifest["sprites"][sprite] = entry
+
+    written = {
+        variant
+        for entry in manifest["images"].values()
+        for variants in entry["variants"].values()
+        for _, variant, _ in variants
+    } | {
+        name
+        for entry in manifest["sprites"].values()
+        for name, _ in entry["atlas"].values()
+    }
+    for path in (output / VARIANTS).glob("*"):
+        if path.relative_to(output).as_posix() not in written:
+            path.unlink()
+
+    (output / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    load.cache_clear()
+    return manifest
+
+
+@functools.cache
+def load(output: Path) -> dict[str, dict]:
+    try:
+        return json.loads((output / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {"images": {}, "sprites": {}}
+
+
+def manifest() -> dict[str, dict]:
+    """The manifest of the configured output, read once a process."""
+
+    return load(Path(settings.GAME_IMAGES["OUTPUT"]))
+
+
+def srcset(entry: dict, format_: str) -> str:
+    return ", ".join(
+        f"{static(variant)} {width}w" for width, variant, _ in entry["variants"][format_]
+    )
+
+
+def sprite_css(sprite: str, names: list[str]) -> str:
+    """The rules showing frame `i` of the sprite on `.{sprite}.{sprite}-{i}`.
+
+    Frames are picked by percentage, so the element can be any size.
+    """
+
+    entry = manifest()["sprites"].get(sprite)
+    if entry is None:
+        return "".join(
+            f'.{sprite}-{i}{{background:url("{static(name)}") center/contain no-repeat}}'
+            for i, name in enumerate(names)
+        )
+
+    # Smallest first, browsers take the first format they support.
+    atlas = sorted(entry["atlas"].items(), key=lambda item: item[1][1])
+    urls = [f'url("{static(name)}") type("image/{format_}")' for format_, (name, _) in atlas]
+    # The PNG for browsers without image-set().
+    png = static(entry["atlas"]["png"][0])
+    frames = entry["frames"]
+    return (
+        f'.{sprite}{{background:url("{png}") 0 0/{frames * 100}% 100% no-repeat;'
+        f"background-image:image-set({','.join(urls)})}}"
+        + "".join(
+            f".{sprite}-{i}{{background-position:{i * 100 / max(frames - 1, 1):g}% 0}}"
+            for i in range(frames)
+        )
+    )
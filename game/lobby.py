@@ -0,0 +1,100 @@
+"""
+lobby.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Lobby
+
+The lobby listing is read far more than it changes, so pages are cached
+under the lobby version and every change (create/join/start) bumps the
+version and pushes the changed row to the lobby websocket group.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from game import versions
+from game.models import Game
+
+LOBBY_GROUP = "lobby"
+PAGE_SIZE = 25
+
+
+def lobby_row(game: Game) -> dict:
+    """The data behind a single lobby row."""
+
+    return {"pk": game.pk, "player_count": game.player_count}
+
+
+def page(before: int | None = None) -> dict:
+    """Get a page of the lobby, newest game first.
+
+    Pages are keyset-paginated on the primary key: `before` is the
+    smallest pk of the previous page, and `next` is the cursor for the
+    page after this one (None on the last page).
+    """
+
+    key = f"lobby:{versions.current(LOBBY_GROUP)}:{before or ''}"
+    if (cached := cache.get(key)) is not None:
+        return cached
+
+    games = Game.objects.not_started().with_player_count().order_by("-pk")
+    if before is not None:
+        games = games.filter(pk__lt=before)
+
+    rows = [lobby_row(game) for game in games[: PAGE_SIZE + 1]]
+    result = {
+        "games": rows[:PAGE_SIZE],
+        "next": rows[PAGE_SIZE - 1]["pk"] if len(rows) > PAGE_SIZE else None,
+    }
+
+    cache.set(key, result)
+    return result
+
+
+def lobby_update_payload(action: str, row: dict, row_html: str = ""):
+    return {"type": "lobby_update", "action": action, "game": row, "row_html": row_html}
+
+
+def changed(game: Game, action: str):
+    """Record that a game in the lobby was created, joined or started.
+
+    Runs once the surrounding transaction commits, so readers never see
+    a version for state that was rolled back.
+    """
+
+    def publish():
+        versions.bump(LOBBY_GROUP)
+        row = lobby_row(Game.objects.with_player_count().get(pk=game.pk))
+        async_to_sync(get_channel_layer().group_send)(
+            LOBBY_GROUP,
+            lobby_update_payload(
+                action, row, render_to_string("lobby_row.html", {"game": row})
+            ),
+        )
+
+    transaction.on_commit(publish)
+
+
+def closed(game_pk: int):
+    """Record that a game left the lobby without starting, i.e. it was abandoned."""
+
+    def publish():
+        versions.bump(LOBBY_GROUP)
+        async_to_sync(get_channel_layer().group_send)(
+            LOBBY_GROUP, lobby_update_payload("closed", {"pk": game_pk})
+        )
+
+    transaction.on_commit(publish)
+
+
+def changed_many():
+    """Record that a batch of games was created, or started, at once.
+
+    The rows aren't pushed one by one, the next lobby load picks them up.
+    """
+
+    transaction.on_commit(lambda: versions.bump(LOBBY_GROUP))
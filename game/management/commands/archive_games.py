@@ -0,0 +1,48 @@
+"""
+archive_games.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Move finished games into the archive.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from game.archive import archive_finished
+
+
+class Command(BaseCommand):
+    help = "Move finished games, and their players, deck and hands, into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=0,
+            metavar="MINUTES",
+            help="Only archive games finished at least this long ago.",
+        )
+        parser.add_argument(
+            "--every",
+            type=int,
+            metavar="SECONDS",
+            help="Keep running, archiving again every SECONDS.",
+        )
+
+    def handle(self, *args, batch_size, older_than, every, **options):
+        while True:
+            total = 0
+            cutoff = timezone.now() - timedelta(minutes=older_than)
+            while archived := archive_finished(batch_size, finished_before=cutoff):
+                total += archived
+
+            self.stdout.write(f"Archived {total} games.")
+            if every is None:
+                return
+
+            time.sleep(every)
@@ -0,0 +1,46 @@
+"""
+export_games.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Export the game history as NDJSON.
+"""
+
+import contextlib
+import sys
+
+from django.core.management.base import BaseCommand
+
+from game import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every game, live and archived, with its players, hands and deck "
+        "as NDJSON, streamed from the database in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output", default="-", help="The file to write, stdout by default."
+        )
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--finished", action="store_true", help="Leave out games still being played."
+        )
+
+    def handle(self, *args, output, gzip, chunk_size, finished, **options):
+        chunks = export.ndjson(export.records(chunk_size, finished_only=finished))
+        if gzip:
+            chunks = export.gzipped(chunks)
+
+        written = 0
+        with contextlib.ExitStack() as stack:
+            out = sys.stdout.buffer if output == "-" else stack.enter_context(open(output, "wb"))
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+
+        if output != "-":
+            self.stdout.write(f"Wrote {written} bytes to {output}.")
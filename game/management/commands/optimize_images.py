@@ -0,0 +1,79 @@
+"""
+optimize_images.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Write the AVIF and WebP variants of the static images.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import features
+
+from game import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Write AVIF and WebP variants of the static images at several widths, "
+        "with content hashed names and a manifest, and report the bytes saved."
+    )
+
+    def add_arguments(self, parser):
+        config = settings.GAME_IMAGES
+        parser.add_argument("--source", type=Path, default=config["SOURCE"])
+        parser.add_argument("--output", type=Path, default=config["OUTPUT"])
+        parser.add_argument(
+            "--width",
+            type=int,
+            action="append",
+            dest="widths",
+            help="A width to write, repeatable. GAME_IMAGES['WIDTHS'] by default.",
+        )
+
+    def handle(self, *args, source, output, widths, **options):
+        config = settings.GAME_IMAGES
+        # Pillow only writes AVIF if it was built with libavif, 11.2 on in the wheels.
+        formats = {}
+        for format_, quality in config["FORMATS"].items():
+            if features.check(format_):
+                formats[format_] = quality
+            else:
+                self.stderr.write(f"Skipping {format_}, this Pillow can't write it.")
+        manifest = images.optimize(
+            source, output, widths or config["WIDTHS"], formats, config["SPRITES"]
+        )
+
+        # What a browser showing the image at its largest fetches, per format.
+        before, after = 0, dict.fromkeys(formats, 0)
+        written = files = 0
+        for name, entry in manifest["images"].items():
+            before += entry["bytes"]
+            largest = {}
+            for format_, variants in entry["variants"].items():
+                largest[format_] = variants[-1][2]
+                after[format_] += variants[-1][2]
+                written += sum(size for _, _, size in variants)
+                files += len(variants)
+            self.stdout.write(
+                f"{name}: {entry['bytes']:,} bytes -> "
+                + ", ".join(f"{format_} {size:,}" for format_, size in largest.items())
+            )
+
+        self.stdout.write(f"Originals: {before:,} bytes in {len(manifest['images'])} images.")
+        for format_, total in after.items():
+            self.stdout.write(
+                f"Largest {format_}: {total:,} bytes ({total / max(before, 1):.0%})."
+            )
+
+        for sprite, entry in manifest["sprites"].items():
+            self.stdout.write(
+                f"{sprite} sprite: {entry['frames']} images, {entry['bytes']:,} bytes -> "
+                + ", ".join(f"{format_} {size:,}" for format_, (_, size) in entry["atlas"].items())
+            )
+            written += sum(size for _, size in entry["atlas"].values())
+            files += len(entry["atlas"])
+
+        self.stdout.write(f"Wrote {files} files, {written:,} bytes, to {output}.")
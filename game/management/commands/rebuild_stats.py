@@ -0,0 +1,31 @@
+"""
+rebuild_stats.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Recompute the player stats from history.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every player's wins, games, eliminations and cards played "
+        "from the live and archived games, a chunk of games at a time. "
+        "Runs in one transaction, so the leaderboard never shows a half-built table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, chunk_size, **options):
+        start = time.perf_counter()
+        games = rebuild(chunk_size)
+        self.stdout.write(
+            f"Rebuilt the stats from {games} games in {time.perf_counter() - start:.1f}s."
+        )
@@ -0,0 +1,67 @@
+"""
+run_bots.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Generate load with games played only by bots.
+"""
+
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from game import events, timers
+from game.bots import bots
+
+
+class Command(BaseCommand):
+    help = (
+        "Start games played only by bots and drive them from the timer wheel, "
+        "like a worker would, reporting the throughput and CPU cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=100)
+        parser.add_argument("--players", type=int, default=4)
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=60,
+            metavar="SECONDS",
+            help="Stop after this long, even if games are still going.",
+        )
+        parser.add_argument(
+            "--click-delay",
+            type=float,
+            help="Seconds between a bot's clicks, GAME_BOTS['CLICK_DELAY'] by default.",
+        )
+
+    def handle(self, *args, games, players, duration, click_delay, **options):
+        if click_delay is not None:
+            bots.click_delay = click_delay
+
+        game_pks = [bots.start_game(players).pk for _ in range(games)]
+        self.stdout.write(f"Started {games} games of {players} bots.")
+
+        cpu, wall = time.process_time(), time.perf_counter()
+        asyncio.run(self.drive(game_pks, duration))
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        events.log.flush()
+
+        clicks = bots.stats["clicks"]
+        self.stdout.write(
+            f"{clicks} clicks, {bots.stats['turns']} turns and "
+            f"{bots.stats['games']} finished games in {wall:.1f}s"
+        )
+        self.stdout.write(
+            f"{clicks / wall:.0f} clicks/s, {cpu / wall:.0%} of a CPU, "
+            f"{cpu / max(clicks, 1) * 1e3:.2f} ms CPU/click"
+        )
+
+    async def drive(self, game_pks: list[int], duration: float):
+        wheel = asyncio.create_task(timers.wheel.run())
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline and any(bots.players(pk) for pk in game_pks):
+            await asyncio.sleep(0.5)
+        wheel.cancel()
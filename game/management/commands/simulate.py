@@ -0,0 +1,133 @@
+"""
+simulate.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Simulate games to balance the deck and pop odds.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import Card
+
+
+class Command(BaseCommand):
+    help = (
+        "Play simulated games with the card catalog and report who wins, "
+        "who goes out when, and how long games last. Needs NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=1_000_000)
+        parser.add_argument("--players", type=int, default=4)
+        parser.add_argument("--deck-size", type=int, default=500)
+        parser.add_argument("--chance-to-draw", type=int, default=75)
+        parser.add_argument(
+            "--pop-max",
+            type=int,
+            default=100,
+            help="Clicks between pops are uniform in 1..POP_MAX.",
+        )
+        parser.add_argument(
+            "--max-clicks",
+            type=int,
+            default=5,
+            help="Players click a uniform 1..MAX_CLICKS times a turn.",
+        )
+        parser.add_argument(
+            "--play-chance",
+            type=float,
+            default=0.5,
+            help="Chance a player holding cards plays one at the start of their turn.",
+        )
+        parser.add_argument(
+            "--weighted",
+            action="store_true",
+            help="Pick deck cards weighted by rarity. The game picks them uniformly today.",
+        )
+        parser.add_argument(
+            "--card",
+            action="append",
+            default=[],
+            metavar="EFFECT=RARITY",
+            help="Use these cards instead of the catalog in the database.",
+        )
+        parser.add_argument("--processes", type=int)
+        parser.add_argument("--chunk", type=int, default=20_000)
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+
+            from game.simulation import Rules, run
+        except ImportError:
+            raise CommandError(
+                "The simulator needs NumPy: pip install 'pop-goes-the-corn[simulation]'"
+            )
+
+        if options["card"]:
+            catalog = []
+            for card in options["card"]:
+                effect, _, rarity = card.partition("=")
+                catalog.append((effect, int(rarity or 1)))
+        else:
+            catalog = list(Card.objects.values_list("effect", "rarity"))
+
+        effects = [effect for effect, _ in catalog]
+        rarities = [rarity for _, rarity in catalog]
+        rules = Rules(
+            players=options["players"],
+            deck_size=options["deck_size"],
+            chance_to_draw=options["chance_to_draw"],
+            pop_max=options["pop_max"],
+            max_clicks=options["max_clicks"],
+            play_chance=options["play_chance"],
+            weighted=options["weighted"],
+        )
+        games = options["games"]
+
+        start = time.perf_counter()
+        results = run(
+            effects,
+            rarities,
+            rules,
+            games,
+            processes=options["processes"],
+            chunk=options["chunk"],
+            seed=options["seed"],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"{games} games in {elapsed:.1f}s\n")
+
+        places = results["places"]
+        self.stdout.write("Finishing place by seat (%, place 1 won):")
+        self.stdout.write(
+            "seat  " + "".join(f"{p + 1:>8}" for p in range(rules.players))
+        )
+        for seat, row in enumerate(places):
+            self.stdout.write(
+                f"{seat + 1:<6}" + "".join(f"{c / games:>8.1%}" for c in row)
+            )
+
+        lengths = results["lengths"]
+        cumulative = np.cumsum(lengths) / games
+        percentiles = [int(np.searchsorted(cumulative, q)) for q in (0.5, 0.9, 0.99)]
+        mean = (np.arange(len(lengths)) * lengths).sum() / games
+        self.stdout.write(
+            f"\nClicks per game: mean {mean:.1f}, p50 {percentiles[0]}, "
+            f"p90 {percentiles[1]}, p99 {percentiles[2]}"
+        )
+        self.stdout.write(f"Turns per game: mean {results['turns'] / games:.1f}")
+
+        if effects:
+            self.stdout.write("\nCards per game (drawn / played):")
+            for effect, drawn, played in zip(
+                effects, results["drawn"], results["played"]
+            ):
+                self.stdout.write(
+                    f"{effect:<28}{drawn / games:>8.2f}{played / games:>8.2f}"
+                )
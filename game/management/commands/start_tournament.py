@@ -0,0 +1,45 @@
+"""
+start_tournament.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Start a tournament.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from game import tournaments
+from game.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a tournament between the players with the given emails, "
+        "creating and starting every game of the first round at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name")
+        parser.add_argument("emails", nargs="+", metavar="email")
+        parser.add_argument("--game-size", type=int, default=4)
+        parser.add_argument("--deck-size", type=int, default=500)
+
+    def handle(self, *args, name, emails, game_size, deck_size, **options):
+        emails = list(dict.fromkeys(emails))
+        users = User.objects.in_bulk(emails, field_name="email")
+        if missing := [email for email in emails if email not in users]:
+            raise CommandError(f"No players with the emails: {', '.join(missing)}")
+
+        try:
+            tournament = tournaments.start(
+                name, [users[email] for email in emails], game_size, deck_size
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        games = tournament.entries.exclude(game=None).count()
+        self.stdout.write(
+            f"Started {tournament} with {games} games: "
+            f"{reverse('tournament', args=[tournament.pk])}"
+        )
@@ -0,0 +1,102 @@
+"""
+matchmaking.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Matchmaking
+
+Players waiting for a game sit in this worker's queue, in the order they
+asked. Every `TICK` seconds the queue is cut into groups of `GAME_SIZE` and
+all of the tick's games, their players and their decks are created with bulk
+inserts in one transaction, so a wave of players costs a handful of queries
+rather than a game creation each. Each player's socket is then told which
+game they are in.
+"""
+
+import threading
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from game.models import Deck, Game, User
+
+
+def matched_payload(game_pk: int):
+    return {"type": "matched", "game": game_pk, "url": reverse("detail", args=[game_pk])}
+
+
+class MatchmakingQueue:
+    """
+    # MatchmakingQueue.
+
+    Thread safe, since sockets join and leave on the event loop
+    while the games are created in a worker thread.
+    """
+
+    def __init__(self, game_size: int):
+        self.game_size = game_size
+        self._lock = threading.Lock()
+        # channel name -> user pk, in the order they joined.
+        self._waiting: dict[str, int] = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._waiting)
+
+    def join(self, channel_name: str, user_pk: int):
+        with self._lock:
+            # A player waits once, however many tabs they have open.
+            if user_pk not in self._waiting.values():
+                self._waiting[channel_name] = user_pk
+
+    def leave(self, channel_name: str):
+        with self._lock:
+            self._waiting.pop(channel_name, None)
+
+    def take(self) -> list[list[tuple[str, int]]]:
+        """Take every full group of waiting players off the front of the queue."""
+
+        with self._lock:
+            waiting = list(self._waiting.items())
+            full = len(waiting) - len(waiting) % self.game_size
+            for channel_name, _ in waiting[:full]:
+                del self._waiting[channel_name]
+
+        return [
+            waiting[start : start + self.game_size]
+            for start in range(0, full, self.game_size)
+        ]
+
+
+def create_games(groups: list[list[int]], deck_size: int) -> list[Game]:
+    """Create a game, with its players and deck, for each group of user pks."""
+
+    users = User.objects.in_bulk([pk for group in groups for pk in group])
+    with transaction.atomic():
+        games = Game.objects.create_with_players(
+            [[users[pk] for pk in group] for group in groups]
+        )
+        Deck.objects.create_for_games(games, deck_size)
+    return games
+
+
+queue = MatchmakingQueue(settings.GAME_MATCHMAKING["GAME_SIZE"])
+
+
+async def tick():
+    """Seat every full group of waiting players and tell them where to go."""
+
+    if not (groups := queue.take()):
+        return
+
+    games = await database_sync_to_async(create_games)(
+        [[user_pk for _, user_pk in group] for group in groups],
+        settings.GAME_MATCHMAKING["DECK_SIZE"],
+    )
+    layer = get_channel_layer()
+    for game, group in zip(games, groups):
+        for channel_name, _ in group:
+            await layer.send(channel_name, matched_payload(game.pk))
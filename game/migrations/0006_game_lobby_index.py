@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0005_game_chance_to_draw'),
+    )
+
+    operations = (
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['started_at', 'id'], name='game_game_started_07f5fb_idx'),
+        ),
+    )
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0006_game_lobby_index'),
+    )
+
+    operations = (
+        migrations.CreateModel(
+            name='GameEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('join', 'Join'), ('start', 'Start'), ('click', 'Click'), ('draw', 'Draw'), ('play', 'Play'), ('kill', 'Kill'), ('end_turn', 'End Turn')], max_length=16)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='game.game')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('game', 'seq'), name='gameevent_game_seq_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('state', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='game.game')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('game', 'seq'), name='gamesnapshot_game_seq_unique')],
+            },
+        ),
+    )
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0007_game_event_log'),
+    )
+
+    operations = (
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    )
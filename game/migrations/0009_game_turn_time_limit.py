@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:11
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0008_archived_game'),
+    )
+
+    operations = (
+        migrations.AddField(
+            model_name='game',
+            name='turn_time_limit',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(5)]),
+        ),
+    )
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:36
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0009_game_turn_time_limit'),
+    )
+
+    operations = (
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('game_size', models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(2)])),
+                ('deck_size', models.PositiveSmallIntegerField(default=500)),
+                ('round', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournaments_won', to='game.user')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TournamentGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField()),
+                ('position', models.PositiveSmallIntegerField()),
+                ('game', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tournament_entry', to='game.game')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='game.tournament')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tournament', 'round', 'position'), name='tournamentgame_round_position_unique')],
+            },
+        ),
+    )
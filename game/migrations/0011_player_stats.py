@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0010_tournaments'),
+    )
+
+    operations = (
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='game.user')),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('eliminations', models.PositiveIntegerField(default=0)),
+                ('cards_played', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-wins', 'user'], name='playerstats_ranking_idx')],
+            },
+        ),
+    )
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+def collapse_hands(apps, schema_editor):
+    """Fold the rows of each (user, game, card) into its first, counting them."""
+
+    Hand = apps.get_model("game", "Hand")
+    groups = (
+        Hand.objects.values("user", "game", "card")
+        .annotate(first=models.Min("pk"), count=models.Count("pk"))
+    )
+    Hand.objects.bulk_update(
+        [Hand(pk=g["first"], quantity=g["count"]) for g in groups.filter(count__gt=1)],
+        ["quantity"],
+        batch_size=500,
+    )
+    Hand.objects.exclude(pk__in=groups.values("first")).delete()
+
+
+def expand_hands(apps, schema_editor):
+    """Back to a row per card held."""
+
+    Hand = apps.get_model("game", "Hand")
+    Hand.objects.filter(quantity=0).delete()
+    Hand.objects.bulk_create(
+        [
+            Hand(user_id=hand.user_id, game_id=hand.game_id, card_id=hand.card_id)
+            for hand in Hand.objects.filter(quantity__gt=1).iterator()
+            for _ in range(hand.quantity - 1)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0011_player_stats'),
+    )
+
+    operations = (
+        migrations.RemoveIndex(
+            model_name='hand',
+            name='game_hand_user_id_120c99_idx',
+        ),
+        migrations.AddField(
+            model_name='hand',
+            name='quantity',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.RunPython(collapse_hands, expand_hands),
+        migrations.AddConstraint(
+            model_name='hand',
+            constraint=models.UniqueConstraint(fields=('user', 'game', 'card'), name='hand_user_game_card_unique'),
+        ),
+    )
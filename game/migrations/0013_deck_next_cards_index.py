@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0012_hand_quantity'),
+    )
+
+    operations = (
+        migrations.AddIndex(
+            model_name='deck',
+            index=models.Index(condition=models.Q(('is_played', False)), fields=['game', 'placement'], name='deck_next_cards_idx'),
+        ),
+    )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_byes(apps, schema_editor):
+    """Until now, a slot without a game was a bye."""
+
+    TournamentGame = apps.get_model("game", "TournamentGame")
+    TournamentGame.objects.filter(game__isnull=True).update(bye=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = (
+        ('game', '0013_deck_next_cards_index'),
+    )
+
+    operations = (
+        migrations.AddField(
+            model_name='tournamentgame',
+            name='bye',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_byes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tournamentgame',
+            name='game',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournament_entry', to='game.game'),
+        ),
+    )
@@ -6,14 +6,17 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Game Models
 """
 
+import itertools
 import random
 from typing import TYPE_CHECKING
 
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
 from django.db.transaction import atomic
 from django.utils import timezone
 
+from game import versions
+
 if TYPE_CHECKING:
     from django.db.models.manager import RelatedManager
 
@@ -53,6 +56,19 @@ class Card(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Save the card, and have its rendered fragment dropped."""
+        from game import cards
+
+        super().save(*args, **kwargs)
+        versions.bump_on_commit(cards.CATALOG)
+
+    def delete(self, *args, **kwargs):
+        from game import cards
+
+        versions.bump_on_commit(cards.CATALOG)
+        return super().delete(*args, **kwargs)
+
     def do_effect(self, game: "Game") -> str:
         """Execute the given effect."""
 
@@ -64,24 +80,134 @@ class Card(models.Model):
 class GameQuerySet(models.QuerySet["Game"]):
     """Custom Queryset for the Game."""
 
+    def finished(self):
+        """Filter the games to include only those that are over."""
+
+        return self.filter(finished_at__isnull=False)
+
+    def get_including_archived(self, pk: int) -> "Game":
+        """Get a game by pk, falling back to the archive if it was archived."""
+
+        try:
+            return self.get(pk=pk)
+        except self.model.DoesNotExist:
+            try:
+                return ArchivedGame.objects.get(pk=pk).restore()
+            except ArchivedGame.DoesNotExist:
+                raise self.model.DoesNotExist(f"Game {pk} does not exist.") from None
+
     def not_started(self):
-        """Filter the games to include only those that have not yet finished."""
+        """Filter the games to include only those that have not yet started (or been abandoned)."""
 
-        return self.filter(started_at__isnull=True)
+        return self.filter(started_at__isnull=True, finished_at__isnull=True)
+
+    def in_progress(self):
+        """Filter the games to include only those being played."""
+
+        return self.filter(started_at__isnull=False, finished_at__isnull=True)
 
     def with_player_count(self):
         """Annotate the game to include the player count."""
 
         return self.annotate(player_count=models.Count("players"))
 
-    def create_with_player(self, user: "User"):
+    def with_players(self):
+        """Prefetch the players, and their users, in join order."""
+
+        return self.prefetch_related(
+            models.Prefetch(
+                "players", queryset=UserGame.objects.select_related("user").order_by("pk")
+            )
+        )
+
+    def create_with_player(self, user: "User", **fields):
         """Create a game with the given user as the first player."""
 
-        game = self.create()
+        from game import events, lobby
+
+        game = self.create(**fields)
         game.players.create(user=user, is_active=True, next_player=None)
+        lobby.changed(game, "created")
+        events.log.record(game.pk, GameEvent.Kind.JOIN, user=user.pk)
 
         return game
 
+    @atomic
+    def create_with_players(self, groups: "list[list[User]]", **fields) -> "list[Game]":
+        """Create a game for each group of users, seated in order, with bulk inserts.
+
+        The players are linked like they had joined one after another, the
+        first is active. Costs a few queries however many games there are.
+        """
+
+        from game import events, lobby
+
+        games = self.bulk_create([self.model(**fields) for _ in groups])
+        players = UserGame.objects.bulk_create(
+            [
+                UserGame(user=user, game=game, is_active=i == 0)
+                for game, users in zip(games, groups)
+                for i, user in enumerate(users)
+            ]
+        )
+
+        seated = iter(players)
+        linked = []
+        for users in groups:
+            group = [next(seated) for _ in users]
+            for player, next_player in itertools.pairwise(group):
+                player.next_player = next_player
+                linked.append(player)
+        UserGame.objects.bulk_update(linked, ["next_player"])
+
+        events.log.created([game.pk for game in games])
+        for player in players:
+            events.log.record(player.game_id, GameEvent.Kind.JOIN, user=player.user_id)
+        lobby.changed_many()
+
+        return games
+
+    @atomic
+    def start_many(self, games: "list[Game]") -> "list[Game]":
+        """Start every given game like `Game.start`, with bulk updates.
+
+        Costs a few queries however many games there are.
+        """
+
+        from game import events, lobby
+
+        by_pk = {game.pk: game for game in games}
+        players = UserGame.objects.filter(game__in=games)
+        counts = dict(
+            players.values("game").annotate(n=models.Count("pk")).values_list("game", "n")
+        )
+        first = {p.game_id: p.pk for p in players.filter(is_active=True).only("game")}
+
+        # Close each loop of players, like `Game.start`.
+        last = list(players.filter(next_player__isnull=True).only("game"))
+        for player in last:
+            player.next_player_id = first[player.game_id]
+        UserGame.objects.bulk_update(last, ["next_player"])
+
+        now = timezone.now()
+        for game in by_pk.values():
+            game.until_next_pop = random.randint(1, 100)
+            game.pops_left = counts[game.pk] - 1
+            game.started_at = now
+        self.bulk_update(by_pk.values(), ["started_at", "until_next_pop", "pops_left"])
+
+        lobby.changed_many()
+        for game in by_pk.values():
+            versions.bump_on_commit(versions.game_key(game.pk))
+            events.log.record(
+                game.pk,
+                GameEvent.Kind.START,
+                pops_left=game.pops_left,
+                until_next_pop=game.until_next_pop,
+            )
+
+        return games
+
 
 class Game(models.Model):
     """
@@ -103,9 +229,16 @@ class Game(models.Model):
     chance_to_draw = models.SmallIntegerField(
         default=75, validators=[MinValueValidator(1), MaxValueValidator(100)]
     )
+    # Seconds a player has before their turn is ended for them, None for no limit.
+    turn_time_limit = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(5)]
+    )
 
     objects: GameQuerySet = GameQuerySet.as_manager()
 
+    class Meta:
+        indexes = (models.Index(fields=["started_at", "id"]),)
+
     deck_cards: "RelatedManager[Deck]"
     players: "RelatedManager[UserGame]"
 
@@ -122,16 +255,24 @@ class Game(models.Model):
 
     def join(self, email: str):
         """Have a player with the given email join the game."""
+        from game import events, lobby
+
         last_player = UserGame.objects.get_last_player_for_game(self).get()
         player = self.players.create(
             user=User.objects.get_by_email(email), is_active=False
         )
         last_player.next_player = player
         last_player.save(update_fields=["next_player"])
+        lobby.changed(self, "joined")
+        versions.bump_on_commit(versions.game_key(self.pk))
+        events.log.record(self.pk, GameEvent.Kind.JOIN, user=player.user_id)
+
+        return player
 
     @atomic
     def start(self):
         """Start a new game."""
+        from game import events, lobby
 
         # This will close the loop for the players so we have an actual circle
         self.until_next_pop = random.randint(1, 100)
@@ -142,30 +283,77 @@ class Game(models.Model):
         self.started_at = timezone.now()
         last_player.save()
         self.save(update_fields=["started_at", "until_next_pop", "pops_left"])
+        lobby.changed(self, "started")
+        versions.bump_on_commit(versions.game_key(self.pk))
+        events.log.record(
+            self.pk,
+            GameEvent.Kind.START,
+            pops_left=self.pops_left,
+            until_next_pop=self.until_next_pop,
+        )
 
     @atomic
     def click(self) -> bool:
-        """Apply a click to the corn kernel."""
+        """Apply a click to the corn kernel.
+
+        When the kernel pops the countdown to the next pop starts over.
+        """
+        from game import events
 
         popped = False
         self.until_next_pop -= 1
         if self.until_next_pop == 0:
             self.pops_left -= 1
+            self.until_next_pop = random.randint(1, 100)
             popped = True
 
         self.save()
+        events.log.record(
+            self.pk,
+            GameEvent.Kind.CLICK,
+            popped=popped,
+            pops_left=self.pops_left,
+            until_next_pop=self.until_next_pop,
+        )
         return popped
 
+    def finish(self):
+        """Mark the game as over, counting it in its players' stats if it was played out."""
+
+        self.finished_at = timezone.now()
+        self.save(update_fields=["finished_at"])
+
+        if self.started_at and self.pops_left == 0:
+            players = list(self.players.values_list("user_id", "killed_at"))
+            PlayerStats.objects.add([user for user, _ in players], games=1)
+            PlayerStats.objects.add(
+                [user for user, killed_at in players if killed_at is None], wins=1
+            )
+
     @atomic
     def advance_turn(self, email: str):
-        """Advance the game to the start of the next player's turn."""
+        """Advance the game to the start of the next player's turn.
+
+        Killed players stay in the turn order, but their turns are skipped.
+        """
+        from game import events
 
         current_player = UserGame.objects.for_game(self).for_user(email).get()
-        current_player.next_player.is_active = True
+        next_player = current_player.next_player
+        while next_player.killed_at is not None and next_player.pk != current_player.pk:
+            next_player = next_player.next_player
         current_player.is_active = False
+        next_player.is_active = True
         current_player.save(update_fields=["is_active"])
-        current_player.next_player.save(update_fields=["is_active"])
+        next_player.save(update_fields=["is_active"])
         self.save()
+        versions.bump_on_commit(versions.game_key(self.pk))
+        events.log.record(
+            self.pk,
+            GameEvent.Kind.END_TURN,
+            user=current_player.user_id,
+            next=next_player.user_id,
+        )
 
 
 class UserQuerySet(models.QuerySet["User"]):
@@ -194,6 +382,56 @@ class User(models.Model):
         return self.display_name
 
 
+class PlayerStatsQuerySet(models.QuerySet["PlayerStats"]):
+    """Custom Queryset for the PlayerStats."""
+
+    def add(self, users: list[int], **counts: int):
+        """Add to the counters of the given users (pks) in place, with F() increments.
+
+        Users without a row yet get one first.
+        """
+
+        if not users:
+            return
+
+        self.bulk_create([self.model(user_id=pk) for pk in users], ignore_conflicts=True)
+        self.filter(user_id__in=users).update(
+            **{field: models.F(field) + count for field, count in counts.items()}
+        )
+
+    def leaderboard(self):
+        """Order by wins, most first, which the ranking index serves as is."""
+
+        return self.select_related("user").order_by("-wins", "user")
+
+
+class PlayerStats(models.Model):
+    """
+    # PlayerStats.
+
+    A player's running totals, kept up to date as games are played
+    (see `Game.finish`, `UserGame.kill` and `Hand.remove_played_card`)
+    so the leaderboard never aggregates over history.
+    `manage.py rebuild_stats` recomputes them from history.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    games = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    # Times the player was knocked out of a game.
+    eliminations = models.PositiveIntegerField(default=0)
+    cards_played = models.PositiveIntegerField(default=0)
+
+    objects: PlayerStatsQuerySet = PlayerStatsQuerySet.as_manager()
+
+    COUNTERS = ("games", "wins", "eliminations", "cards_played")
+
+    class Meta:
+        indexes = (models.Index(fields=["-wins", "user"], name="playerstats_ranking_idx"),)
+
+
 class UserGameQuerySet(models.QuerySet["UserGame"]):
     """Custom Queryset for the UserGame."""
 
@@ -265,9 +503,13 @@ class UserGame(models.Model):
     @atomic
     def kill(self):
         """Kill the given player."""
+        from game import events
+
         self.killed_at = timezone.now()
-        self.prev_player = self.next_player
         self.save()
+        PlayerStats.objects.add([self.user_id], eliminations=1)
+        versions.bump_on_commit(versions.game_key(self.game_id))
+        events.log.record(self.game_id, GameEvent.Kind.KILL, user=self.user_id)
 
 
 class DeckQuerySet(models.QuerySet["Deck"]):
@@ -276,10 +518,23 @@ class DeckQuerySet(models.QuerySet["Deck"]):
     def create_for_game(self, game: Game, size: int):
         """Create a deck for the given game with the given size."""
 
-        if Card.objects.count() > 1:
-            for i in range(1, size + 1):
-                card = Card.objects.get_random_card()
-                self.create(game=game, card=card, placement=i)
+        self.create_for_games([game], size)
+
+    def create_for_games(self, games: list[Game], size: int):
+        """Create a deck of the given size for each game, in bulk.
+
+        Every card is picked uniformly from the catalog.
+        """
+
+        card_pks = list(Card.objects.values_list("pk", flat=True))
+        if len(card_pks) > 1:
+            self.bulk_create(
+                [
+                    self.model(game=game, card_id=random.choice(card_pks), placement=i)
+                    for game in games
+                    for i in range(1, size + 1)
+                ]
+            )
 
     def for_game(self, game: Game):
         """Filter to only include those with the given game."""
@@ -301,16 +556,37 @@ class DeckQuerySet(models.QuerySet["Deck"]):
     def order_by_placement(self):
         return self.order_by("-placement")
 
+    def peek(self, game: Game, k: int):
+        """The next `k` cards to be drawn in the game, in order, with their cards.
+
+        One range read of the partial (game, placement) index of undrawn cards.
+        """
+
+        return (
+            self.for_game(game)
+            .filter(is_played=False)
+            .order_by("placement")
+            .select_related("card")[:k]
+        )
+
     def get_drawn_card_for_game(self, game: Game):
         """Potentially draw a card, given the game's random chance."""
 
         chance = game.chance_to_draw
         if random.randint(1, 100) < chance:
-            deck_card = self.for_game(game).order_by_placement().earliest("-placement")
-            deck_card.is_played = True
-            deck_card.save(update_fields=["is_played"])
+            deck_card = (
+                self.for_game(game)
+                .filter(is_played=False)
+                .select_related("card")
+                .order_by("placement")
+                .first()
+            )
+            if deck_card is not None:
+                deck_card.is_played = True
+                deck_card.save(update_fields=["is_played"])
+                return deck_card.card
 
-        return deck_card.card
+        return None
 
 
 class Deck(models.Model):
@@ -333,7 +609,16 @@ class Deck(models.Model):
     objects: DeckQuerySet = DeckQuerySet.as_manager()
 
     class Meta:
-        indexes = [models.Index(fields=["card", "game"])]
+        indexes = (
+            models.Index(fields=["card", "game"]),
+            # The undrawn cards of a game in order, for drawing and peeking.
+            # Partial, since SQLite can't seek `NOT is_played` in a composite index.
+            models.Index(
+                fields=["game", "placement"],
+                condition=models.Q(is_played=False),
+                name="deck_next_cards_idx",
+            ),
+        )
 
 
 class HandQuerySet(models.QuerySet["Hand"]):
@@ -354,14 +639,60 @@ class HandQuerySet(models.QuerySet["Hand"]):
 
         return self.filter(card=card)
 
-    def add_drawn_card(self, card: Card, email: str, game: Game):
-        """Add the given card to the user's hand for the given game."""
+    def for_user(self, user: "User | int"):
+        """Filter to include those of the given user (or user pk)."""
+
+        return self.filter(user=user)
+
+    def held(self):
+        """Filter to include only the cards the player still holds.
+
+        Rows are kept at zero when the last of a card is played,
+        so drawing it again is an update.
+        """
+
+        return self.filter(quantity__gt=0)
+
+    def add_drawn_card(self, card: Card, user: "User | str", game: Game):
+        """Add one of the given card to the user's (or user email's) hand for the given game.
 
-        return self.create(
-            card=card,
-            user=models.Subquery(User.objects.filter(email=email))[0],
-            game=game,
+        A single upsert, the first of a card inserts its row and the rest add to it.
+        """
+        from game import events
+
+        if isinstance(user, str):
+            user = User.objects.get_by_email(user)
+
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, game_id, card_id, quantity)"
+                " VALUES (%s, %s, %s, 1)"
+                " ON CONFLICT (user_id, game_id, card_id)"
+                f" DO UPDATE SET quantity = {table}.quantity + 1",
+                [user.pk, game.pk, card.pk],
+            )
+        events.log.record(game.pk, GameEvent.Kind.DRAW, user=user.pk, card=card.pk)
+
+    def remove_played_card(self, card_pk: int, user: "User | int", game: Game):
+        """Take one of the given card out of the user's hand. None if they don't hold it."""
+        from game import events
+
+        played = (
+            self.for_game(game)
+            .for_user(user)
+            .held()
+            .filter(card_id=card_pk)
+            .update(quantity=models.F("quantity") - 1)
         )
+        if not played:
+            return None
+
+        user_pk = user if isinstance(user, int) else user.pk
+        PlayerStats.objects.add([user_pk], cards_played=1)
+        events.log.record(game.pk, GameEvent.Kind.PLAY, user=user_pk, card=card_pk)
+        return Card.objects.get(pk=card_pk)
 
 
 class Hand(models.Model):
@@ -370,13 +701,233 @@ class Hand(models.Model):
 
     The hand model represets a particular player's hand.
     This is used to display their cards, among other things.
+    There is one row per card a player holds, with how many of it.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="hand")
     card = models.ForeignKey(Card, on_delete=models.DO_NOTHING)
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    quantity = models.PositiveSmallIntegerField(default=1)
 
     objects: HandQuerySet = HandQuerySet.as_manager()
 
     class Meta:
-        indexes = [models.Index(fields=["user", "game"])]
+        # Also serves the (user, game) lookups of rendering a hand.
+        constraints = (
+            models.UniqueConstraint(
+                fields=["user", "game", "card"], name="hand_user_game_card_unique"
+            ),
+        )
+
+
+class GameEventQuerySet(models.QuerySet["GameEvent"]):
+    """Custom Queryset for the GameEvent."""
+
+    def for_game(self, game: Game | int):
+        """Filter to only include those with the given game (or game pk)."""
+        return self.filter(game=game)
+
+    def after(self, seq: int):
+        """Filter to only include those after the given sequence number, in order."""
+        return self.filter(seq__gt=seq).order_by("seq")
+
+
+class GameEvent(models.Model):
+    """
+    # GameEvent.
+
+    One entry in a game's append-only event log.
+    Events are numbered per game by `seq` and are never updated,
+    see `game/events.py` for how they are written and replayed.
+    """
+
+    class Kind(models.TextChoices):
+        JOIN = "join"
+        START = "start"
+        CLICK = "click"
+        DRAW = "draw"
+        PLAY = "play"
+        KILL = "kill"
+        END_TURN = "end_turn"
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="events")
+    seq = models.PositiveIntegerField()
+    kind = models.CharField(max_length=16, choices=Kind)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects: GameEventQuerySet = GameEventQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=["game", "seq"], name="gameevent_game_seq_unique"
+            ),
+        )
+
+
+class GameSnapshot(models.Model):
+    """
+    # GameSnapshot.
+
+    A compact copy of a game's replayed state as of event `seq`.
+    Rebuilding a game starts from its latest snapshot and
+    applies only the events after it.
+    """
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="snapshots")
+    seq = models.PositiveIntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=["game", "seq"], name="gamesnapshot_game_seq_unique"
+            ),
+        )
+
+
+class ArchivedGame(models.Model):
+    """
+    # ArchivedGame.
+
+    A finished game moved out of the hot tables.
+    The game, its players, deck, hands and event log are kept as one
+    compressed JSON document, see `game/archive.py`.
+    The primary key is the original game's pk.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.BinaryField()
+
+    def restore(self) -> Game:
+        """Rebuild the game, unsaved, with its related rows already loaded."""
+
+        from game import archive
+
+        return archive.restore(self)
+
+
+class Tournament(models.Model):
+    """
+    # Tournament.
+
+    A bracket of games played in rounds. Every game of a round is created and
+    started at once, and each game's winner goes through to the next round,
+    see `game/tournaments.py`.
+    """
+
+    name = models.CharField(max_length=100)
+    game_size = models.PositiveSmallIntegerField(
+        default=4, validators=[MinValueValidator(2)]
+    )
+    deck_size = models.PositiveSmallIntegerField(default=500)
+    # The round being played, rounds are numbered from 1.
+    round = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tournaments_won",
+    )
+
+    entries: "RelatedManager[TournamentGame]"
+
+    def __str__(self):
+        return self.name
+
+    @atomic
+    def create_round(self, round: int, groups: "list[list[User]]") -> "list[Game]":
+        """Create and start the round's games in bulk, one per group of players.
+
+        A group of one has a bye, they go through without playing.
+        """
+
+        playing = [group for group in groups if len(group) > 1]
+        games = Game.objects.create_with_players(playing)
+        Deck.objects.create_for_games(games, self.deck_size)
+        Game.objects.start_many(games)
+
+        seated = iter(games)
+        TournamentGame.objects.bulk_create(
+            [
+                TournamentGame(
+                    tournament=self,
+                    round=round,
+                    position=position,
+                    game=next(seated) if len(group) > 1 else None,
+                    bye=len(group) == 1,
+                    winner=None if len(group) > 1 else group[0],
+                )
+                for position, group in enumerate(groups)
+            ]
+        )
+        versions.bump_on_commit(versions.tournament_key(self.pk))
+
+        return games
+
+    def finish(self, winner: User):
+        """Mark the tournament as won."""
+
+        self.winner = winner
+        self.finished_at = timezone.now()
+        self.save(update_fields=["winner", "finished_at"])
+        versions.bump_on_commit(versions.tournament_key(self.pk))
+
+
+class TournamentGameQuerySet(models.QuerySet["TournamentGame"]):
+    """Custom Queryset for the TournamentGame."""
+
+    def for_round(self, tournament: Tournament | int, round: int):
+        """Filter to the given round of the tournament, in bracket order."""
+
+        return self.filter(tournament=tournament, round=round).order_by("position")
+
+    def undecided(self):
+        """Filter to include only the games without a winner yet."""
+
+        return self.filter(winner__isnull=True)
+
+
+class TournamentGame(models.Model):
+    """
+    # TournamentGame.
+
+    One slot of a tournament's bracket: a game of a round, or a bye,
+    which has no game and is won from the start. The slot and its winner
+    outlive the game, once the game is archived.
+    """
+
+    tournament = models.ForeignKey(
+        Tournament, on_delete=models.CASCADE, related_name="entries"
+    )
+    round = models.PositiveSmallIntegerField()
+    position = models.PositiveSmallIntegerField()
+    game = models.OneToOneField(
+        Game,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tournament_entry",
+    )
+    bye = models.BooleanField(default=False)
+    winner = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    objects: TournamentGameQuerySet = TournamentGameQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=["tournament", "round", "position"],
+                name="tournamentgame_round_position_unique",
+            ),
+        )
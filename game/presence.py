@@ -0,0 +1,70 @@
+"""
+presence.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Presence
+
+Tracks which sockets are connected to each game in this process and when
+each was last heard from. Clients send a heartbeat every
+`HEARTBEAT_INTERVAL` seconds, so a socket that has gone quiet for
+`IDLE_TIMEOUT` is treated as gone even if it never closed.
+"""
+
+import threading
+import time
+
+
+class Presence:
+    """
+    # Presence.
+
+    Thread safe, since sync consumers touch it from worker threads
+    while the housekeeping task reads it from the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sockets: dict[int, dict[str, float]] = {}
+        self._last_seen: dict[int, float] = {}
+
+    def touch(self, game_pk: int, channel_name: str, now: float | None = None):
+        """Record that a socket in the game was just heard from."""
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sockets.setdefault(game_pk, {})[channel_name] = now
+            self._last_seen[game_pk] = now
+
+    def leave(self, game_pk: int, channel_name: str, now: float | None = None):
+        """Record that a socket left the game. The game itself is remembered."""
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sockets.get(game_pk, {}).pop(channel_name, None)
+            self._last_seen[game_pk] = now
+
+    def count(self, game_pk: int) -> int:
+        """The number of sockets connected to the game."""
+
+        with self._lock:
+            return len(self._sockets.get(game_pk, {}))
+
+    def idle_games(self, timeout: float, now: float | None = None) -> list[int]:
+        """The games nobody has been heard from in `timeout` seconds."""
+
+        cutoff = (time.monotonic() if now is None else now) - timeout
+        with self._lock:
+            return [
+                game_pk
+                for game_pk, last_seen in self._last_seen.items()
+                if last_seen < cutoff
+            ]
+
+    def forget(self, game_pk: int):
+        with self._lock:
+            self._sockets.pop(game_pk, None)
+            self._last_seen.pop(game_pk, None)
+
+
+presence = Presence()
@@ -0,0 +1,78 @@
+"""
+resume.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Resumable Game Sockets
+
+Every broadcast to a game's players is numbered and kept in a bounded ring
+of the game's latest events. A client that loses its socket reconnects and
+presents the last number it saw. If the events it missed are still in the
+ring they are replayed to it alone, otherwise it gets a single `resync` with
+the game's current state. Either way it skips the page reload and `join`.
+
+Like the event log's sequence numbers, the ring lives in the worker that
+holds the game's websocket group.
+"""
+
+import threading
+from collections import deque
+
+from django.conf import settings
+
+
+class ResumeBuffer:
+    """
+    # ResumeBuffer.
+
+    The numbered recent broadcasts of each game on this worker.
+    Thread safe, since sync consumers broadcast from worker threads.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._rings: dict[int, deque[tuple[int, dict]]] = {}
+        self._seqs: dict[int, int] = {}
+
+    def append(self, game_pk: int, payload: dict) -> int:
+        """Number a broadcast and keep it, returning its sequence number."""
+
+        with self._lock:
+            seq = self._seqs.get(game_pk, 0) + 1
+            self._seqs[game_pk] = seq
+            ring = self._rings.get(game_pk)
+            if ring is None:
+                ring = self._rings[game_pk] = deque(maxlen=self.size)
+            ring.append((seq, payload))
+            return seq
+
+    def last(self, game_pk: int) -> int:
+        """The sequence number of the game's latest broadcast, 0 if none."""
+
+        with self._lock:
+            return self._seqs.get(game_pk, 0)
+
+    def since(self, game_pk: int, seq: int) -> list[dict] | None:
+        """The broadcasts after `seq`, or None if some of them are no longer kept.
+
+        A `seq` ahead of the game's latest one means the client saw another
+        worker (or this one before a restart), so it is too far behind as well.
+        """
+
+        with self._lock:
+            last = self._seqs.get(game_pk, 0)
+            if seq == last:
+                return []
+            ring = self._rings.get(game_pk)
+            if seq > last or not ring or ring[0][0] > seq + 1:
+                return None
+            return [payload | {"seq": s} for s, payload in ring if s > seq]
+
+    def forget(self, game_pk: int):
+        with self._lock:
+            self._rings.pop(game_pk, None)
+            self._seqs.pop(game_pk, None)
+
+
+recent = ResumeBuffer(settings.GAME_RESUME_BUFFER)
@@ -11,5 +11,11 @@ from django.urls import re_path
 from game import consumers
 
 websocket_patterns = [
-    re_path(r"^ws/game/(?P<pk>[0-9]+)/", consumers.GameWebsocketConsumer.as_asgi())
+    re_path(
+        r"^ws/game/(?P<pk>[0-9]+)/watch/",
+        consumers.SpectatorWebsocketConsumer.as_asgi(),
+    ),
+    re_path(r"^ws/game/(?P<pk>[0-9]+)/", consumers.GameWebsocketConsumer.as_asgi()),
+    re_path(r"^ws/lobby/", consumers.LobbyWebsocketConsumer.as_asgi()),
+    re_path(r"^ws/matchmaking/", consumers.MatchmakingWebsocketConsumer.as_asgi()),
 ]
@@ -0,0 +1,260 @@
+"""
+simulation.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Game Simulation
+
+Plays whole batches of games at once with NumPy, one array element per game,
+to see how the deck, `chance_to_draw` and the pop interval play out before
+changing them. It follows the real game:
+
+- A game starts with `until_next_pop` uniform in 1..POP_MAX and one pop per
+  player but the last, like `Game.start`.
+- Every click counts down `until_next_pop`. At zero the active player is out
+  and the countdown starts over, like `Game.click`. Otherwise the player
+  draws while the deck lasts if `randint(1, 100) < chance_to_draw`, like
+  `Deck.objects.get_drawn_card_for_game`.
+- Decks are built like `Deck.objects.create_for_game`, every card picked
+  uniformly from the catalog (or by rarity, to try rarity weights out).
+  Cards are independent, so each is picked when it is drawn.
+- The effects in `game/effects.py` that change the game are modelled below,
+  the ones that only tell the player something do nothing.
+
+Players click a uniform 1..MAX_CLICKS times a turn and, holding cards,
+play a random one at the start of their turn with PLAY_CHANCE.
+
+This module doesn't touch Django, so it runs as is in worker processes.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+# Games longer than this many clicks are counted in the last bin.
+MAX_LENGTH = 20_000
+
+
+@dataclass(frozen=True)
+class Rules:
+    players: int = 4
+    deck_size: int = 500
+    chance_to_draw: int = 75
+    pop_max: int = 100
+    max_clicks: int = 5
+    play_chance: float = 0.5
+    weighted: bool = False
+
+
+class Batch:
+    """
+    # Batch.
+
+    The state of the games of a batch still being played, one row per game.
+    Finished games are dropped, so every step works on dense arrays.
+    """
+
+    STATE = (
+        "until", "pops_left", "chance", "active", "alive", "drawn",
+        "hands", "skipped", "clicks", "turns", "out",
+    )
+
+    def __init__(self, rules: Rules, cards: int, games: int, rng: np.random.Generator):
+        n = rules.players
+        self.rules = rules
+        self.rng = rng
+        self.until = rng.integers(1, rules.pop_max + 1, games)
+        self.pops_left = np.full(games, n - 1)
+        self.chance = np.full(games, rules.chance_to_draw)
+        self.active = np.zeros(games, dtype=np.intp)
+        self.alive = np.ones((games, n), dtype=bool)
+        self.drawn = np.zeros(games, dtype=np.intp)
+        self.hands = np.zeros((games, n, cards), dtype=np.int16)
+        self.skipped = np.zeros(games, dtype=bool)
+        self.clicks = np.zeros(games, dtype=np.intp)
+        self.turns = np.zeros(games, dtype=np.intp)
+        self.out = np.zeros(games, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.until)
+
+    def keep(self, rows: np.ndarray):
+        for name in self.STATE:
+            setattr(self, name, getattr(self, name)[rows])
+
+    def cards_left(self, g: np.ndarray) -> np.ndarray:
+        return self.rules.deck_size - self.drawn[g]
+
+    def advance(self, g: np.ndarray):
+        """Pass the turn of the given games to their next player still in."""
+
+        n = self.rules.players
+        seats = (self.active[g, None] + np.arange(1, n + 1)) % n
+        first = self.alive[g[:, None], seats].argmax(axis=1)
+        self.active[g] = seats[np.arange(len(g)), first]
+        self.turns[g] += 1
+
+
+# Effects
+
+
+def skip(batch: Batch, g: np.ndarray):
+    batch.advance(g)
+    batch.skipped[g] = True
+
+
+def lucky_turn(batch: Batch, g: np.ndarray):
+    batch.chance[g] += 5
+
+
+def super_lucky_turn(batch: Batch, g: np.ndarray):
+    batch.chance[g] = 100
+
+
+def shuffle(batch: Batch, g: np.ndarray):
+    # randint(1, cards left), an empty deck can't be shuffled.
+    high = np.maximum(batch.cards_left(g), 1)
+    batch.until[g] = batch.rng.integers(1, high + 1)
+
+
+def delay_the_burnt(batch: Batch, g: np.ndarray):
+    batch.until[g] += np.where(batch.cards_left(g) > 5, 5, 0)
+
+
+def extended_delay_the_burnt(batch: Batch, g: np.ndarray):
+    left = batch.cards_left(g)
+    batch.until[g] += np.select(
+        [left > 20, left > 15, left > 10, left > 5], [20, 15, 10, 5], 0
+    )
+
+
+EFFECTS = {
+    "skip": skip,
+    "lucky_turn": lucky_turn,
+    "super_lucky_turn": super_lucky_turn,
+    "shuffle": shuffle,
+    "delay_the_burnt": delay_the_burnt,
+    "extended_delay_the_burnt": extended_delay_the_burnt,
+}
+
+
+def simulate(
+    effects: list[str], rarities: list[int], rules: Rules, games: int, seed
+) -> dict[str, np.ndarray]:
+    """Play `games` games to the end and count how they went.
+
+    Returns arrays meant to be summed across batches:
+    `places[seat, place]` counts where each seat finished (place 0 won),
+    `lengths` is a histogram of game lengths in clicks, `turns` the total
+    turns played, and `drawn` / `played` count each card of the catalog.
+    """
+
+    rng = np.random.default_rng(seed)
+    n, cards = rules.players, len(effects)
+    # Drawing a uniform entry of this table picks a card by its weight.
+    table = np.repeat(np.arange(cards), rarities if rules.weighted else 1)
+
+    batch = Batch(rules, cards, games, rng)
+    places = np.zeros((n, n), dtype=np.int64)
+    lengths = np.zeros(MAX_LENGTH + 1, dtype=np.int64)
+    turns = 0
+    drawn = np.zeros(cards, dtype=np.int64)
+    played = np.zeros(cards, dtype=np.int64)
+
+    while len(batch):
+        rows = np.arange(len(batch))
+        clicking = np.ones(len(batch), dtype=bool)
+
+        # A new turn, the player may play a card first.
+        if cards:
+            held = batch.hands[rows, batch.active]
+            playing = held.any(axis=1) & (rng.random(len(batch)) < rules.play_chance)
+            start, held = rows[playing], held[playing]
+            card = (rng.random(held.shape) * (held > 0)).argmax(axis=1)
+            batch.hands[start, batch.active[start], card] -= 1
+            played += np.bincount(card, minlength=cards)
+            for i, effect in enumerate(effects):
+                if effect in EFFECTS and (hit := start[card == i]).size:
+                    EFFECTS[effect](batch, hit)
+            # Skipped turns are already over.
+            clicking, batch.skipped[:] = ~batch.skipped, False
+
+        # The whole turn's clicks at once. Nothing changes the odds mid turn,
+        # so the draws of the clicks before a pop (or all of them) are binomial.
+        clicks = rng.integers(1, rules.max_clicks + 1, len(batch))
+        pops = clicking & (batch.until <= clicks)
+        clicks = np.where(clicking, np.where(pops, batch.until, clicks), 0)
+        batch.clicks += clicks
+        batch.until -= clicks
+
+        if cards:
+            draws = np.minimum(
+                rng.binomial(clicks - pops, np.clip((batch.chance - 1) / 100, 0, 1)),
+                batch.cards_left(rows),
+            )
+            card = table[rng.integers(0, len(table), draws.sum())]
+            hands = np.bincount(
+                np.repeat(rows, draws) * cards + card, minlength=len(batch) * cards
+            ).reshape(len(batch), cards)
+            batch.drawn += draws
+            batch.hands[rows, batch.active] += hands
+            drawn += hands.sum(axis=0)
+
+        popped = rows[pops]
+        np.add.at(places, (batch.active[popped], n - 1 - batch.out[popped]), 1)
+        batch.alive[popped, batch.active[popped]] = False
+        batch.out[popped] += 1
+        batch.pops_left[popped] -= 1
+        batch.until[popped] = rng.integers(1, rules.pop_max + 1, len(popped))
+
+        over = batch.pops_left == 0
+        batch.advance(rows[clicking & ~over])
+
+        if over.any():
+            np.add.at(places, (batch.alive[over].argmax(axis=1), 0), 1)
+            lengths += np.bincount(
+                np.minimum(batch.clicks[over], MAX_LENGTH), minlength=MAX_LENGTH + 1
+            )
+            turns += batch.turns[over].sum()
+            batch.keep(~over)
+
+    return {
+        "places": places,
+        "lengths": lengths,
+        "turns": np.array(turns),
+        "drawn": drawn,
+        "played": played,
+    }
+
+
+def run(
+    effects: list[str],
+    rarities: list[int],
+    rules: Rules,
+    games: int,
+    processes: int | None = None,
+    chunk: int = 20_000,
+    seed: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Simulate `games` games in chunks spread over worker processes, summing the counts."""
+
+    sizes = [min(chunk, games - start) for start in range(0, games, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(sizes) == 1:
+        results = [
+            simulate(effects, rarities, rules, size, s) for size, s in zip(sizes, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(min(processes, len(sizes))) as pool:
+            results = list(
+                pool.map(
+                    simulate,
+                    *zip(*[(effects, rarities, rules, size, s) for size, s in zip(sizes, seeds)]),
+                )
+            )
+
+    return {key: sum(r[key] for r in results) for key in results[0]}
@@ -0,0 +1,133 @@
+"""
+spectators.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Spectators
+
+Spectators don't get the players' events one by one. Every broadcast to a
+watched game is folded into that game's buffer, and at a fixed tick rate
+each changed buffer is sent to the game's spectator group as one snapshot.
+However busy the game, a spectator gets at most `GAME_SPECTATOR_TICK_RATE`
+messages a second, and never causes a query after the first one to watch
+the game seeds its buffer.
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+from channels.layers import get_channel_layer
+
+
+def spectator_group(game_pk: int) -> str:
+    return f"{game_pk}.spectators"
+
+
+def snapshot_payload(buffer: "SnapshotBuffer"):
+    return {
+        "type": "snapshot",
+        "game": buffer.game,
+        "alive_html": buffer.alive_html,
+        "clicks": buffer.clicks,
+        "msgs": buffer.msgs,
+    }
+
+
+@dataclass
+class SnapshotBuffer:
+    """The latest public state of a game, and what happened since the last tick."""
+
+    watchers: int = 0
+    game: dict | None = None
+    alive_html: str = ""
+    clicks: int = 0
+    msgs: list[str] = field(default_factory=list)
+    seeded: bool = False
+    dirty: bool = False
+
+    def fold(self, payload: dict):
+        if "game" in payload:
+            self.game = payload["game"]
+        if "alive_html" in payload:
+            self.alive_html = payload["alive_html"]
+        if "msg" in payload:
+            self.msgs.append(payload["msg"])
+        if payload["type"] == "click":
+            self.clicks += 1
+        self.dirty = True
+
+
+class Spectators:
+    """
+    # Spectators.
+
+    The per-game snapshot buffers of this worker.
+    Thread safe, since sync consumers record from worker threads
+    while the tick runs on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers: dict[int, SnapshotBuffer] = {}
+
+    def record(self, game_pk: int, payload: dict):
+        """Fold a broadcast into the game's buffer, if anyone is watching it."""
+
+        with self._lock:
+            if (buffer := self._buffers.get(game_pk)) is not None:
+                buffer.fold(payload)
+
+    def watch(self, game_pk: int) -> bool:
+        """Add a watcher, returning whether the buffer still needs seeding."""
+
+        with self._lock:
+            buffer = self._buffers.setdefault(game_pk, SnapshotBuffer())
+            buffer.watchers += 1
+            return not buffer.seeded
+
+    def seed(self, game_pk: int, game: dict | None, alive_html: str):
+        """Fill a new buffer with the game's current state."""
+
+        with self._lock:
+            if (buffer := self._buffers.get(game_pk)) is not None and not buffer.seeded:
+                buffer.game, buffer.alive_html, buffer.seeded = game, alive_html, True
+
+    def unwatch(self, game_pk: int):
+        with self._lock:
+            if (buffer := self._buffers.get(game_pk)) is not None:
+                buffer.watchers -= 1
+                if buffer.watchers <= 0:
+                    del self._buffers[game_pk]
+
+    def current(self, game_pk: int) -> dict | None:
+        """The game's latest snapshot, without consuming what happened since the last tick."""
+
+        with self._lock:
+            if (buffer := self._buffers.get(game_pk)) is not None:
+                return snapshot_payload(buffer) | {"clicks": 0, "msgs": []}
+
+    def drain(self) -> list[tuple[int, dict]]:
+        """The snapshots of every game that changed since the last tick."""
+
+        snapshots = []
+        with self._lock:
+            for game_pk, buffer in self._buffers.items():
+                if buffer.dirty:
+                    snapshots.append((game_pk, snapshot_payload(buffer)))
+                    buffer.clicks, buffer.msgs, buffer.dirty = 0, [], False
+        return snapshots
+
+    def forget(self, game_pk: int):
+        with self._lock:
+            self._buffers.pop(game_pk, None)
+
+
+spectators = Spectators()
+
+
+async def tick():
+    """Send every changed game's snapshot to its spectators."""
+
+    layer = get_channel_layer()
+    for game_pk, snapshot in spectators.drain():
+        await layer.group_send(spectator_group(game_pk), snapshot)
@@ -0,0 +1,132 @@
+"""
+stats.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Player Stats
+
+`PlayerStats` is kept up to date with F() increments as games are played.
+This rebuilds it from history instead, for when the counters were added
+after games had been played or have drifted. Games are read `chunk_size`
+at a time, live and then archived, tallied in memory and merged into the
+table with bulk writes, so a chunk costs a handful of queries and memory
+doesn't grow with history.
+
+A game counts once it was played out (started, and finished with no pops
+left), like `Game.finish` counts it. Games reaped as abandoned don't count.
+"""
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from itertools import batched
+
+from django.db import transaction
+
+from game import archive
+from game.models import ArchivedGame, Game, GameEvent, PlayerStats, UserGame
+
+Totals = dict[int, Counter]
+
+
+def played_out(started_at, finished_at, pops_left) -> bool:
+    return bool(started_at and finished_at and pops_left == 0)
+
+
+def tally(
+    totals: Totals,
+    played: bool,
+    players: Iterable[tuple[int, object]],
+    plays: Iterable[int],
+):
+    """Count one game: its players as (user pk, killed_at) and the user pk of each card played."""
+
+    for user, killed_at in players:
+        if killed_at is not None:
+            totals[user]["eliminations"] += 1
+        if played:
+            totals[user]["games"] += 1
+            totals[user]["wins"] += killed_at is None
+    for user in plays:
+        totals[user]["cards_played"] += 1
+
+
+def live_totals(game_pks: tuple[int, ...]) -> Totals:
+    """Tally a chunk of live games, with one query per table."""
+
+    totals: Totals = defaultdict(Counter)
+    games = {
+        pk: played_out(*fields)
+        for pk, *fields in Game.objects.filter(pk__in=game_pks).values_list(
+            "pk", "started_at", "finished_at", "pops_left"
+        )
+    }
+    players = defaultdict(list)
+    for game, user, killed_at in UserGame.objects.filter(game_id__in=game_pks).values_list(
+        "game_id", "user_id", "killed_at"
+    ):
+        players[game].append((user, killed_at))
+    plays = defaultdict(list)
+    for game, data in GameEvent.objects.filter(
+        game_id__in=game_pks, kind=GameEvent.Kind.PLAY
+    ).values_list("game_id", "data"):
+        plays[game].append(data["user"])
+
+    for pk, played in games.items():
+        tally(totals, played, players[pk], plays[pk])
+    return totals
+
+
+def archived_totals(archived: tuple[ArchivedGame, ...]) -> Totals:
+    """Tally a chunk of archived games from their documents."""
+
+    user = archive.PLAYER_COLUMNS.index("user_id")
+    killed_at = archive.PLAYER_COLUMNS.index("killed_at")
+    kind, data = archive.EVENT_COLUMNS.index("kind"), archive.EVENT_COLUMNS.index("data")
+
+    totals: Totals = defaultdict(Counter)
+    for game in archived:
+        document = archive.unpack(game.data)
+        tally(
+            totals,
+            played_out(game.started_at, game.finished_at, document["game"]["pops_left"]),
+            [(player[user], player[killed_at]) for player in document["players"]],
+            [e[data]["user"] for e in document["events"] if e[kind] == GameEvent.Kind.PLAY],
+        )
+    return totals
+
+
+def merge(totals: Totals):
+    """Add the totals to the table, with one read and two bulk writes."""
+
+    existing = PlayerStats.objects.in_bulk(list(totals))
+    created, updated = [], []
+    for user, counts in totals.items():
+        if (stats := existing.get(user)) is None:
+            created.append(PlayerStats(user_id=user, **counts))
+        else:
+            for field, count in counts.items():
+                setattr(stats, field, getattr(stats, field) + count)
+            updated.append(stats)
+
+    PlayerStats.objects.bulk_create(created)
+    PlayerStats.objects.bulk_update(updated, PlayerStats.COUNTERS)
+
+
+@transaction.atomic
+def rebuild(chunk_size: int = 500) -> int:
+    """Recompute every player's stats from history, returning the number of games read."""
+
+    PlayerStats.objects.all().delete()
+
+    read = 0
+    live = Game.objects.order_by("pk").values_list("pk", flat=True)
+    for game_pks in batched(live.iterator(chunk_size=chunk_size), chunk_size):
+        merge(live_totals(game_pks))
+        read += len(game_pks)
+
+    archived = ArchivedGame.objects.order_by("pk").only("started_at", "finished_at", "data")
+    for chunk in batched(archived.iterator(chunk_size=chunk_size), chunk_size):
+        merge(archived_totals(chunk))
+        read += len(chunk)
+
+    return read
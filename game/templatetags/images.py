@@ -0,0 +1,59 @@
+"""
+images.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Image Template Tags
+"""
+
+from django import template
+from django.conf import settings
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from game import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(name: str, sizes: str | None = None, **attrs):
+    """An `<img>` of the static image, with its optimized variants as sources if it has any.
+
+    `sizes` is how wide the image is shown, so the browser can pick a variant,
+    e.g. `{% picture 'ufo.png' sizes="208px" alt="" class="w-52" %}`.
+    """
+
+    entry = images.manifest()["images"].get(name)
+    img = {"src": static(name), **attrs}
+    if entry is None:
+        return format_html("<img{}>", flatatt(img))
+
+    # Its size in pixels, so the page doesn't shift as it loads.
+    img = {"width": entry["width"], "height": entry["height"]} | img
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}"{}>',
+        (
+            (format_, images.srcset(entry, format_), flatatt({"sizes": sizes} if sizes else {}))
+            for format_ in entry["variants"]
+        ),
+    )
+    # display: contents, so the <img> is laid out as if it weren't wrapped.
+    return format_html(
+        '<picture style="display: contents">{}<img{}></picture>', sources, flatatt(img)
+    )
+
+
+@register.simple_tag
+def sprite_styles():
+    """A `<style>` placing the frames of every sprite, `.popcorn.popcorn-3` say."""
+
+    css = "".join(
+        images.sprite_css(sprite, names)
+        for sprite, names in settings.GAME_IMAGES["SPRITES"].items()
+    )
+    # Built from static URLs, not user input.
+    return mark_safe(f"<style>{css}</style>")
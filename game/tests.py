@@ -1,14 +1,1948 @@
+import gzip
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import ClassVar
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.sessions import CookieMiddleware
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from game import (
+    archive,
+    assets,
+    effects,
+    events,
+    export,
+    housekeeping,
+    images,
+    lobby,
+    matchmaking,
+    stats,
+    tournaments,
+)
+from game.bots import Bots, bot_key
+from game.cards import FragmentCache
+from game.consumers import (
+    active_user_pk,
+    add_bot,
+    broadcast,
+    click_kernel,
+    click_payload,
+    expire_turn,
+    pass_turn,
+    play_from_hand,
+    render_hand,
+    schedule_turn,
+)
+from game.identity import IDENTITY_COOKIE, IDENTITY_SALT, get_identity, load_identity
+from game.models import (
+    ArchivedGame,
+    Card,
+    Deck,
+    Game,
+    GameEvent,
+    GameSnapshot,
+    Hand,
+    PlayerStats,
+    TournamentGame,
+    User,
+    UserGame,
+)
+from game.presence import Presence, presence
+from game.resume import ResumeBuffer, recent
+from game.routing import websocket_patterns
+from game.spectators import Spectators, spectators, tick
+from game.throttle import Throttle
+from game.timers import TimerWheel, wheel
+from game.views import GameDetailView
 
 # Create your tests here.
 
 
-class TestUserLogin(TestCase):
+class GameTestCase(TestCase):
+    """Gives every test a fresh event log, card fragment cache and cache directory.
+
+    Events recorded by one test must not be flushed by another, and the
+    process-wide log is flushed at exit, after the test database is gone.
+    Card pks are reused between tests, which never commit a catalog bump.
+    The cache is a temporary directory, `self.cache_dir`, never the one
+    the developer's server uses.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+        caches = self.settings(
+            CACHES={"default": {**settings.CACHES["default"], "LOCATION": self.cache_dir}}
+        )
+        caches.enable()
+        self.addCleanup(caches.disable)
+        self.log = events.EventLog(batch_size=64, snapshot_every=200)
+        self.fragments = FragmentCache()
+        for patcher in (
+            mock.patch.object(events, "log", self.log),
+            mock.patch("game.cards.fragments", self.fragments),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+def login(client, user: User):
+    """Give the test client a signed identity cookie for the user."""
+
+    client.cookies[IDENTITY_COOKIE] = signing.get_cookie_signer(
+        salt=IDENTITY_COOKIE + IDENTITY_SALT
+    ).sign(f"{user.pk}:{user.display_name}")
+
+
+class TestUserLogin(GameTestCase):
     def test_post(self):
         response = self.client.post(
             reverse("home"), {"email": "test@example.com", "display_name": "Ian"}
         )
 
-        self.assertRedirects(response, reverse("home"))
-        self.assertEqual(response.cookies.get("email"), "test@example.com")
+        user = User.objects.get_by_email("test@example.com")
+        self.assertRedirects(response, reverse("lobby"))
+        self.assertEqual(
+            self.client.get(reverse("lobby")).wsgi_request.game_user.pk, user.pk
+        )
+        self.assertNotIn("email", response.cookies)
+
+
+class TestIdentity(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", display_name="Ian")
+
+    def test_authed_runs_no_user_query(self):
+        login(self.client, self.user)
+
+        # The only query left is the lobby listing itself.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("lobby"))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_guest_redirects_with_identity(self):
+        login(self.client, self.user)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("home"))
+
+        self.assertRedirects(response, reverse("lobby"), fetch_redirect_response=False)
+
+    def test_tampered_cookie_is_a_guest(self):
+        self.client.cookies[IDENTITY_COOKIE] = f"{self.user.pk}:Ian:forged"
+
+        response = self.client.get(reverse("lobby"))
+
+        self.assertRedirects(response, reverse("home"), fetch_redirect_response=False)
+
+    def test_identity_defers_the_full_row(self):
+        user = load_identity(f"{self.user.pk}:Ian")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user.display_name, "Ian")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "test@example.com")
+
+    def test_missing_cookie(self):
+        request = self.client.get(reverse("home")).wsgi_request
+
+        self.assertIsNone(get_identity(request))
+
+
+class TestGameDetail(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(email="creator@example.com", display_name="Alice")
+        cls.joiner = User.objects.create(email="joiner@example.com", display_name="Bob")
+        cls.game = Game.objects.create_with_player(cls.creator)
+        cls.game.join(cls.joiner.email)
+
+    def test_query_budget_for_seated_player(self):
+        login(self.client, self.joiner)
+
+        with self.assertNumQueries(GameDetailView.query_budget):
+            response = self.client.get(reverse("detail", args=[self.game.pk]))
+
+        self.assertEqual(
+            response.context["data"],
+            {
+                "ws": f"/ws/game/{self.game.pk}",
+                "creator": "creator@example.com",
+                "player": "joiner@example.com",
+                "heartbeat": 15,
+            },
+        )
+        self.assertContains(response, "Alice")
+        self.assertContains(response, "Bob")
+
+    def test_newcomer_loads_their_email(self):
+        newcomer = User.objects.create(email="new@example.com", display_name="C")
+        login(self.client, newcomer)
+
+        with self.assertNumQueries(GameDetailView.query_budget + 1):
+            response = self.client.get(reverse("detail", args=[self.game.pk]))
+
+        self.assertEqual(response.context["data"]["player"], "new@example.com")
+
+
+class TestLobby(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", display_name="Ian")
+        cls.other = User.objects.create(email="other@example.com", display_name="Al")
+
+    def setUp(self):
+        super().setUp()
+        login(self.client, self.user)
+
+    def create_game(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Game.objects.create_with_player(self.user)
+
+    def test_cached_page_costs_no_queries(self):
+        game = self.create_game()
+        self.client.get(reverse("lobby"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("lobby"))
+
+        self.assertEqual(response.context["games"], [{"pk": game.pk, "player_count": 1}])
+
+    def test_join_and_start_invalidate(self):
+        game = self.create_game()
+        self.client.get(reverse("lobby"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            game.join(self.other.email)
+        self.assertEqual(
+            self.client.get(reverse("lobby")).context["games"],
+            [{"pk": game.pk, "player_count": 2}],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            game.start()
+        self.assertEqual(self.client.get(reverse("lobby")).context["games"], [])
+
+    def test_keyset_pagination(self):
+        pks = [self.create_game().pk for _ in range(lobby.PAGE_SIZE + 2)]
+
+        first = self.client.get(reverse("lobby")).context
+        self.assertEqual(
+            [g["pk"] for g in first["games"]], pks[::-1][: lobby.PAGE_SIZE]
+        )
+
+        second = self.client.get(reverse("lobby"), {"before": first["next_before"]})
+        self.assertEqual([g["pk"] for g in second.context["games"]], pks[1::-1])
+        self.assertIsNone(second.context["next_before"])
+
+    def test_changes_are_pushed_to_the_lobby_group(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(lobby.LOBBY_GROUP, channel)
+
+        game = self.create_game()
+        msg = async_to_sync(layer.receive)(channel)
+
+        self.assertEqual(msg["type"], "lobby_update")
+        self.assertEqual(msg["action"], "created")
+        self.assertEqual(msg["game"], {"pk": game.pk, "player_count": 1})
+        self.assertIn(f'data-lobby-game="{game.pk}"', msg["row_html"])
+
+
+class TestConditionalGet(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", display_name="Ian")
+        cls.other = User.objects.create(email="other@example.com", display_name="Al")
+        cls.game = Game.objects.create_with_player(cls.user)
+
+    def setUp(self):
+        super().setUp()
+        login(self.client, self.user)
+
+    def assertRevalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        return response["ETag"]
+
+    def test_lobby(self):
+        etag = self.assertRevalidates(reverse("lobby"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.join(self.other.email)
+
+        response = self.client.get(reverse("lobby"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_lobby_last_modified(self):
+        response = self.client.get(reverse("lobby"))
+
+        response = self.client.get(
+            reverse("lobby"), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_game(self):
+        url = reverse("detail", args=[self.game.pk])
+        etag = self.assertRevalidates(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.join(self.other.email)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_game_bumped_by_another_process(self):
+        url = reverse("detail", args=[self.game.pk])
+        etag = self.assertRevalidates(url)
+
+        # E.g. a management command, with its own copy of the settings.
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                (
+                    "import django; django.setup(); from game import versions; "
+                    f"versions.bump(versions.game_key({self.game.pk}))"
+                ),
+            ],
+            env=os.environ
+            | {"DJANGO_SETTINGS_MODULE": "conf.settings", "POPCORN_CACHE_DIR": self.cache_dir},
+            cwd=settings.BASE_DIR,
+            check=True,
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_game_validator_is_per_player(self):
+        url = reverse("detail", args=[self.game.pk])
+        etag = self.client.get(url)["ETag"]
+
+        login(self.client, self.other)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+
+class TestEventLog(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.bob = User.objects.create(email="bob@example.com", display_name="Bob")
+
+    def setUp(self):
+        super().setUp()
+        self.log.batch_size, self.log.snapshot_every = 4, 3
+
+    def play(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            game = Game.objects.create_with_player(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            game.join(self.bob.email)
+        with self.captureOnCommitCallbacks(execute=True):
+            game.start()
+        with self.captureOnCommitCallbacks(execute=True):
+            game.click()
+        with self.captureOnCommitCallbacks(execute=True):
+            game.advance_turn(self.alice.email)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserGame.objects.for_game(game).for_user(self.alice).get().kill()
+        return game
+
+    def test_events_are_written_in_batches(self):
+        log = events.EventLog(batch_size=4, snapshot_every=100)
+        game = Game.objects.create()
+
+        # Only the sequence counter is read until the batch is full.
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                log.append(game.pk, GameEvent.Kind.CLICK, {})
+        self.assertFalse(GameEvent.objects.exists())
+
+        # The insert, in a savepoint of the test's transaction.
+        with self.assertNumQueries(3):
+            log.append(game.pk, GameEvent.Kind.CLICK, {})
+        self.assertEqual(
+            list(GameEvent.objects.for_game(game).values_list("seq", flat=True)),
+            [1, 2, 3, 4],
+        )
+
+    def test_events_written_by_another_process_are_numbered_around(self):
+        game = Game.objects.create()
+        ours, theirs = (events.EventLog(batch_size=10, snapshot_every=100) for _ in range(2))
+
+        ours.append(game.pk, GameEvent.Kind.JOIN, {"user": self.alice.pk})
+        theirs.append(game.pk, GameEvent.Kind.JOIN, {"user": self.bob.pk})
+        theirs.append(game.pk, GameEvent.Kind.START, {})
+        theirs.flush()
+        ours.flush()
+
+        self.assertEqual(
+            list(GameEvent.objects.for_game(game).order_by("seq").values_list("seq", "kind")),
+            [(1, "join"), (2, "start"), (3, "join")],
+        )
+        self.assertEqual(ours.append(game.pk, GameEvent.Kind.CLICK, {}), 4)
+
+    def test_rebuild_from_snapshot_and_tail(self):
+        game = self.play()
+        self.log.flush()
+
+        self.assertEqual(
+            list(GameSnapshot.objects.filter(game=game).values_list("seq", flat=True)),
+            [4, 6],
+        )
+        seq, state = events.rebuild(game.pk)
+        game.refresh_from_db()
+
+        self.assertEqual(seq, 6)
+        self.assertEqual(state["players"], [self.alice.pk, self.bob.pk])
+        self.assertEqual(state["active"], self.bob.pk)
+        self.assertEqual(state["killed"], [self.alice.pk])
+        self.assertEqual(state["clicks"], 1)
+        self.assertEqual(state["until_next_pop"], game.until_next_pop)
+        self.assertEqual(state["pops_left"], game.pops_left)
+
+    def test_replay(self):
+        game = self.play()
+        self.log.flush()
+
+        kinds = [event.kind for event, _ in events.replay(game.pk)]
+
+        self.assertEqual(
+            kinds, ["join", "join", "start", "click", "end_turn", "kill"]
+        )
+
+
+class TestArchive(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.bob = User.objects.create(email="bob@example.com", display_name="Bob")
+        cls.card = Card.objects.create(
+            name="Skip", description="", rarity=40, effect="skip", image="skip.jpg"
+        )
+
+    def finished_game(self):
+        game = Game.objects.create_with_player(self.alice)
+        game.join(self.bob.email)
+        game.start()
+        Deck.objects.bulk_create(
+            Deck(game=game, card=self.card, placement=i) for i in range(1, 11)
+        )
+        Hand.objects.create(game=game, user=self.alice, card=self.card)
+        GameEvent.objects.create(game=game, seq=1, kind=GameEvent.Kind.JOIN)
+        game.finish()
+        return game
+
+    def test_archive_moves_hot_rows(self):
+        game = self.finished_game()
+        Game.objects.create_with_player(self.alice)
+
+        self.assertEqual(archive.archive_finished(), 1)
+
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertFalse(Deck.objects.filter(game_id=game.pk).exists())
+        self.assertFalse(Hand.objects.filter(game_id=game.pk).exists())
+        self.assertFalse(UserGame.objects.filter(game_id=game.pk).exists())
+        self.assertFalse(GameEvent.objects.filter(game_id=game.pk).exists())
+        self.assertTrue(ArchivedGame.objects.filter(pk=game.pk).exists())
+
+    def test_archived_game_reads_through_the_model_api(self):
+        game = self.finished_game()
+        archive.archive_finished()
+
+        with self.assertNumQueries(2):
+            restored = Game.objects.get_including_archived(game.pk)
+            players = list(restored.players.all())
+
+        self.assertEqual(restored.finished_at, game.finished_at)
+        self.assertEqual([p.user_id for p in players], [self.alice.pk, self.bob.pk])
+        self.assertEqual(players[1].next_player, players[0])
+        self.assertEqual(
+            [d.placement for d in restored.deck_cards.all()], list(range(1, 11))
+        )
+        self.assertEqual(
+            [h.card_id for h in restored.hand_set.all()], [self.card.pk]
+        )
+        self.assertEqual([e.kind for e in restored.events.all()], ["join"])
+
+    def test_missing_game(self):
+        with self.assertRaises(Game.DoesNotExist):
+            Game.objects.get_including_archived(404)
+
+    def test_command(self):
+        self.finished_game()
+        self.finished_game()
+
+        call_command("archive_games", "--batch-size", "1", stdout=StringIO())
+
+        self.assertEqual(ArchivedGame.objects.count(), 2)
+
+
+class TestPresence(GameTestCase):
+    def test_idle_games(self):
+        tracker = Presence()
+        tracker.touch(1, "a", now=0)
+        tracker.touch(2, "b", now=0)
+        tracker.touch(2, "b", now=50)
+        tracker.touch(3, "c", now=0)
+        tracker.leave(3, "c", now=90)
+
+        self.assertEqual(tracker.idle_games(60, now=100), [1])
+        self.assertEqual(tracker.count(3), 0)
+
+    async def test_heartbeat_touches_without_queries(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_patterns), "/ws/game/7/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(presence.count(7), 1)
+
+        await communicator.send_json_to({"type": "heartbeat"})
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+        self.assertEqual(presence.count(7), 0)
+        presence.forget(7)
+
+
+class TestReaper(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.card = Card.objects.create(
+            name="Skip", description="", rarity=40, effect="skip", image="skip.jpg"
+        )
+
+    def test_reap_abandoned_games(self):
+        abandoned = Game.objects.create_with_player(self.alice)
+        live = Game.objects.create_with_player(self.alice)
+        for game in (abandoned, live):
+            Deck.objects.create(game=game, card=self.card, placement=1)
+            Hand.objects.create(game=game, user=self.alice, card=self.card)
+        presence.touch(abandoned.pk, "gone", now=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(housekeeping.reap([abandoned.pk]), 1)
+
+        abandoned.refresh_from_db()
+        self.assertIsNotNone(abandoned.finished_at)
+        self.assertFalse(Deck.objects.filter(game=abandoned).exists())
+        self.assertFalse(Hand.objects.filter(game=abandoned).exists())
+        self.assertTrue(Deck.objects.filter(game=live).exists())
+        self.assertNotIn(abandoned.pk, presence.idle_games(0))
+        self.assertEqual(list(Game.objects.not_started()), [live])
+
+    def test_finished_games_keep_their_rows(self):
+        game = Game.objects.create_with_player(self.alice)
+        Deck.objects.create(game=game, card=self.card, placement=1)
+        game.finish()
+
+        self.assertEqual(housekeeping.reap([game.pk]), 0)
+        self.assertTrue(Deck.objects.filter(game=game).exists())
+
+
+class TestTimerWheel(GameTestCase):
+    def test_fires_after_its_ticks(self):
+        timers = TimerWheel(tick=1, slots=4)
+        timers.schedule("a", 2, lambda: "a")
+        timers.schedule("b", 9, lambda: "b")
+
+        fired = [[cb() for cb in timers.advance()] for _ in range(10)]
+
+        self.assertEqual(fired[1], ["a"])
+        self.assertEqual(fired[8], ["b"])
+        self.assertEqual(sum(map(len, fired)), 2)
+        self.assertEqual(len(timers), 0)
+
+    def test_cancel_and_reschedule(self):
+        timers = TimerWheel(tick=1, slots=4)
+        timers.schedule("a", 1, lambda: "first")
+        timers.schedule("a", 3, lambda: "second")
+        timers.schedule("b", 1, lambda: "b")
+
+        self.assertTrue(timers.cancel("b"))
+        self.assertFalse(timers.cancel("b"))
+        fired = [[cb() for cb in timers.advance()] for _ in range(3)]
+
+        self.assertEqual(fired, [[], [], ["second"]])
+
+
+class TestTurnTimer(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.bob = User.objects.create(email="bob@example.com", display_name="Bob")
+
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create_with_player(self.alice, turn_time_limit=30)
+        self.game.join(self.bob.email)
+        self.game.start()
+        self.addCleanup(wheel.cancel, self.game.pk)
+
+    def test_schedule_only_with_a_limit(self):
+        schedule_turn(self.game, self.alice.pk)
+        self.assertIn(self.game.pk, wheel)
+
+        wheel.cancel(self.game.pk)
+        self.game.turn_time_limit = None
+        schedule_turn(self.game, self.alice.pk)
+        self.assertNotIn(self.game.pk, wheel)
+
+    def test_expire_advances_the_turn(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(str(self.game.pk), channel)
+
+        expire_turn(self.game.pk, self.alice.pk)
+
+        active = UserGame.objects.is_active_for_game(self.game).get()
+        self.assertEqual(active.user, self.bob)
+        msg = async_to_sync(layer.receive)(channel)
+        self.assertEqual(msg["type"], "end_turn")
+        self.assertEqual(msg["game"]["active_player"], self.bob.email)
+        # And Bob's clock starts.
+        self.assertIn(self.game.pk, wheel)
+
+    def test_stale_expiry_is_ignored(self):
+        expire_turn(self.game.pk, self.bob.pk)
+
+        active = UserGame.objects.is_active_for_game(self.game).get()
+        self.assertEqual(active.user, self.alice)
+
+    def test_skip_starts_the_next_clock(self):
+        card = Card.objects.create(name="Skip", description="", rarity=40, effect="skip", image="")
+        Hand.objects.create(game=self.game, user=self.alice, card=card)
+        schedule_turn(self.game, self.alice.pk)
+
+        with mock.patch("game.consumers.schedule_turn", wraps=schedule_turn) as scheduled:
+            self.assertTrue(play_from_hand(self.game, self.alice, card.pk))
+
+        self.assertEqual(UserGame.objects.is_active_for_game(self.game).get().user, self.bob)
+        scheduled.assert_called_once_with(self.game, self.bob.pk)
+        # Alice's clock running out no longer ends Bob's turn.
+        expire_turn(self.game.pk, self.alice.pk)
+        self.assertEqual(UserGame.objects.is_active_for_game(self.game).get().user, self.bob)
+
+
+class TestTurns(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = User.objects.bulk_create(
+            User(email=f"{name}@example.com", display_name=name.title())
+            for name in ["alice", "bob", "carol"]
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create_with_player(self.alice)
+        self.game.join(self.bob.email)
+        self.game.join(self.carol.email)
+        self.game.start()
+
+    def active(self) -> User:
+        return UserGame.objects.is_active_for_game(self.game).get().user
+
+    def pop(self):
+        self.game.until_next_pop = 1
+        self.assertTrue(click_kernel(self.game))
+
+    def test_play_goes_on_past_the_first_pop(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(str(self.game.pk), channel)
+
+        self.pop()
+
+        self.assertEqual(self.active(), self.bob)
+        kill, end_turn = (async_to_sync(layer.receive)(channel) for _ in range(2))
+        self.assertEqual(kill["type"], "kill")
+        self.assertEqual(end_turn["type"], "end_turn")
+        self.assertEqual(end_turn["game"]["active_player"], self.bob.email)
+
+        # Alice is out, her turns are skipped.
+        pass_turn(self.game, self.bob.email)
+        self.assertEqual(self.active(), self.carol)
+        pass_turn(self.game, self.carol.email)
+        self.assertEqual(self.active(), self.bob)
+
+        self.pop()
+
+        self.game.refresh_from_db()
+        self.assertIsNotNone(self.game.finished_at)
+        self.assertEqual(
+            list(UserGame.objects.for_game(self.game).alive().values_list("user", flat=True)),
+            [self.carol.pk],
+        )
+
+
+class TestSpectators(GameTestCase):
+    def test_unwatched_games_are_not_buffered(self):
+        buffers = Spectators()
+        buffers.record(1, click_payload())
+
+        self.assertEqual(buffers.drain(), [])
+
+    def test_clicks_are_coalesced_per_tick(self):
+        buffers = Spectators()
+        self.assertTrue(buffers.watch(1))
+        buffers.seed(1, None, "")
+        self.assertFalse(buffers.watch(1))
+
+        for _ in range(100):
+            buffers.record(1, click_payload())
+        buffers.record(1, {"type": "end_turn", "msg": "Bob's turn!", "game": {"a": 1}})
+
+        [(game_pk, snapshot)] = buffers.drain()
+        self.assertEqual(game_pk, 1)
+        self.assertEqual(snapshot["clicks"], 100)
+        self.assertEqual(snapshot["msgs"], ["Bob's turn!"])
+        self.assertEqual(snapshot["game"], {"a": 1})
+        self.assertEqual(buffers.drain(), [])
+
+        buffers.unwatch(1)
+        buffers.unwatch(1)
+        buffers.record(1, click_payload())
+        self.assertEqual(buffers.drain(), [])
+
+    def test_watch_page_costs_no_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("watch", args=[3]))
+
+        self.assertEqual(response.context["data"], {"ws": "/ws/game/3/watch"})
+
+    def test_games_in_progress_link_to_watch(self):
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        waiting, playing, over = [Game.objects.create_with_player(alice) for _ in range(3)]
+        Game.objects.filter(pk__in=[playing.pk, over.pk]).update(started_at=timezone.now())
+        Game.objects.filter(pk=over.pk).update(finished_at=timezone.now())
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("live"))
+
+        self.assertEqual([game.pk for game in response.context["games"]], [playing.pk])
+        self.assertContains(response, reverse("watch", args=[playing.pk]))
+        self.assertNotContains(response, reverse("watch", args=[waiting.pk]))
+
+    async def test_spectator_socket(self):
+        alice = await User.objects.acreate(email="alice@example.com", display_name="Alice")
+        game = await sync_to_async(Game.objects.create_with_player)(alice)
+
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_patterns), f"/ws/game/{game.pk}/watch/"
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        first = await communicator.receive_json_from()
+        self.assertEqual(first["type"], "snapshot")
+        self.assertIn("Alice", first["alive_html"])
+
+        for _ in range(20):
+            await sync_to_async(broadcast)(game.pk, click_payload())
+        await tick()
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot["clicks"], 20)
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+        self.assertIsNone(spectators.current(game.pk))
+
+
+class TestPrivateHands(GameTestCase):
+    async def connect(self, game: Game, user: User):
+        cookie = signing.get_cookie_signer(salt=IDENTITY_COOKIE + IDENTITY_SALT).sign(
+            f"{user.pk}:{user.display_name}"
+        )
+        communicator = WebsocketCommunicator(
+            CookieMiddleware(URLRouter(websocket_patterns)),
+            f"/ws/game/{game.pk}/",
+            headers=[(b"cookie", f"{IDENTITY_COOKIE}={cookie}".encode())],
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_hand_is_only_sent_to_its_player(self):
+        alice = await User.objects.acreate(email="alice@example.com", display_name="Alice")
+        bob = await User.objects.acreate(email="bob@example.com", display_name="Bob")
+        game = await sync_to_async(Game.objects.create_with_player)(alice)
+        await sync_to_async(game.join)(bob.email)
+        card = await Card.objects.acreate(
+            name="Salt", description="", rarity=50, effect="lucky_turn", image="salt.jpg"
+        )
+        await Hand.objects.acreate(card=card, user=alice, game=game, quantity=2)
+
+        alices = await self.connect(game, alice)
+        bobs = await self.connect(game, bob)
+
+        await alices.send_json_to({"type": "play_card", "card": card.pk})
+
+        for communicator in (alices, bobs):
+            played = await communicator.receive_json_from()
+            self.assertEqual(played["type"], "play_card")
+            self.assertNotIn("hand_html", played)
+
+        hand = await alices.receive_json_from()
+        self.assertEqual(hand["type"], "hand")
+        self.assertEqual(hand["hand_html"].count("handleCard"), 1)
+        self.assertTrue(await bobs.receive_nothing())
+
+        # Bob can't play a card he doesn't hold.
+        await bobs.send_json_to({"type": "play_card", "card": card.pk})
+        self.assertTrue(await bobs.receive_nothing())
+        self.assertEqual(
+            await Hand.objects.filter(game=game).values_list("quantity", flat=True).aget(), 1
+        )
+
+        await alices.disconnect()
+        await bobs.disconnect()
+        presence.forget(game.pk)
+
+    async def test_crystal_ball_is_only_shown_to_its_player(self):
+        alice = await User.objects.acreate(email="alice@example.com", display_name="Alice")
+        bob = await User.objects.acreate(email="bob@example.com", display_name="Bob")
+        game = await sync_to_async(Game.objects.create_with_player)(alice)
+        await sync_to_async(game.join)(bob.email)
+        card = await Card.objects.acreate(
+            name="Crystal Ball", description="", rarity=50, effect="crystal_ball", image=""
+        )
+        await Deck.objects.acreate(game=game, card=card, placement=0)
+        await Hand.objects.acreate(card=card, user=alice, game=game)
+
+        alices = await self.connect(game, alice)
+        bobs = await self.connect(game, bob)
+
+        await alices.send_json_to({"type": "play_card", "card": card.pk})
+
+        peek = await alices.receive_json_from()
+        self.assertEqual(peek, {"type": "peek", "msg": "The next 1 cards are: Crystal Ball"})
+        for communicator in (alices, bobs):
+            played = await communicator.receive_json_from()
+            self.assertEqual(played["type"], "play_card")
+            self.assertNotIn("Crystal Ball", played["msg"])
+        self.assertEqual((await alices.receive_json_from())["type"], "hand")
+        self.assertTrue(await bobs.receive_nothing())
+
+        await alices.disconnect()
+        await bobs.disconnect()
+        presence.forget(game.pk)
+
+
+class TestResume(GameTestCase):
+    def test_ring_replays_or_gives_up(self):
+        ring = ResumeBuffer(size=3)
+        for i in range(5):
+            ring.append(1, {"type": "click", "i": i})
+
+        self.assertEqual(ring.last(1), 5)
+        self.assertEqual(ring.since(1, 5), [])
+        self.assertEqual([p["seq"] for p in ring.since(1, 2)], [3, 4, 5])
+        # Events 2 and 3 fell out of the ring.
+        self.assertIsNone(ring.since(1, 1))
+        # Seen on another worker, or before a restart.
+        self.assertIsNone(ring.since(1, 9))
+        self.assertIsNone(ring.since(2, 1))
+
+        ring.forget(1)
+        self.assertEqual(ring.last(1), 0)
+
+    async def test_reconnect_resumes_without_queries(self):
+        alice = await User.objects.acreate(email="alice@example.com", display_name="Alice")
+        game = await sync_to_async(Game.objects.create_with_player)(alice)
+
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_patterns), f"/ws/game/{game.pk}/"
+        )
+        await communicator.connect()
+        await sync_to_async(broadcast)(game.pk, click_payload())
+        seen = await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        for _ in range(2):
+            await sync_to_async(broadcast)(game.pk, click_payload())
+
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_patterns), f"/ws/game/{game.pk}/"
+        )
+        await communicator.connect()
+        # Replaying from the ring never loads the game.
+        with mock.patch.object(Game.objects, "get", side_effect=AssertionError):
+            await communicator.send_json_to({"type": "resume", "seq": seen["seq"]})
+            missed = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([p["seq"] for p in missed], [seen["seq"] + 1, seen["seq"] + 2])
+
+        recent.forget(game.pk)
+        await communicator.send_json_to({"type": "resume", "seq": missed[-1]["seq"]})
+        resync = await communicator.receive_json_from()
+        self.assertEqual(resync["type"], "resync")
+        self.assertIsNone(resync["game"])
+        self.assertIn("Alice", resync["alive_html"])
+
+        await communicator.disconnect()
+        presence.forget(game.pk)
+
+
+class TestThrottle(GameTestCase):
+    def test_buckets_per_socket_and_game(self):
+        limiter = Throttle(
+            {"SOCKET": {"click": (1, 2)}, "GAME": {"default": (1, 3)}}
+        )
+
+        self.assertTrue(limiter.allow(1, "a", "click", now=0))
+        self.assertTrue(limiter.allow(1, "a", "click", now=0))
+        # Socket a's burst is spent.
+        self.assertFalse(limiter.allow(1, "a", "click", now=0))
+        self.assertTrue(limiter.allow(1, "b", "click", now=0))
+        # So is the game's, whichever socket asks.
+        self.assertFalse(limiter.allow(1, "c", "click", now=0))
+        self.assertTrue(limiter.allow(2, "c", "click", now=0))
+        # Both refill.
+        self.assertTrue(limiter.allow(1, "a", "click", now=1))
+        # Types without a limit are free.
+        self.assertTrue(limiter.deliver("a", "click", now=0))
+        # Game 1's burst is spent again, until the game is forgotten.
+        self.assertFalse(limiter.allow(1, "d", "click", now=1))
+        limiter.forget(1)
+        self.assertTrue(limiter.allow(1, "d", "click", now=1))
+
+        self.assertEqual(
+            limiter.counters(),
+            {
+                "GAME": {"click": {"throttled": 2}},
+                "INBOUND": {"click": {"allowed": 6}},
+                "SOCKET": {"click": {"throttled": 1}},
+            },
+        )
+
+    def test_outbound_clicks_are_dropped(self):
+        limiter = Throttle({"OUTBOUND": {"click": (1, 1)}})
+
+        self.assertTrue(limiter.deliver("a", "click", now=0))
+        self.assertFalse(limiter.deliver("a", "click", now=0.5))
+        self.assertTrue(limiter.deliver("a", "click", now=1))
+        limiter.leave("a")
+        self.assertTrue(limiter.deliver("a", "click", now=1))
+        self.assertEqual(limiter.counters(), {"OUTBOUND": {"click": {"dropped": 1}}})
+
+    def test_outbound_clicks_keep_up_with_the_game(self):
+        limits = settings.GAME_RATE_LIMITS
+        rate, burst = limits["OUTBOUND"]["click"]
+        game_rate, game_burst = limits["GAME"]["click"]
+
+        self.assertGreaterEqual(rate, game_rate)
+        self.assertGreaterEqual(burst, game_burst)
+
+    async def test_flood_is_dropped_before_the_database(self):
+        alice = await User.objects.acreate(email="alice@example.com", display_name="Alice")
+        game = await sync_to_async(Game.objects.create_with_player)(alice)
+
+        limiter = Throttle({"SOCKET": {"default": (0, 3)}})
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_patterns), f"/ws/game/{game.pk}/"
+        )
+        await communicator.connect()
+        with mock.patch("game.consumers.throttle", limiter), mock.patch.object(
+            Game.objects, "get", wraps=Game.objects.get
+        ) as get:
+            for _ in range(10):
+                await communicator.send_json_to({"type": "sync"})
+            self.assertTrue(await communicator.receive_nothing())
+
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(limiter.counters()["SOCKET"]["sync"], {"throttled": 7})
+
+        await communicator.disconnect()
+        presence.forget(game.pk)
+
+    def test_counters_view(self):
+        url = reverse("throttle_stats")
+        self.assertRedirects(self.client.get(url), f"/admin/login/?next={url}")
+
+        self.client.force_login(get_user_model().objects.create(username="staff", is_staff=True))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), dict)
+
+
+@skipUnless(importlib.util.find_spec("numpy"), "The simulator needs NumPy.")
+class TestSimulation(GameTestCase):
+    def run_simulation(self, effects, rarities, **rules):
+        from game.simulation import Rules, run
+
+        return run(effects, rarities, Rules(**rules), 2_000, processes=1, chunk=500, seed=3)
+
+    def test_every_game_ends_with_one_winner(self):
+        results = self.run_simulation(["skip", "shuffle", "burnt_tracker"], [40, 80, 5])
+
+        # Every seat finishes every game in exactly one place.
+        self.assertEqual(results["places"].sum(axis=0).tolist(), [2_000] * 4)
+        self.assertEqual(results["places"].sum(axis=1).tolist(), [2_000] * 4)
+        self.assertEqual(results["lengths"].sum(), 2_000)
+        self.assertLessEqual(results["drawn"].sum(), 2_000 * 500)
+        self.assertLessEqual(results["played"].sum(), results["drawn"].sum())
+
+    def test_seeded_runs_repeat(self):
+        first = self.run_simulation(["lucky_turn"], [70])
+        second = self.run_simulation(["lucky_turn"], [70])
+
+        for key in first:
+            self.assertEqual(first[key].tolist(), second[key].tolist())
+
+    def test_delays_make_games_longer(self):
+        def mean_length(results):
+            return (results["lengths"] * range(len(results["lengths"]))).sum() / 2_000
+
+        plain = self.run_simulation(["burnt_tracker"], [5], play_chance=1)
+        delayed = self.run_simulation(["extended_delay_the_burnt"], [10], play_chance=1)
+
+        self.assertGreater(mean_length(delayed), mean_length(plain) * 1.5)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "simulate", "--games", "500", "--card", "skip=40", "--processes", "1",
+            stdout=out,
+        )
+
+        self.assertIn("500 games", out.getvalue())
+        self.assertIn("skip", out.getvalue())
+
+
+class TestBots(GameTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bots = Bots(click_delay=0.5, max_clicks=3)
+        patcher = mock.patch("game.bots.bots", self.bots)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        wheel.cancel(bot_key(self.game.pk))
+        wheel.cancel(self.game.pk)
+
+    def test_bot_joins_like_a_player(self):
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        self.game = Game.objects.create_with_player(alice)
+
+        player = add_bot(self.game)
+
+        self.assertEqual(self.bots.players(self.game.pk), {player.user_id})
+        self.assertTrue(player.user.email.endswith("@bots.invalid"))
+        self.assertEqual(self.game.players.count(), 2)
+
+    def test_skip_onto_a_bot_schedules_it(self):
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        bob = User.objects.create(email="bob@example.com", display_name="Bob")
+        self.game = Game.objects.create_with_player(alice)
+        self.game.join(bob.email)
+        bot = add_bot(self.game)
+        self.game.start()
+        # Bob is out, the skip passes his seat by.
+        UserGame.objects.for_game(self.game).for_user(bob.email).get().kill()
+        card = Card.objects.create(name="Skip", description="", rarity=40, effect="skip", image="")
+        Hand.objects.create(game=self.game, user=alice, card=card)
+
+        play_from_hand(self.game, alice, card.pk)
+
+        self.assertEqual(active_user_pk(self.game), bot.user_id)
+        self.assertIn(bot_key(self.game.pk), wheel)
+
+    def test_bot_clicks_then_passes_the_turn(self):
+        alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        self.game = Game.objects.create_with_player(alice)
+        bot = add_bot(self.game)
+        self.game.start()
+        self.game.until_next_pop = 50
+        pass_turn(self.game, alice.email)
+        # The bot's first click is on the wheel.
+        self.assertIn(bot_key(self.game.pk), wheel)
+
+        self.bots.act(self.game.pk, bot.user_id, 2)
+        self.assertEqual(active_user_pk(self.game), bot.user_id)
+        self.bots.act(self.game.pk, bot.user_id, 1)
+        self.assertEqual(active_user_pk(self.game), alice.pk)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.until_next_pop, 48)
+        self.assertEqual(self.bots.stats["turns"], 1)
+        # It isn't the bot's turn anymore, so it does nothing.
+        self.bots.act(self.game.pk, bot.user_id, 1)
+        self.assertEqual(self.bots.stats["clicks"], 2)
+
+    def test_bots_play_a_game_to_the_end(self):
+        self.game = self.bots.start_game(3)
+
+        for _ in range(1_000):
+            self.game.refresh_from_db()
+            if self.game.finished_at:
+                break
+            self.bots.act(self.game.pk, active_user_pk(self.game), 1)
+
+        self.assertIsNotNone(self.game.finished_at)
+        self.assertEqual(self.bots.stats["games"], 1)
+        # Everyone but the winner popped the kernel.
+        self.assertEqual(self.game.players.filter(killed_at__isnull=False).count(), 2)
+        self.assertEqual(self.bots.players(self.game.pk), frozenset())
+
+
+class TestMatchmaking(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            [User(email=f"player{i}@example.com", display_name=f"Player {i}") for i in range(40)]
+        )
+        Card.objects.bulk_create(
+            [
+                Card(name=effect, description="", rarity=50, effect=effect, image="")
+                for effect in ["skip", "shuffle", "lucky_turn"]
+            ]
+        )
+
+    def test_games_are_created_in_bulk(self):
+        def create(groups):
+            with CaptureQueriesContext(connection) as queries:
+                games = matchmaking.create_games(groups, deck_size=20)
+            return games, len(queries)
+
+        pks = [user.pk for user in self.users]
+        _, few = create([pks[0:4], pks[4:8]])
+        games, many = create([pks[i : i + 4] for i in range(8, 40, 4)])
+
+        # The number of queries doesn't grow with the number of games.
+        self.assertEqual(few, many)
+        self.assertEqual(len(games), 8)
+        self.assertEqual(Deck.objects.filter(game__in=games).count(), 8 * 20)
+
+        game = games[0]
+        players = list(game.players.order_by("pk"))
+        self.assertEqual([p.user_id for p in players], pks[8:12])
+        self.assertEqual([p.is_active for p in players], [True, False, False, False])
+        self.assertEqual(
+            [p.next_player_id for p in players],
+            [players[1].pk, players[2].pk, players[3].pk, None],
+        )
+
+        # They play like any other game.
+        game.start()
+        players[3].refresh_from_db()
+        self.assertEqual(players[3].next_player_id, players[0].pk)
+
+    def test_queue_takes_full_groups_in_order(self):
+        waiting = matchmaking.MatchmakingQueue(game_size=2)
+        for i, channel in enumerate("abcde"):
+            waiting.join(channel, i)
+        waiting.join("f", 0)
+        waiting.leave("b")
+
+        self.assertEqual(waiting.take(), [[("a", 0), ("c", 2)], [("d", 3), ("e", 4)]])
+        self.assertEqual(len(waiting), 0)
+
+    async def test_waiting_players_are_seated_together(self):
+        waiting = matchmaking.MatchmakingQueue(game_size=2)
+        patcher = mock.patch.object(matchmaking, "queue", waiting)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        communicators = []
+        for user in self.users[:3]:
+            cookie = signing.get_cookie_signer(salt=IDENTITY_COOKIE + IDENTITY_SALT).sign(
+                f"{user.pk}:{user.display_name}"
+            )
+            communicator = WebsocketCommunicator(
+                CookieMiddleware(URLRouter(websocket_patterns)),
+                "/ws/matchmaking/",
+                headers=[(b"cookie", f"{IDENTITY_COOKIE}={cookie}".encode())],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            communicators.append(communicator)
+
+        await matchmaking.tick()
+
+        first = await communicators[0].receive_json_from()
+        second = await communicators[1].receive_json_from()
+        self.assertEqual(first["type"], "matched")
+        self.assertEqual(first["game"], second["game"])
+        self.assertEqual(first["url"], reverse("detail", args=[first["game"]]))
+        # The third waits for another player.
+        self.assertTrue(await communicators[2].receive_nothing())
+        self.assertEqual(len(waiting), 1)
+
+        await communicators[2].disconnect()
+        self.assertEqual(len(waiting), 0)
+
+
+class TestTournaments(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            [User(email=f"player{i}@example.com", display_name=f"Player {i}") for i in range(16)]
+        )
+        Card.objects.bulk_create(
+            [
+                Card(name=effect, description="", rarity=1, effect=effect, image="")
+                for effect in ("skip", "shuffle")
+            ]
+        )
+
+    def tearDown(self):
+        for game_pk in Game.objects.values_list("pk", flat=True):
+            wheel.cancel(game_pk)
+
+    def win(self, game: Game) -> int:
+        """Pop the kernel until the game is over, returning the winner's pk."""
+
+        game.refresh_from_db()
+        while game.finished_at is None:
+            game.until_next_pop = 1
+            click_kernel(game)
+        return UserGame.objects.for_game(game).alive().get().user_id
+
+    def test_players_are_split_evenly(self):
+        sizes = lambda n, size: [len(g) for g in tournaments.groups(list(range(n)), size)]
+
+        self.assertEqual(sizes(16, 4), [4, 4, 4, 4])
+        self.assertEqual(sizes(10, 4), [4, 3, 3])
+        self.assertEqual(sizes(5, 4), [3, 2])
+        # A lone player has a bye.
+        self.assertEqual(sizes(3, 2), [2, 1])
+
+    def test_round_starts_in_bulk(self):
+        def start(count):
+            with (
+                CaptureQueriesContext(connection) as queries,
+                self.captureOnCommitCallbacks(execute=True),
+            ):
+                tournament = tournaments.start("Cup", self.users[:count], 4, 20)
+            self.log.flush()
+            return tournament, len(queries)
+
+        _, small = start(8)
+        tournament, large = start(16)
+
+        # The cost doesn't grow with the number of games.
+        self.assertEqual(small, large)
+        games = Game.objects.filter(tournament_entry__tournament=tournament)
+        self.assertEqual(games.count(), 4)
+        for game in games:
+            self.assertIsNotNone(game.started_at)
+            self.assertEqual(game.pops_left, 3)
+            self.assertEqual(Deck.objects.for_game(game).count(), 20)
+            # The players are closed into a loop, with the first active.
+            players = list(UserGame.objects.for_game(game).order_by("pk"))
+            self.assertTrue(players[0].is_active)
+            self.assertEqual(
+                [p.next_player_id for p in players], [p.pk for p in players[1:] + players[:1]]
+            )
+            self.assertEqual(
+                list(GameEvent.objects.for_game(game).values_list("kind", flat=True)),
+                ["join"] * 4 + ["start"],
+            )
+
+    def test_winners_advance_to_the_final(self):
+        tournament = tournaments.start("Cup", self.users[:4], 2, 20)
+        first, second = Game.objects.filter(
+            tournament_entry__tournament=tournament
+        ).order_by("tournament_entry__position")
+
+        winners = [self.win(first)]
+        self.assertFalse(TournamentGame.objects.filter(tournament=tournament, round=2).exists())
+        winners.append(self.win(second))
+
+        final = TournamentGame.objects.get(tournament=tournament, round=2)
+        self.assertEqual(
+            list(final.game.players.order_by("pk").values_list("user_id", flat=True)), winners
+        )
+        self.assertIsNotNone(final.game.started_at)
+
+        champion = self.win(final.game)
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.winner_id, champion)
+        self.assertIsNotNone(tournament.finished_at)
+
+    def test_bye_goes_through(self):
+        tournament = tournaments.start("Cup", self.users[:3], 2, 20)
+        bye = TournamentGame.objects.get(tournament=tournament, round=1, bye=True)
+        self.assertIsNone(bye.game)
+        self.assertEqual(bye.winner, self.users[2])
+
+        winner = self.win(TournamentGame.objects.get(tournament=tournament, round=1, position=0).game)
+
+        final = TournamentGame.objects.get(tournament=tournament, round=2)
+        self.assertEqual(
+            list(final.game.players.order_by("pk").values_list("user_id", flat=True)),
+            [winner, self.users[2].pk],
+        )
+
+    def test_abandoned_game_is_forfeited(self):
+        tournament = tournaments.start("Cup", self.users[:4], 2, 20)
+        first, second = TournamentGame.objects.filter(tournament=tournament).order_by("position")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(housekeeping.reap([first.game_id]), 1)
+        first.refresh_from_db()
+        self.assertEqual(first.winner, self.users[0])
+
+        winner = self.win(second.game)
+        final = TournamentGame.objects.get(tournament=tournament, round=2)
+        self.assertEqual(
+            list(final.game.players.order_by("pk").values_list("user_id", flat=True)),
+            [self.users[0].pk, winner],
+        )
+
+    def test_archiving_keeps_the_bracket(self):
+        tournament = tournaments.start("Cup", self.users[:4], 2, 20)
+        first, second = TournamentGame.objects.filter(tournament=tournament).order_by("position")
+        winners = [self.win(first.game)]
+
+        # The tournament's finished game stays while it is being played.
+        self.assertEqual(archive.archive_finished(), 0)
+        winners.append(self.win(second.game))
+        final = TournamentGame.objects.get(tournament=tournament, round=2)
+        champion = self.win(final.game)
+
+        self.assertEqual(archive.archive_finished(), 3)
+        entries = TournamentGame.objects.filter(tournament=tournament).order_by("round", "position")
+        self.assertEqual([e.game for e in entries], [None] * 3)
+        self.assertEqual([e.bye for e in entries], [False] * 3)
+        self.assertEqual([e.winner_id for e in entries], winners + [champion])
+
+        login(self.client, self.users[0])
+        response = self.client.get(reverse("tournament", args=[tournament.pk]))
+        self.assertContains(response, "Archived")
+        self.assertNotContains(response, "Bye")
+
+    def test_bots_play_a_tournament_out(self):
+        bots_ = Bots(click_delay=0.5, max_clicks=3)
+        bot_users = User.objects.bulk_create(
+            [User(email=f"bot{i}@bots.invalid", display_name="Bot") for i in range(4)]
+        )
+        with mock.patch("game.bots.bots", bots_):
+            tournament = tournaments.start("Bots", bot_users, 2, 20)
+
+            for _ in range(5_000):
+                tournament.refresh_from_db()
+                if tournament.finished_at:
+                    break
+                for game in Game.objects.filter(
+                    tournament_entry__tournament=tournament, finished_at=None
+                ):
+                    self.assertTrue(bots_.players(game.pk))
+                    bots_.act(game.pk, active_user_pk(game), 1)
+
+        self.assertIn(tournament.winner, bot_users)
+        self.assertEqual(bots_.stats["games"], 3)
+        for game_pk in Game.objects.values_list("pk", flat=True):
+            wheel.cancel(bot_key(game_pk))
+
+    def test_worker_adopts_bots_seated_by_a_command(self):
+        bot_users = User.objects.bulk_create(
+            [User(email=f"bot{i}@bots.invalid", display_name="Bot") for i in range(4)]
+        )
+        # The command's bots, gone with its process.
+        with mock.patch("game.bots.bots", Bots(click_delay=0.5, max_clicks=3)):
+            tournament = tournaments.start("Bots", bot_users, 2, 20)
+        games = list(Game.objects.filter(tournament_entry__tournament=tournament))
+        for game in games:
+            wheel.cancel(bot_key(game.pk))
+
+        worker = Bots(click_delay=0.5, max_clicks=3)
+        self.assertEqual(worker.adopt(), 4)
+        self.assertEqual(worker.adopt(), 0)
+
+        for game in games:
+            self.assertEqual(
+                worker.players(game.pk), set(game.players.values_list("user", flat=True))
+            )
+            self.assertIn(bot_key(game.pk), wheel)
+            wheel.cancel(bot_key(game.pk))
+
+    def test_bracket_page(self):
+        tournament = tournaments.start("Cup", self.users[:3], 2, 20)
+        login(self.client, self.users[0])
+
+        response = self.client.get(reverse("tournament", args=[tournament.pk]))
+        self.assertContains(response, "Round 1")
+        self.assertContains(response, "Bye")
+
+        again = self.client.get(
+            reverse("tournament", args=[tournament.pk]),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "start_tournament", "Cup", *[u.email for u in self.users[:5]], stdout=out
+        )
+
+        self.assertIn("Started Cup with 2 games", out.getvalue())
+
+
+class TestExport(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.bob = User.objects.create(email="bob@example.com", display_name="Bob")
+        cls.card = Card.objects.create(
+            name="Skip", description="", rarity=40, effect="skip", image="skip.jpg"
+        )
+
+    def setUp(self):
+        super().setUp()
+        for finish in (True, True, False):
+            game = Game.objects.create_with_player(self.alice)
+            game.join(self.bob.email)
+            Deck.objects.bulk_create(
+                Deck(game=game, card=self.card, placement=i) for i in range(1, 6)
+            )
+            Hand.objects.create(game=game, user=self.alice, card=self.card)
+            if finish:
+                game.finish()
+        # One of the finished games is only in the archive.
+        archive.archive_finished(batch_size=1)
+
+    def counts(self, records) -> dict[str, int]:
+        counts = {}
+        for record in records:
+            counts[record["type"]] = counts.get(record["type"], 0) + 1
+        return counts
+
+    def test_records_cover_live_and_archived_games(self):
+        records = list(export.records(chunk_size=2))
+
+        self.assertEqual(
+            self.counts(records), {"game": 3, "player": 6, "hand": 3, "deck": 15}
+        )
+        archived = ArchivedGame.objects.get()
+        self.assertIn(
+            {
+                "type": "hand",
+                "game_id": archived.pk,
+                "id": mock.ANY,
+                "user_id": self.alice.pk,
+                "card_id": self.card.pk,
+                "quantity": 1,
+            },
+            records,
+        )
+
+    def test_finished_only(self):
+        records = list(export.records(finished_only=True))
+
+        self.assertEqual(
+            self.counts(records), {"game": 2, "player": 4, "hand": 2, "deck": 10}
+        )
+
+    def test_ndjson_and_gzip(self):
+        records = list(export.records())
+        chunks = list(export.ndjson(records, buffer_size=100))
+
+        self.assertGreater(len(chunks), 1)
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), len(records))
+        self.assertEqual(json.loads(lines[-1]), records[-1])
+        self.assertEqual(
+            gzip.decompress(b"".join(export.gzipped(iter(chunks)))), b"".join(chunks)
+        )
+
+    def test_view_is_for_staff(self):
+        login(self.client, self.alice)
+
+        response = self.client.get(reverse("export_games"))
+
+        self.assertRedirects(response, f"/admin/login/?next={reverse('export_games')}")
+
+    async def test_view_streams_gzip(self):
+        staff = await get_user_model().objects.acreate(username="staff", is_staff=True)
+        await self.async_client.aforce_login(staff)
+
+        response = await self.async_client.get(
+            reverse("export_games"), headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(lines), 27)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.ndjson.gz")
+            call_command("export_games", "-o", path, "--gzip", stdout=StringIO())
+
+            with gzip.open(path, "rt") as f:
+                self.assertEqual(len(f.readlines()), 27)
+
+
+class TestPlayerStats(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            [User(email=f"player{i}@example.com", display_name=f"Player {i}") for i in range(3)]
+        )
+        cls.card = Card.objects.create(
+            name="Skip", description="", rarity=40, effect="skip", image="skip.jpg"
+        )
+
+    def tearDown(self):
+        for game_pk in Game.objects.values_list("pk", flat=True):
+            wheel.cancel(game_pk)
+
+    def play(self) -> Game:
+        """Play a game of everyone out, the first player playing a card, and flush its events."""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            game = Game.objects.create_with_player(self.users[0])
+            for user in self.users[1:]:
+                game.join(user.email)
+            game.start()
+            Hand.objects.create(game=game, user=self.users[0], card=self.card)
+            Hand.objects.remove_played_card(self.card.pk, self.users[0].pk, game)
+            while game.finished_at is None:
+                game.until_next_pop = 1
+                click_kernel(game)
+                if game.finished_at is None:
+                    pass_turn(game, UserGame.objects.is_active_for_game(game).get().user.email)
+        self.log.flush()
+        return game
+
+    def table(self) -> dict[int, tuple]:
+        return {
+            stats.user_id: tuple(getattr(stats, field) for field in PlayerStats.COUNTERS)
+            for stats in PlayerStats.objects.all()
+        }
+
+    def test_counters_follow_the_game(self):
+        game = self.play()
+
+        winner = UserGame.objects.for_game(game).alive().get().user_id
+        for user in self.users:
+            stats = PlayerStats.objects.get(user=user)
+            self.assertEqual(stats.games, 1)
+            self.assertEqual(stats.wins, int(user.pk == winner))
+            self.assertEqual(stats.eliminations, int(user.pk != winner))
+            self.assertEqual(stats.cards_played, int(user == self.users[0]))
+
+    def test_abandoned_games_dont_count(self):
+        game = Game.objects.create_with_player(self.users[0])
+        game.join(self.users[1].email)
+        game.finish()
+
+        self.assertFalse(PlayerStats.objects.exists())
+
+    def test_rebuild_matches_the_counters(self):
+        self.play()
+        self.play()
+        archive.archive_finished(batch_size=1)
+        kept = self.table()
+
+        PlayerStats.objects.update(wins=0, games=7)
+        self.assertEqual(stats.rebuild(chunk_size=1), 2)
+
+        self.assertEqual(self.table(), kept)
+
+    def test_leaderboard_reads_the_ranking_index(self):
+        plan = PlayerStats.objects.leaderboard()[:50].explain()
+
+        self.assertIn("playerstats_ranking_idx", plan)
+
+    def test_leaderboard_page(self):
+        self.play()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("leaderboard"))
+
+        self.assertContains(response, "Player 0")
+        self.assertEqual(response.context["leaders"][0].wins, 1)
+
+    def test_command(self):
+        self.play()
+        out = StringIO()
+
+        call_command("rebuild_stats", stdout=out)
+
+        self.assertIn("from 1 games", out.getvalue())
+
+
+class TestHands(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.game = Game.objects.create_with_player(cls.alice)
+        cls.salt, cls.skip = Card.objects.bulk_create(
+            [
+                Card(name="Salt", description="", rarity=50, effect="lucky_turn", image=""),
+                Card(name="Skip", description="", rarity=40, effect="skip", image=""),
+            ]
+        )
+
+    def quantities(self) -> dict[int, int]:
+        return dict(Hand.objects.for_game(self.game).values_list("card", "quantity"))
+
+    def test_draws_add_to_one_row(self):
+        for card in (self.salt, self.salt, self.skip):
+            with self.assertNumQueries(1):
+                Hand.objects.add_drawn_card(card, self.alice, self.game)
+
+        self.assertEqual(self.quantities(), {self.salt.pk: 2, self.skip.pk: 1})
+
+    def test_plays_take_one_off(self):
+        Hand.objects.add_drawn_card(self.salt, self.alice, self.game)
+        Hand.objects.add_drawn_card(self.salt, self.alice, self.game)
+
+        self.assertEqual(
+            Hand.objects.remove_played_card(self.salt.pk, self.alice.pk, self.game), self.salt
+        )
+        self.assertEqual(
+            Hand.objects.remove_played_card(self.salt.pk, self.alice, self.game), self.salt
+        )
+        self.assertIsNone(Hand.objects.remove_played_card(self.salt.pk, self.alice.pk, self.game))
+        self.assertEqual(self.quantities(), {self.salt.pk: 0})
+
+        # Drawing it again picks the row back up.
+        Hand.objects.add_drawn_card(self.salt, self.alice, self.game)
+        self.assertEqual(self.quantities(), {self.salt.pk: 1})
+
+    def test_hand_renders_from_one_query(self):
+        for card in (self.salt, self.salt, self.skip):
+            Hand.objects.add_drawn_card(card, self.alice, self.game)
+        Hand.objects.remove_played_card(self.skip.pk, self.alice.pk, self.game)
+
+        # The hand, and the fragments not rendered yet.
+        with self.assertNumQueries(2):
+            html = render_hand(self.game, self.alice.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(render_hand(self.game, self.alice.pk), html)
+
+        self.assertEqual(html.count(f"handleCard({self.salt.pk})"), 2)
+        self.assertNotIn(f"handleCard({self.skip.pk})", html)
+
+    def test_card_changes_drop_its_fragment(self):
+        Hand.objects.add_drawn_card(self.salt, self.alice, self.game)
+        render_hand(self.game, self.alice.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = "Sea Salt"
+            self.salt.save()
+
+        self.assertIn("Sea Salt", render_hand(self.game, self.alice.pk))
+
+    def test_fragment_links_the_card_image(self):
+        card = Card.objects.create(
+            name="Butter", description="", rarity=1, effect="lucky_turn", image="butter.jpg"
+        )
+
+        html = self.fragments.get_many([card.pk])[card.pk]
+
+        self.assertIn('src="/static/butter.jpg"', html)
+
+
+class TestCrystalBall(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(email="alice@example.com", display_name="Alice")
+        cls.game = Game.objects.create_with_player(cls.alice)
+        cards = Card.objects.bulk_create(
+            Card(name=f"Card {i}", description="", rarity=1, effect="skip", image="")
+            for i in range(30)
+        )
+        # Shuffled placements, the first three already drawn.
+        Deck.objects.bulk_create(
+            Deck(game=cls.game, card=card, placement=(i * 7) % 30, is_played=i < 3)
+            for i, card in enumerate(cards)
+        )
+        cls.order = [
+            card.name
+            for i, card in sorted(enumerate(cards), key=lambda pair: (pair[0] * 7) % 30)
+            if i >= 3
+        ]
+
+    def test_peek_is_the_next_cards_in_order(self):
+        with self.assertNumQueries(1):
+            peeked = [deck.card.name for deck in Deck.objects.peek(self.game, 5)]
+
+        self.assertEqual(peeked, self.order[:5])
+
+    def test_peek_reads_the_index(self):
+        plan = Deck.objects.peek(self.game, 5).explain()
+
+        self.assertIn("deck_next_cards_idx", plan)
+
+    def test_crystal_balls(self):
+        with self.assertNumQueries(1):
+            message = effects.crystal_ball(self.game)
+        self.assertEqual(message, f"The next 5 cards are: {', '.join(self.order[:5])}")
+
+        with self.assertNumQueries(1):
+            message = effects.super_crystal_ball(self.game)
+        self.assertEqual(message, f"The next 20 cards are: {', '.join(self.order[:20])}")
+
+    def test_crystal_ball_near_the_end(self):
+        Deck.objects.filter(card__name__in=self.order[2:]).update(is_played=True)
+
+        self.assertEqual(
+            effects.super_crystal_ball(self.game),
+            f"The next 2 cards are: {', '.join(self.order[:2])}",
+        )
+
+        Deck.objects.for_game(self.game).update(is_played=True)
+        self.assertIn("empty", effects.crystal_ball(self.game))
+
+
+class TestImages(GameTestCase):
+    FORMATS: ClassVar[dict[str, int]] = {"avif": 50, "webp": 80}
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source, self.output = Path(tmp.name, "public"), Path(tmp.name, "dist")
+        (self.source / "cards").mkdir(parents=True)
+        Image.new("RGBA", (400, 200), (255, 200, 0, 128)).save(self.source / "big kernel.png")
+        Image.new("L", (100, 50), 128).save(self.source / "cards" / "salt.jpg")
+        for i, size in enumerate([(600, 400), (300, 900)]):
+            Image.new("RGBA", size, (255, 255, 255, 255)).save(self.source / f"pop_{i}.png")
+
+    def optimize(self, sprites=None):
+        sprites = {"pop": ["pop_0.png", "pop_1.png"]} if sprites is None else sprites
+        return images.optimize(self.source, self.output, [160, 320], self.FORMATS, sprites)
+
+    def sprite_css(self):
+        with self.settings(GAME_IMAGES={**settings.GAME_IMAGES, "OUTPUT": self.output}):
+            return images.sprite_css("pop", ["pop_0.png", "pop_1.png"])
+
+    def test_variants_at_each_width_below_the_original(self):
+        manifest = self.optimize()["images"]
+
+        big = manifest["big kernel.png"]
+        self.assertEqual((big["width"], big["height"]), (400, 200))
+        self.assertEqual([w for w, _, _ in big["variants"]["avif"]], [160, 320])
+        self.assertEqual([w for w, _, _ in manifest["cards/salt.jpg"]["variants"]["webp"]], [100])
+
+        for width, name, size in big["variants"]["webp"]:
+            self.assertRegex(name, rf"^img/big-kernel-{width}\.[0-9a-f]{{12}}\.webp$")
+            with Image.open(self.output / name) as variant:
+                self.assertEqual((variant.format, variant.width), ("WEBP", width))
+            self.assertEqual((self.output / name).stat().st_size, size)
+
+        self.assertEqual(
+            json.loads((self.output / "images.json").read_text())["images"],
+            json.loads(json.dumps(manifest)),
+        )
+
+    def test_rerunning_keeps_names_and_drops_stale_variants(self):
+        first = self.optimize()
+        stale = self.output / "img" / "old-160.000000000000.webp"
+        stale.write_bytes(b"")
+
+        self.assertEqual(self.optimize(), first)
+        self.assertFalse(stale.exists())
+
+    def test_picture_offers_the_variants(self):
+        self.optimize()
+        template = Template(
+            "{% load images %}{% picture name sizes='208px' alt='' class='w-52' %}"
+        )
+
+        with self.settings(GAME_IMAGES={**settings.GAME_IMAGES, "OUTPUT": self.output}):
+            html = template.render(Context({"name": "big kernel.png"}))
+            missing = template.render(Context({"name": "missing.png"}))
+
+        self.assertIn('<source type="image/avif" srcset="/static/img/big-kernel-160.', html)
+        self.assertIn('320w" sizes="208px">', html)
+        self.assertIn(
+            '<img alt="" class="w-52" height="200" src="/static/big%20kernel.png" width="400">',
+            html,
+        )
+        self.assertEqual(missing, '<img alt="" class="w-52" src="/static/missing.png">')
+
+    def test_command(self):
+        out = StringIO()
+
+        sprites = {"pop": ["pop_0.png", "pop_1.png"]}
+        with self.settings(GAME_IMAGES={**settings.GAME_IMAGES, "SPRITES": sprites}):
+            call_command(
+                "optimize_images", source=self.source, output=self.output, widths=[160], stdout=out
+            )
+
+        self.assertIn("Originals:", out.getvalue())
+        # Two variants of each of the four images, and the sprite's three atlases.
+        self.assertIn("pop sprite: 2 images", out.getvalue())
+        self.assertIn("Wrote 11 files", out.getvalue())
+
+    def test_command_skips_formats_pillow_cant_write(self):
+        out, err = StringIO(), StringIO()
+
+        with mock.patch("PIL.features.check", side_effect=lambda format_: format_ != "avif"):
+            call_command(
+                "optimize_images", source=self.source, output=self.output, widths=[160],
+                stdout=out, stderr=err,
+            )
+
+        self.assertIn("Skipping avif", err.getvalue())
+        self.assertNotIn("avif", out.getvalue())
+        self.assertIn("webp", out.getvalue())
+
+    def test_sprite_packs_its_images_into_one_atlas(self):
+        sprite = self.optimize()["sprites"]["pop"]
+
+        self.assertEqual(sprite["frames"], 2)
+        self.assertEqual(list(sprite["atlas"]), ["png", "avif", "webp"])
+        with Image.open(self.output / sprite["atlas"]["png"][0]) as atlas:
+            self.assertEqual(atlas.size, (2 * images.SPRITE_CELL, images.SPRITE_CELL))
+            atlas = atlas.convert("RGBA")
+            # Each image is scaled to fit its cell, and centered in it.
+            self.assertEqual(atlas.getpixel((0, 0))[3], 0)
+            self.assertEqual(atlas.getpixel((64, 64))[3], 255)
+            self.assertEqual(atlas.getpixel((128, 64))[3], 0)
+            self.assertEqual(atlas.getpixel((192, 0))[3], 255)
+
+    def test_sprite_css(self):
+        self.assertEqual(
+            self.sprite_css(),
+            '.pop-0{background:url("/static/pop_0.png") center/contain no-repeat}'
+            '.pop-1{background:url("/static/pop_1.png") center/contain no-repeat}',
+        )
+
+        sprite = self.optimize()["sprites"]["pop"]
+        css = self.sprite_css()
+
+        png = sprite["atlas"]["png"][0]
+        self.assertIn(f'.pop{{background:url("/static/{png}") 0 0/200% 100% no-repeat;', css)
+        self.assertIn('type("image/avif")', css)
+        self.assertIn(".pop-0{background-position:0% 0}.pop-1{background-position:100% 0}", css)
+
+
+class TestStaticAssets(GameTestCase):
+    SCRIPT = b"function pop() { return 'popcorn'; }\n" * 100
+    PRODUCTION: ClassVar[dict[str, dict[str, str]]] = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "game.assets.CompressedManifestStaticFilesStorage"},
+    }
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source, self.root = Path(tmp.name, "src"), Path(tmp.name, "root")
+        (source / "img").mkdir(parents=True)
+        (source / "app.js").write_bytes(self.SCRIPT)
+        Image.new("RGB", (8, 8)).save(source / "kernel.png")
+        (source / "img" / "ufo-160.0123456789ab.avif").write_bytes(b"avif")
+
+        with self.settings(
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATIC_ROOT=self.root,
+            STORAGES=self.PRODUCTION,
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        self.paths = json.loads((self.root / "staticfiles.json").read_text())["paths"]
+        self.script = (self.root / self.paths["app.js"]).read_bytes()
+
+    def get(self, path: str, *headers: tuple[bytes, bytes]) -> dict:
+        async def not_found(scope, receive, send):
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            await send({"type": "http.response.body", "body": b"django"})
+
+        app = assets.StaticFiles(not_found, self.root, "static/")
+        communicator = HttpCommunicator(app, "GET", path, headers=list(headers))
+        response = async_to_sync(communicator.get_response)()
+        response["headers"] = dict(response["headers"])
+        return response
+
+    def test_collected_files_are_hashed_and_compressed(self):
+        script = self.root / self.paths["app.js"]
+
+        self.assertRegex(self.paths["app.js"], r"^app\.[0-9a-f]{12}\.js$")
+        self.assertEqual(
+            gzip.decompress(script.with_name(script.name + ".gz").read_bytes()), self.script
+        )
+        # Images are compressed already.
+        self.assertFalse(self.root.joinpath(self.paths["kernel.png"] + ".gz").exists())
+        # Names hashed before collectstatic are left alone.
+        name = "img/ufo-160.0123456789ab.avif"
+        self.assertEqual(self.paths[name], name)
+
+    @skipUnless(importlib.util.find_spec("rjsmin"), "Minifying needs rjsmin.")
+    def test_scripts_are_minified(self):
+        self.assertEqual(self.script, b"\n".join([b"function pop(){return'popcorn';}"] * 100))
+
+    @skipUnless(importlib.util.find_spec("brotli"), "Brotli siblings need brotli.")
+    def test_brotli_is_preferred(self):
+        import brotli
+
+        response = self.get(
+            f"/static/{self.paths['app.js']}", (b"accept-encoding", b"gzip, deflate, br")
+        )
+
+        self.assertEqual(response["headers"][b"content-encoding"], b"br")
+        self.assertEqual(brotli.decompress(response["body"]), self.script)
+
+    def test_hashed_files_are_immutable_and_precompressed(self):
+        response = self.get(
+            f"/static/{self.paths['app.js']}", (b"accept-encoding", b"br;q=0, gzip")
+        )
+
+        self.assertEqual(response["status"], 200)
+        self.assertEqual(response["headers"][b"content-encoding"], b"gzip")
+        self.assertEqual(response["headers"][b"vary"], b"Accept-Encoding")
+        self.assertEqual(response["headers"][b"content-type"], b"text/javascript")
+        self.assertIn(b"immutable", response["headers"][b"cache-control"])
+        self.assertEqual(gzip.decompress(response["body"]), self.script)
+
+        plain = self.get(f"/static/{self.paths['app.js']}")
+        self.assertNotIn(b"content-encoding", plain["headers"])
+        self.assertEqual(plain["body"], self.script)
+
+    def test_unhashed_files_are_revalidated(self):
+        response = self.get("/static/app.js")
+        self.assertEqual(response["headers"][b"cache-control"], b"no-cache")
+
+        etag = response["headers"][b"etag"]
+        revalidated = self.get("/static/app.js", (b"if-none-match", etag))
+        self.assertEqual((revalidated["status"], revalidated["body"]), (304, b""))
+
+    def test_everything_else_goes_to_the_app(self):
+        for path in ["/static/missing.js", "/static/../src/app.js", "/games/"]:
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)["body"], b"django")
@@ -0,0 +1,124 @@
+"""
+throttle.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Throttle
+
+Token bucket rate limits for the game sockets. Every inbound message is
+charged to a bucket of its socket and a bucket of its game, one per message
+type, before the consumer touches the database; a message either bucket
+can't pay for is dropped. Outbound, click animations are charged to a bucket
+of the receiving socket, at least as large as the game's inbound click limit,
+so every click the game accepts reaches every socket and only clicks beyond
+that, like bots clicking on top of a busy game, are dropped. The bucket
+doesn't know how far behind a socket is: everything outbound, clicks
+included, is bounded by the channel layer's per-channel capacity, and a
+player who misses something resumes from the last event they saw, see
+`game/resume.py`.
+
+The limits live in `GAME_RATE_LIMITS`, as (tokens per second, burst) per
+message type, with "default" for the types not listed.
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+@dataclass
+class TokenBucket:
+    """Refills `rate` tokens a second, holding at most `burst`."""
+
+    rate: float
+    burst: float
+    tokens: float
+    updated: float
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Throttle:
+    """
+    # Throttle.
+
+    The buckets and counters of this worker.
+    Thread safe, since sync consumers run in worker threads.
+    """
+
+    def __init__(self, limits: dict[str, dict[str, tuple[float, float]]]):
+        self.limits = limits
+        self._lock = threading.Lock()
+        # By owner, a socket's channel name or a game's pk, then (scope, message type),
+        # so a closed socket or a finished game drops its buckets at once.
+        self._buckets: dict[object, dict[tuple[str, str], TokenBucket]] = {}
+        self._counters: Counter[tuple[str, str, str]] = Counter()
+
+    def _take(self, scope: str, key, type_: str, now: float) -> bool:
+        limits = self.limits.get(scope, {})
+        if (limit := limits.get(type_, limits.get("default"))) is None:
+            return True
+
+        buckets = self._buckets.setdefault(key, {})
+        bucket = buckets.get((scope, type_))
+        if bucket is None:
+            rate, burst = limit
+            bucket = buckets[(scope, type_)] = TokenBucket(rate, burst, burst, now)
+        return bucket.take(now)
+
+    def allow(
+        self, game_pk: int, channel_name: str, type_: str, now: float | None = None
+    ) -> bool:
+        """Charge an inbound message to its socket and game. False if it should be dropped."""
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._take("SOCKET", channel_name, type_, now):
+                self._counters["SOCKET", type_, "throttled"] += 1
+                return False
+            if not self._take("GAME", game_pk, type_, now):
+                self._counters["GAME", type_, "throttled"] += 1
+                return False
+            self._counters["INBOUND", type_, "allowed"] += 1
+            return True
+
+    def deliver(self, channel_name: str, type_: str, now: float | None = None) -> bool:
+        """Charge an outbound message to its socket. False if it should be dropped."""
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._take("OUTBOUND", channel_name, type_, now):
+                self._counters["OUTBOUND", type_, "dropped"] += 1
+                return False
+            return True
+
+    def leave(self, channel_name: str):
+        """Drop the buckets of a closed socket."""
+
+        with self._lock:
+            self._buckets.pop(channel_name, None)
+
+    def forget(self, game_pk: int):
+        with self._lock:
+            self._buckets.pop(game_pk, None)
+
+    def counters(self) -> dict[str, dict[str, dict[str, int]]]:
+        """The counters as {scope: {message type: {outcome: count}}}."""
+
+        stats = {}
+        with self._lock:
+            for (scope, type_, outcome), count in sorted(self._counters.items()):
+                stats.setdefault(scope, {}).setdefault(type_, {})[outcome] = count
+        return stats
+
+
+throttle = Throttle(settings.GAME_RATE_LIMITS)
@@ -0,0 +1,108 @@
+"""
+timers.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Timer Wheel
+
+One hashed timer wheel per worker drives every game's turn timer, instead
+of an `asyncio.sleep` task per turn. Scheduling, cancelling and
+rescheduling are O(1) dict operations, and each tick only looks at the
+timers hashed into one slot.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Timer:
+    callback: Callable[[], object]
+    # Full turns of the wheel left before the timer is due.
+    rounds: int
+
+
+class TimerWheel:
+    """
+    # TimerWheel.
+
+    Timers are keyed, a key has at most one timer, so scheduling a key
+    again reschedules it. Timers fire within one tick of their deadline.
+
+    Thread safe, since sync consumers schedule from worker threads
+    while `run` advances the wheel on the event loop.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 512):
+        self.tick = tick
+        self._slots: list[dict[Hashable, Timer]] = [{} for _ in range(slots)]
+        self._where: dict[Hashable, int] = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key: Hashable):
+        return key in self._where
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], object]):
+        """Call `callback` in `delay` seconds, replacing any timer for the key."""
+
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self._lock:
+            self._cancel(key)
+            slot = (self._cursor + ticks) % len(self._slots)
+            self._slots[slot][key] = Timer(callback, (ticks - 1) // len(self._slots))
+            self._where[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel the key's timer. False if it had none."""
+
+        with self._lock:
+            return self._cancel(key)
+
+    def _cancel(self, key: Hashable) -> bool:
+        if (slot := self._where.pop(key, None)) is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def advance(self) -> list[Callable[[], object]]:
+        """Move the wheel one tick, returning the callbacks that are now due."""
+
+        due = []
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            for key, timer in list(slot.items()):
+                if timer.rounds:
+                    timer.rounds -= 1
+                else:
+                    del slot[key]
+                    del self._where[key]
+                    due.append(timer.callback)
+        return due
+
+    async def run(self):
+        """Advance the wheel every tick, forever, calling due timers on the loop."""
+
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            next_tick += self.tick
+            for callback in self.advance():
+                try:
+                    callback()
+                except Exception:
+                    logger.exception("Timer callback failed")
+
+
+wheel = TimerWheel()
@@ -0,0 +1,115 @@
+"""
+tournaments.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Tournaments
+
+A tournament seats its players in games of up to `game_size`, and the
+winner of each game goes through to the next round until one is left. A
+round's games, their players and decks are created and started together
+with bulk writes (`Tournament.create_round`), so a round of hundreds of
+games costs a few dozen queries and nobody has to press "Start Game".
+
+When a tournament game is won, `finished` records its winner. A game
+abandoned mid-play and closed by the reaper is decided the same way, by
+forfeit: the first player still in, in seat order, goes through. The last
+game of a round to be decided starts the next round. Bots in the bracket are
+seated in their next game, so a tournament of bots plays itself out on the
+timer wheel, see `bench/tournament.py`.
+"""
+
+from django.db import transaction
+
+from game.models import Game, Tournament, TournamentGame, User, UserGame
+
+
+def groups(users: list[User], size: int) -> list[list[User]]:
+    """Split the players, in order, into as few games of at most `size` as evenly as possible."""
+
+    count = -(-len(users) // size)
+    base, extra = divmod(len(users), count)
+    result, start = [], 0
+    for i in range(count):
+        end = start + base + (i < extra)
+        result.append(users[start:end])
+        start = end
+    return result
+
+
+def begin(games: list[Game], groups: list[list[User]]):
+    """Seat the bots of the new games and start everyone's first turn."""
+
+    from game.bots import bots, is_bot
+    from game.consumers import schedule_turn
+
+    for game, group in zip(games, [group for group in groups if len(group) > 1]):
+        for user in group:
+            if is_bot(user):
+                bots.seat(game.pk, user)
+        # Players are seated in order, the first is active.
+        schedule_turn(game, group[0].pk)
+
+
+def start(name: str, users: list[User], game_size: int = 4, deck_size: int = 500) -> Tournament:
+    """Create a tournament and start its first round."""
+
+    if len(users) < 2:
+        raise ValueError("A tournament needs at least two players.")
+
+    bracket = groups(users, game_size)
+    with transaction.atomic():
+        tournament = Tournament.objects.create(
+            name=name, game_size=game_size, deck_size=deck_size
+        )
+        games = tournament.create_round(1, bracket)
+
+    begin(games, bracket)
+    return tournament
+
+
+def finished(game: Game) -> Tournament | None:
+    """Record the winner of a finished game, if it is a tournament game.
+
+    That's the player left, or of a game ended early, the first still in.
+
+    Once every game of the round is decided the next round is started,
+    or the tournament is won.
+    """
+
+    entry = (
+        TournamentGame.objects.filter(game=game).select_related("tournament").first()
+    )
+    if entry is None:
+        return None
+
+    tournament = entry.tournament
+    entry.winner_id = (
+        UserGame.objects.for_game(game)
+        .alive()
+        .order_by("pk")
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    entry.save(update_fields=["winner"])
+
+    round_ = TournamentGame.objects.for_round(tournament, entry.round)
+    if round_.undecided().exists():
+        return tournament
+
+    # The round's last games may finish at the same time,
+    # only the one that moves the round on starts the next.
+    if not Tournament.objects.filter(pk=tournament.pk, round=entry.round).update(
+        round=entry.round + 1
+    ):
+        return tournament
+
+    winners = [e.winner for e in round_.select_related("winner")]
+    if len(winners) == 1:
+        tournament.finish(winners[0])
+        return tournament
+
+    bracket = groups(winners, tournament.game_size)
+    games = tournament.create_round(entry.round + 1, bracket)
+    begin(games, bracket)
+    return tournament
@@ -6,6 +6,7 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Urls
 """
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import path
 
 from game import views
@@ -19,4 +20,22 @@ urlpatterns = [
     ),
     path("games/create/", views.authed(views.GameCreateView.as_view()), name="create"),
     path("game/<int:pk>/", views.authed(views.GameDetailView.as_view()), name="detail"),
+    path("games/live/", views.LiveGameListView.as_view(), name="live"),
+    path("game/<int:pk>/watch/", views.GameWatchView.as_view(), name="watch"),
+    path(
+        "tournament/<int:pk>/",
+        views.authed(views.TournamentDetailView.as_view()),
+        name="tournament",
+    ),
+    path("leaderboard/", views.LeaderboardView.as_view(), name="leaderboard"),
+    path(
+        "stats/throttle/",
+        staff_member_required(views.throttle_stats),
+        name="throttle_stats",
+    ),
+    path(
+        "export/games.ndjson",
+        staff_member_required(views.export_games),
+        name="export_games",
+    ),
 ]
@@ -0,0 +1,69 @@
+"""
+versions.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+State Versions
+
+A version is a nanosecond timestamp kept in the cache under a key such as
+"lobby". Writers bump it whenever the state behind the key changes, readers
+fold it into cache keys so anything cached under an older version is never
+read again. If the cache forgets a version a new one is minted, which only
+costs a cache miss.
+
+Versions are bumped by management commands and the admin as well as the
+workers, so the cache has to be one every process shares, see CACHES in
+settings.
+"""
+
+import time
+from datetime import UTC, datetime
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _cache_key(key: str) -> str:
+    return f"version:{key}"
+
+
+def current(key: str) -> int:
+    """Get the current version for the key, minting one if there is none."""
+
+    if (version := cache.get(_cache_key(key))) is None:
+        cache.add(_cache_key(key), time.time_ns(), timeout=None)
+        version = cache.get(_cache_key(key))
+
+    return version
+
+
+def as_datetime(version: int) -> datetime:
+    """The moment the version was minted, i.e. for a `Last-Modified` header."""
+
+    return datetime.fromtimestamp(version / 1e9, tz=UTC)
+
+
+def game_key(pk: int) -> str:
+    """The version key for a single game's page."""
+
+    return f"game:{pk}"
+
+
+def tournament_key(pk: int) -> str:
+    """The version key for a tournament's bracket page."""
+
+    return f"tournament:{pk}"
+
+
+def bump(key: str) -> int:
+    """Mark the state behind the key as changed."""
+
+    version = time.time_ns()
+    cache.set(_cache_key(key), version, timeout=None)
+    return version
+
+
+def bump_on_commit(key: str):
+    """Bump the version once the surrounding transaction commits."""
+
+    transaction.on_commit(lambda: bump(key))
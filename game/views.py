@@ -8,22 +8,41 @@ Views
 
 import random
 
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, DetailView, FormView, ListView
-
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition
+from django.views.generic import (
+    CreateView,
+    DetailView,
+    FormView,
+    ListView,
+    TemplateView,
+)
+
+from game import export, lobby, versions
 from game.forms import GameForm, UserLoginForm
-from game.models import Game, User, UserGame
+from game.identity import get_identity, set_identity
+from game.models import Game, PlayerStats, Tournament, TournamentGame
+from game.throttle import throttle
 
 
 def authed(view):
-    """Make the given view only available to authed users."""
+    """Make the given view only available to authed users.
+
+    The user comes from the signed identity cookie, so no query is run
+    until the view reads a field the cookie doesn't carry.
+    """
 
     def inner(request, *args, **kwargs):
-        if not request.COOKIES.get("email"):
+        if (user := get_identity(request)) is None:
             return redirect("home")
 
-        request.game_user = User.objects.get_by_email(request.COOKIES["email"])
+        request.game_user = user
         return view(request, *args, **kwargs)
 
     return inner
@@ -33,8 +52,8 @@ def guest(view):
     """Make the given view only available to guest users (not authed)."""
 
     def inner(request, *args, **kwargs):
-        if request.COOKIES.get("email"):
-            request.game_user = User.objects.get_by_email(request.COOKIES["email"])
+        if (user := get_identity(request)) is not None:
+            request.game_user = user
             return redirect("lobby")
 
         return view(request, *args, **kwargs)
@@ -42,6 +61,43 @@ def guest(view):
     return inner
 
 
+def lobby_etag(request, *args, **kwargs):
+    """The lobby page only changes with the lobby version (and the page)."""
+
+    version = versions.current(lobby.LOBBY_GROUP)
+    return f"lobby-{version}-{request.GET.get('before', '')}"
+
+
+def lobby_last_modified(request, *args, **kwargs):
+    return versions.as_datetime(versions.current(lobby.LOBBY_GROUP))
+
+
+def game_etag(request, pk: int):
+    """The game page changes with the game's version and the viewing player."""
+
+    version = versions.current(versions.game_key(pk))
+    return f"game-{pk}-{version}-{request.game_user.pk}"
+
+
+def game_last_modified(request, pk: int):
+    return versions.as_datetime(versions.current(versions.game_key(pk)))
+
+
+def tournament_etag(request, pk: int):
+    """The bracket only changes when a round starts or the tournament is won."""
+
+    return f"tournament-{pk}-{versions.current(versions.tournament_key(pk))}"
+
+
+def tournament_last_modified(request, pk: int):
+    return versions.as_datetime(versions.current(versions.tournament_key(pk)))
+
+
+# Pages are validated on every load (no-cache), and a matching validator is
+# answered with a 304 before any template is rendered or player loaded.
+revalidate = cache_control(private=True, no_cache=True)
+
+
 class HomeView(FormView):
     """
     # Homepage view.
@@ -55,23 +111,35 @@ class HomeView(FormView):
     def form_valid(self, form):
         user = form.save()
 
-        response = redirect("lobby")
-        response.set_cookie("email", user.email)
-        return response
+        return set_identity(redirect("lobby"), user)
 
 
+@method_decorator(revalidate, name="dispatch")
+@method_decorator(
+    condition(etag_func=lobby_etag, last_modified_func=lobby_last_modified),
+    name="dispatch",
+)
 class GameLobbyListView(ListView):
     """
     # GameLobbyListView
 
     The list of active game lobbies.
     The only ones shown are the games that are not started.
+    Pages come from the lobby cache, see `game/lobby.py`.
     """
 
-    model = Game
     template_name = "game/game_list.html"
     context_object_name = "games"
-    queryset = Game.objects.not_started().with_player_count()
+
+    def get_queryset(self):
+        before = self.request.GET.get("before", "")
+        self.page = lobby.page(int(before) if before.isdigit() else None)
+        return self.page["games"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["next_before"] = self.page["next"]
+        return context
 
 
 class GameCreateView(CreateView):
@@ -94,6 +162,11 @@ class GameCreateView(CreateView):
         return kwargs
 
 
+@method_decorator(revalidate, name="dispatch")
+@method_decorator(
+    condition(etag_func=game_etag, last_modified_func=game_last_modified),
+    name="dispatch",
+)
 class GameDetailView(DetailView):
     """
     # GameDetailView.
@@ -101,24 +174,146 @@ class GameDetailView(DetailView):
     The main view of the application, this view is
     short since most of the data is passed through
     the websocket connection.
+
+    The page is built from one load of the game with its players and their
+    users prefetched, so the query budget is two. A player who hasn't
+    joined yet costs a third query, to load their email.
     """
 
     model = Game
     template_name = "game/game_detail.html"
     context_object_name = "game"
+    query_budget = 2
+
+    def get_queryset(self):
+        return Game.objects.with_players()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["alive_users"] = self.object.players.alive()
+        players = self.object.players.all()
+        context["alive_users"] = [p for p in players if p.killed_at is None]
+
+        creator = next((p.user for p in players if p.is_active), None)
+        player = next(
+            (p.user for p in players if p.user_id == self.request.game_user.pk),
+            self.request.game_user,
+        )
 
         # This is the collection of initial data
         # used to setup the websocket connection.
         context["data"] = {
-            "ws": f"/ws/game/{self.get_object().pk}",
-            "creator": UserGame.objects.is_active_for_game(self.get_object())
-            .get()
-            .user.email,
-            "player": self.request.game_user.email,
+            "ws": f"/ws/game/{self.object.pk}",
+            "creator": creator.email if creator else None,
+            "player": player.email,
+            "heartbeat": settings.GAME_HOUSEKEEPING["HEARTBEAT_INTERVAL"],
         }
 
         return context
+
+
+@method_decorator(revalidate, name="dispatch")
+@method_decorator(
+    condition(etag_func=tournament_etag, last_modified_func=tournament_last_modified),
+    name="dispatch",
+)
+class TournamentDetailView(DetailView):
+    """
+    # TournamentDetailView.
+
+    The bracket of a tournament, round by round.
+    Players come back here when their game is over and follow the link to
+    their next game. The page reloads itself, which costs a 304 until the
+    next round starts.
+    """
+
+    model = Tournament
+    template_name = "game/tournament_detail.html"
+    context_object_name = "tournament"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        entries = (
+            TournamentGame.objects.filter(tournament=self.object)
+            .select_related("winner")
+            .prefetch_related("game__players__user")
+            .order_by("round", "position")
+        )
+        rounds: dict[int, list[TournamentGame]] = {}
+        for entry in entries:
+            rounds.setdefault(entry.round, []).append(entry)
+        context["rounds"] = rounds
+        return context
+
+
+class LeaderboardView(ListView):
+    """
+    # LeaderboardView.
+
+    The players with the most wins, read straight off the ranking index
+    of the incrementally kept `PlayerStats`.
+    """
+
+    template_name = "game/leaderboard.html"
+    context_object_name = "leaders"
+    size = 50
+
+    def get_queryset(self):
+        return PlayerStats.objects.leaderboard()[: self.size]
+
+
+class LiveGameListView(ListView):
+    """
+    # LiveGameListView.
+
+    The newest games being played, each with a link to watch it.
+    """
+
+    template_name = "game/live_games.html"
+    context_object_name = "games"
+    size = 50
+
+    def get_queryset(self):
+        return Game.objects.in_progress().with_player_count().order_by("-pk")[: self.size]
+
+
+@never_cache
+def throttle_stats(request):
+    """The rate limit counters of this worker's game sockets, for staff."""
+
+    return JsonResponse(throttle.counters())
+
+
+@never_cache
+def export_games(request):
+    """Stream the game history as NDJSON, gzipped if the client takes it.
+
+    `?finished=1` leaves out the games still being played. The history has
+    every deck and hand, so it is for staff, logged in through the admin.
+    """
+
+    chunks = export.ndjson(export.records(finished_only=request.GET.get("finished") == "1"))
+    response = StreamingHttpResponse(content_type="application/x-ndjson")
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        chunks = export.gzipped(chunks)
+        response["Content-Encoding"] = "gzip"
+    response.streaming_content = export.streamed(chunks)
+    response["Content-Disposition"] = 'attachment; filename="games.ndjson"'
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+class GameWatchView(TemplateView):
+    """
+    # GameWatchView.
+
+    A read-only view of a game for spectators.
+    Everything is sent over the spectator websocket,
+    so the page itself doesn't touch the database.
+    """
+
+    template_name = "game/game_watch.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["data"] = {"ws": f"/ws/game/{kwargs['pk']}/watch"}
+        return context
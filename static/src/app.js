@@ -14,6 +14,10 @@ class GameState {
   #gameData;
   #currentPlayer;
   #player;
+  #lastSeq = 0;
+  #joined = false;
+  #leaving = false;
+  #retries = 0;
 
   /**
    * Create a game state.
@@ -23,11 +27,36 @@ class GameState {
   constructor(data, player) {
     this.#data = data;
     this.#player = player;
+    this.#connect();
+    this.#hideStartBtnIfNotCreator();
+  }
+
+  /**
+   * Open the WebSocket. The first connection joins the game, later ones resume it.
+   * @private
+   */
+  #connect() {
     const url = new URL(`ws://${document.location.host}${this.#data.ws}/`);
     this.#websocket = new WebSocket(url);
     this.#setupHandler();
-    this.#joinOnOpen();
-    this.#hideStartBtnIfNotCreator();
+    if (this.#joined) {
+      this.#resumeOnOpen();
+    } else {
+      this.#joinOnOpen();
+    }
+    this.#heartbeatOnOpen();
+    this.#reconnectOnClose();
+  }
+
+  /**
+   * Leave the game for good, without reconnecting.
+   * @private
+   */
+  #leave() {
+    this.#leaving = true;
+    this.stopSync();
+    this.#websocket.close();
+    location.replace("/games/");
   }
 
   /**
@@ -44,6 +73,13 @@ class GameState {
     this.#websocket.send(JSON.stringify({ type: "start" }));
   }
 
+  /**
+   * Send an "add_bot" message to the server to seat a bot before the game starts.
+   */
+  addBot() {
+    this.#websocket.send(JSON.stringify({ type: "add_bot" }));
+  }
+
   /**
    * Send a "click" message to the server if the current player is the active player.
    */
@@ -108,6 +144,7 @@ class GameState {
   #setupHandler() {
     this.#websocket.addEventListener("message", (ev) => {
       const data = JSON.parse(ev.data);
+      if (data.seq) this.#lastSeq = data.seq;
       switch (data.type) {
         case "join":
           alert(data.msg);
@@ -126,7 +163,7 @@ class GameState {
           break;
 
         case "click":
-          popcornExplosion({ clientX: 0, clientY: 0 });
+          popcornExplosion();
           break;
 
         case "sync":
@@ -148,26 +185,50 @@ class GameState {
           }
           break;
 
-        case "kill":
-          const active_player = this.#gameData.active_player;
+        case "kill": {
+          // The popped player was the active one, the server passes the turn
+          // on with an "end_turn" right after, unless the game is over.
+          const killed = data.game.active_player;
           this.#gameData = data.game;
           alert(data.msg);
-          if (this.#player === active_player) this.#websocket.close();
-          location.replace("/games/");
+          if (this.#player === killed) {
+            this.#leave();
+          } else {
+            document.querySelector("[data-game-players]").innerHTML =
+              data.alive_html;
+            document.getElementById("end-turn").hidden = true;
+          }
+          break;
+        }
+
+        case "resync":
+          // Missed too much while disconnected, take the current state instead.
+          if (data.game !== null) this.#gameData = data.game;
+          document.querySelector("[data-game-players]").innerHTML =
+            data.alive_html;
           break;
 
         case "play_card":
           this.#gameData = data.game;
           alert(data.msg);
-          document
-            .querySelector("[data-game-hand-contents]")
-            .append(data.hand_html);
+          break;
+
+        case "peek":
+          // A crystal ball's cards, only sent to the player who played it.
+          alert(data.msg);
+          break;
+
+        case "hand":
+          // Only sent to this player's sockets.
+          document.querySelector("[data-game-hand-contents]").innerHTML =
+            data.hand_html;
           break;
 
         case "win":
           alert(data.msg);
-          this.#websocket.close();
-          location.replace("/games/");
+          this.#leave();
+          // Tournament games go back to the bracket.
+          if (data.next) window.location.href = data.next;
           break;
 
         default:
@@ -185,6 +246,45 @@ class GameState {
       if (this.#player !== this.#data.creator) {
         this.join();
       }
+      this.#joined = true;
+    });
+  }
+
+  /**
+   * Ask the server for what was missed since the last message seen, instead of joining again.
+   * @private
+   */
+  #resumeOnOpen() {
+    this.#websocket.addEventListener("open", () => {
+      this.#retries = 0;
+      this.#websocket.send(
+        JSON.stringify({ type: "resume", seq: this.#lastSeq })
+      );
+    });
+  }
+
+  /**
+   * Reconnect after an unexpected close, backing off up to 30 seconds.
+   * @private
+   */
+  #reconnectOnClose() {
+    this.#websocket.addEventListener("close", () => {
+      if (this.#leaving) return;
+      const delay = Math.min(30_000, 500 * 2 ** this.#retries++);
+      setTimeout(() => this.#connect(), delay);
+    });
+  }
+
+  /**
+   * Let the server know this player is still here, so the game isn't reaped as abandoned.
+   * @private
+   */
+  #heartbeatOnOpen() {
+    this.#websocket.addEventListener("open", () => {
+      const heartbeat = setInterval(() => {
+        this.#websocket.send(JSON.stringify({ type: "heartbeat" }));
+      }, this.#data.heartbeat * 1000);
+      this.#websocket.addEventListener("close", () => clearInterval(heartbeat));
     });
   }
 
@@ -195,13 +295,153 @@ class GameState {
   #hideStartBtnIfNotCreator() {
     if (this.#player !== this.#data.creator) {
       document.querySelector("[data-game-start-btn]").remove();
+      document.querySelector("[data-game-add-bot-btn]").remove();
     }
   }
 }
 
+/**
+ * Class representing a spectator's read-only view of a game.
+ */
+class SpectatorState {
+  #websocket;
+
+  /**
+   * Create a spectator state.
+   * @param {Object} data - The initial watch data.
+   */
+  constructor(data) {
+    const url = new URL(`ws://${document.location.host}${data.ws}/`);
+    this.#websocket = new WebSocket(url);
+    this.#setupHandler();
+  }
+
+  /**
+   * Render each snapshot as it arrives. Snapshots are already coalesced by the server.
+   * @private
+   */
+  #setupHandler() {
+    this.#websocket.addEventListener("message", (ev) => {
+      const data = JSON.parse(ev.data);
+      if (data.type !== "snapshot") return;
+
+      document.querySelector("[data-game-players]").innerHTML = data.alive_html;
+      if (data.msgs.length > 0) {
+        document.querySelector("[data-game-status]").textContent =
+          data.msgs[data.msgs.length - 1];
+      } else if (data.game !== null) {
+        document.querySelector(
+          "[data-game-status]"
+        ).textContent = `${data.game.active_player}'s turn`;
+      }
+      // A burst of clicks is shown as a few kernels, not one per click.
+      for (let i = 0; i < Math.min(data.clicks, 5); i++) {
+        popcornExplosion();
+      }
+    });
+  }
+}
+
+/**
+ * Class keeping the lobby listing live.
+ */
+class LobbyState {
+  #tbody;
+  #websocket;
+
+  /**
+   * Create a lobby state.
+   * @param {HTMLElement} tbody - The body of the lobby table.
+   */
+  constructor(tbody) {
+    this.#tbody = tbody;
+    const url = new URL(`ws://${document.location.host}/ws/lobby/`);
+    this.#websocket = new WebSocket(url);
+    this.#setupHandler();
+  }
+
+  /**
+   * Apply row-level lobby changes as they are pushed by the server.
+   * @private
+   */
+  #setupHandler() {
+    this.#websocket.addEventListener("message", (ev) => {
+      const data = JSON.parse(ev.data);
+      if (data.type !== "lobby_update") return;
+
+      const row = this.#tbody.querySelector(
+        `[data-lobby-game="${data.game.pk}"]`
+      );
+      switch (data.action) {
+        case "created":
+          // Only the first page shows the newest games.
+          if (this.#tbody.hasAttribute("data-lobby-older-page")) break;
+          this.#tbody.querySelector("[data-lobby-empty]")?.remove();
+          this.#tbody.insertAdjacentHTML("afterbegin", data.row_html);
+          break;
+
+        case "joined":
+          row?.insertAdjacentHTML("afterend", data.row_html);
+          row?.remove();
+          break;
+
+        case "started":
+        case "closed":
+          row?.remove();
+          break;
+
+        default:
+          break;
+      }
+    });
+  }
+}
+
+/**
+ * Class representing a player waiting in the matchmaking queue.
+ */
+class MatchmakingState {
+  #button;
+  #websocket;
+
+  /**
+   * Join the queue, and go to the game once seated in one.
+   * @param {HTMLElement} button - The button that started the search.
+   */
+  constructor(button) {
+    this.#button = button;
+    this.#button.disabled = true;
+    this.#button.textContent = "Looking for players...";
+    const url = new URL(`ws://${document.location.host}/ws/matchmaking/`);
+    this.#websocket = new WebSocket(url);
+    this.#websocket.addEventListener("message", (ev) => {
+      const data = JSON.parse(ev.data);
+      if (data.type === "matched") location.assign(data.url);
+    });
+  }
+}
+
 /**
  * Initialize the game state when the DOM content is loaded, set up the WebSocket connection, and bind game actions to the global `window` object for easy access.
  */
+document.addEventListener("DOMContentLoaded", () => {
+  const lobby = document.querySelector("[data-lobby-ws]");
+  if (lobby !== null) new LobbyState(lobby);
+
+  const findGame = document.querySelector("[data-matchmaking-btn]");
+  if (findGame !== null) {
+    window.findGame = () => new MatchmakingState(findGame);
+  }
+});
+
+document.addEventListener("DOMContentLoaded", () => {
+  if (document.querySelector("[data-game-watch]") === null) return;
+
+  new SpectatorState(
+    JSON.parse(document.querySelector("#watch_data").textContent)
+  );
+});
+
 document.addEventListener("DOMContentLoaded", () => {
   const el = document.querySelector("[data-game-ws]");
   if (el === null) return;
@@ -214,49 +454,96 @@ document.addEventListener("DOMContentLoaded", () => {
     gameState.playCard(card);
   };
 
-  window.startGame = () => gameState.start();
+  window.startGame = () => {
+    document.querySelector("[data-game-add-bot-btn]")?.remove();
+    gameState.start();
+  };
+  window.addBot = () => gameState.addBot();
   window.endTurn = () => gameState.endTurn();
   window.cornClick = () => gameState.click();
 });
 
 /**
- * Create a popcorn explosion at the click location.
- * @param {Event} event - The click event.
- */
-function popcornExplosion(event) {
-  createPopcorn(event.clientX, event.clientY);
-}
-
-/**
- * Create a popcorn image at the specified coordinates and animate it.
- * @param {number} x - The x-coordinate of the click.
- * @param {number} y - The y-coordinate of the click.
+ * Class animating popcorn with a fixed pool of elements.
+ *
+ * Each kernel is a frame of the popcorn sprite (`.popcorn-0` to `.popcorn-9`).
+ * Elements are created as needed up to the pool size and then reused, oldest
+ * first, so a burst of clicks never grows the DOM. Kernels only animate their
+ * transform and opacity, which the browser composites without layout.
  */
-function createPopcorn(x, y) {
-  const popcorn = document.createElement("img");
-  const popcornNumber = Math.floor(Math.random() * 10); // Random popcorn image (0-9)
-  popcorn.src = `/static/popcorn_kernel_${popcornNumber}.png`;
+class PopcornPool {
+  static FRAMES = 10;
+  static DURATION = 1500;
 
-  popcorn.classList.add("popcorn");
+  #size;
+  #layer;
+  #kernels = [];
+  #next = 0;
 
-  const main = document.querySelector("main");
-  main.appendChild(popcorn);
+  /**
+   * Create a popcorn pool.
+   * @param {number} size - The most kernels in the air at once.
+   */
+  constructor(size) {
+    this.#size = size;
+  }
 
-  // Get screen position of the click event
-  const xPos = x; // x position is directly from the click
-  const yPos = y; // y position is directly from the click
+  /**
+   * Pop a random kernel from the given point of the viewport.
+   * @param {number} x - The x-coordinate to pop from.
+   * @param {number} y - The y-coordinate to pop from.
+   */
+  pop(x, y) {
+    const kernel = this.#take();
+    const frame = Math.floor(Math.random() * PopcornPool.FRAMES);
+    kernel.className = `popcorn popcorn-${frame}`;
+
+    // Randomly drift a little left or right on the way up.
+    const xOffset = (Math.random() - 0.5) * 100;
+    kernel.animate(
+      [
+        { transform: `translate(${x}px, ${y}px) scale(0.5)`, opacity: 1 },
+        { transform: `translate(${x + xOffset}px, ${y - 150}px) scale(1)`, opacity: 0 },
+      ],
+      { duration: PopcornPool.DURATION, easing: "ease-out" }
+    );
+  }
 
-  popcorn.style.left = `${xPos}px`; // Set left position based on the click
-  popcorn.style.top = `${yPos}px`; // Set top position based on the click
+  /**
+   * The next element to animate, stopping it if it is still in the air.
+   * @private
+   */
+  #take() {
+    if (!this.#layer) {
+      this.#layer = document.createElement("div");
+      this.#layer.className = "popcorn-layer";
+      document.body.appendChild(this.#layer);
+    }
+    if (this.#kernels.length < this.#size) {
+      const kernel = document.createElement("div");
+      this.#layer.appendChild(kernel);
+      this.#kernels.push(kernel);
+      return kernel;
+    }
 
-  // Randomly choose to move left or right (xOffset)
-  const xOffset = (Math.random() - 0.5) * 100; // Random small left or right offset
+    const kernel = this.#kernels[this.#next];
+    this.#next = (this.#next + 1) % this.#size;
+    kernel.getAnimations().forEach((animation) => animation.cancel());
+    return kernel;
+  }
+}
 
-  // Apply the random xOffset to the custom property
-  popcorn.style.setProperty("--x", `${xOffset}px`);
+// 20 clicks a second of 1.5 second kernels is 30 in the air.
+const popcorn = new PopcornPool(32);
 
-  // Remove the popcorn after the animation completes
-  setTimeout(() => popcorn.remove(), 1500);
+/**
+ * Pop a kernel out of the big corn.
+ */
+function popcornExplosion() {
+  const corn = document.getElementById("kernel");
+  if (!corn) return;
+  const rect = corn.getBoundingClientRect();
+  popcorn.pop(rect.left + rect.width / 2, rect.top + rect.height / 3);
 }
 
 document.addEventListener("DOMContentLoaded", () => {